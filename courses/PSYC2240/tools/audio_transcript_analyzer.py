@@ -6,15 +6,97 @@ Compares audio files with existing transcripts to:
 2. Extract missed content  
 3. Identify emphasis and context
 4. Generate enhanced Anki cards with verified content
+
+Results are cached per transcript in source/audio_transcript_cache.json;
+re-running only analyzes transcripts that are new or have changed.
 """
 
 import os
 import sys
 import json
 import re
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
-import difflib
+
+# Bump when the analysis changes so cached results are recomputed
+ANALYSIS_VERSION = 1
+
+CACHE_FILENAME = "audio_transcript_cache.json"
+
+# Signs of transcription errors (compiled once, shared by every transcript)
+ERROR_PATTERNS = [
+    (re.compile(r'\b[A-Z]{2,}\b', re.IGNORECASE), 'ALL_CAPS_WORDS'),  # Often transcription errors
+    (re.compile(r'\b\w{1,2}\b\.', re.IGNORECASE), 'SINGLE_LETTERS'),   # Single letters often wrong
+    (re.compile(r'[^\w\s\.\,\?\!\:\;]', re.IGNORECASE), 'SPECIAL_CHARS'), # Unusual characters
+    (re.compile(r'\b(um|uh|like|you know)\b', re.IGNORECASE), 'FILLER_WORDS'),
+]
+
+# Neuroscience technical terms that need verification
+NEURO_TERMS = [
+    'neuron', 'synapse', 'neurotransmitter', 'dopamine', 'serotonin',
+    'cortex', 'hippocampus', 'amygdala', 'cerebellum', 'brainstem',
+    'action potential', 'myelin', 'axon', 'dendrite', 'plasticity',
+    'GABA', 'acetylcholine', 'norepinephrine', 'vestibular'
+]
+
+# All terms in one pass (longest first so no term shadows another)
+NEURO_TERMS_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(term) for term in sorted(NEURO_TERMS, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+
+TIMESTAMP_PATTERN = re.compile(r'\d{1,2}:\d{2}')
+
+# Unclear sections (multiple question marks, incomplete sentences)
+UNCLEAR_PATTERNS = [
+    re.compile(r'[^\.\!\?]{50,}$', re.MULTILINE),  # Long sentences without punctuation
+    re.compile(r'\?\?\?+', re.MULTILINE),          # Multiple question marks
+    re.compile(r'\b[A-Z][a-z]+\s[A-Z][a-z]+\b', re.MULTILINE),  # Potential proper nouns that might be wrong
+]
+
+DEFINITION_PATTERNS = [
+    re.compile(r'(\w+(?:\s+\w+){0,2})\s+is\s+([^\.]{10,100})', re.IGNORECASE),
+    re.compile(r'(\w+(?:\s+\w+){0,2})\s+refers to\s+([^\.]{10,100})', re.IGNORECASE),
+    re.compile(r'(\w+(?:\s+\w+){0,2})\s+means\s+([^\.]{10,100})', re.IGNORECASE),
+    re.compile(r'(\w+(?:\s+\w+){0,2})\s+are\s+([^\.]{10,100})', re.IGNORECASE),
+]
+
+PROCESS_PATTERNS = [
+    re.compile(r'(when|if|during)\s+([^\.]{20,150})', re.IGNORECASE),
+    re.compile(r'(the process of|how)\s+([^\.]{20,150})', re.IGNORECASE),
+]
+
+
+def read_transcript(transcript_path: str) -> Tuple[str, str]:
+    """Read a transcript once; returns (text with universal newlines, content hash)."""
+    with open(transcript_path, 'rb') as f:
+        data = f.read()
+    content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    return content, hashlib.sha256(data).hexdigest()
+
+
+def _analyze_pair(job: Dict) -> Dict:
+    """
+    Analyze one audio-transcript pair from a single read (process pool worker).
+    
+    Skips the analysis when the transcript's hash matches job['cached_hash'].
+    """
+    pair = job['pair']
+    content, digest = read_transcript(pair['transcript_path'])
+    if digest == job.get('cached_hash'):
+        return {'hash': digest, 'unchanged': True}
+    
+    analyzer = AudioTranscriptAnalyzer(job['workspace_path'])
+    analysis = analyzer.analyze_transcript_quality(pair['transcript_path'], content)
+    return {
+        'hash': digest,
+        'unchanged': False,
+        'transcript_analysis': analysis,
+        'verification_prompts': analyzer.generate_verification_prompts(pair, analysis),
+        'extracted_concepts': analyzer.extract_key_concepts_from_transcript(pair['transcript_path'], content)
+    }
 
 class AudioTranscriptAnalyzer:
     def __init__(self, workspace_path: str = None):
@@ -54,10 +136,10 @@ class AudioTranscriptAnalyzer:
         self.audio_transcript_pairs = pairs
         return pairs
     
-    def analyze_transcript_quality(self, transcript_path: str) -> Dict:
-        """Analyze existing transcript for potential issues"""
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    def analyze_transcript_quality(self, transcript_path: str, content: Optional[str] = None) -> Dict:
+        """Analyze existing transcript for potential issues (reads the file unless content is given)"""
+        if content is None:
+            content, _ = read_transcript(transcript_path)
         
         analysis = {
             'total_length': len(content),
@@ -65,19 +147,12 @@ class AudioTranscriptAnalyzer:
             'potential_errors': [],
             'technical_terms': [],
             'unclear_sections': [],
-            'timestamps_present': bool(re.search(r'\d{1,2}:\d{2}', content)),
+            'timestamps_present': bool(TIMESTAMP_PATTERN.search(content)),
         }
         
         # Look for signs of transcription errors
-        error_patterns = [
-            (r'\b[A-Z]{2,}\b', 'ALL_CAPS_WORDS'),  # Often transcription errors
-            (r'\b\w{1,2}\b\.', 'SINGLE_LETTERS'),   # Single letters often wrong
-            (r'[^\w\s\.\,\?\!\:\;]', 'SPECIAL_CHARS'), # Unusual characters
-            (r'\b(um|uh|like|you know)\b', 'FILLER_WORDS'),
-        ]
-        
-        for pattern, error_type in error_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
+        for pattern, error_type in ERROR_PATTERNS:
+            matches = pattern.findall(content)
             if matches:
                 analysis['potential_errors'].append({
                     'type': error_type,
@@ -86,36 +161,25 @@ class AudioTranscriptAnalyzer:
                 })
         
         # Identify neuroscience technical terms that need verification
-        neuro_terms = [
-            'neuron', 'synapse', 'neurotransmitter', 'dopamine', 'serotonin',
-            'cortex', 'hippocampus', 'amygdala', 'cerebellum', 'brainstem',
-            'action potential', 'myelin', 'axon', 'dendrite', 'plasticity',
-            'GABA', 'acetylcholine', 'norepinephrine', 'vestibular'
-        ]
-        
-        found_terms = []
-        for term in neuro_terms:
-            if re.search(r'\b' + re.escape(term) + r'\b', content, re.IGNORECASE):
-                found_terms.append(term)
-        analysis['technical_terms'] = found_terms
+        found = set()
+        for match in NEURO_TERMS_PATTERN.finditer(content):
+            found.add(match.group(1).lower())
+            if len(found) == len(NEURO_TERMS):
+                break
+        analysis['technical_terms'] = [term for term in NEURO_TERMS if term.lower() in found]
         
         # Look for unclear sections (multiple question marks, incomplete sentences)
-        unclear_patterns = [
-            r'[^\.\!\?]{50,}$',  # Long sentences without punctuation
-            r'\?\?\?+',          # Multiple question marks
-            r'\b[A-Z][a-z]+\s[A-Z][a-z]+\b',  # Potential proper nouns that might be wrong
-        ]
-        
-        for pattern in unclear_patterns:
-            matches = re.findall(pattern, content, re.MULTILINE)
+        for pattern in UNCLEAR_PATTERNS:
+            matches = pattern.findall(content)
             if matches:
                 analysis['unclear_sections'].extend(matches[:3])
         
         return analysis
     
-    def generate_verification_prompts(self, pair: Dict) -> List[str]:
-        """Generate specific prompts for audio verification"""
-        analysis = self.analyze_transcript_quality(pair['transcript_path'])
+    def generate_verification_prompts(self, pair: Dict, analysis: Optional[Dict] = None) -> List[str]:
+        """Generate specific prompts for audio verification (from an existing quality analysis if given)"""
+        if analysis is None:
+            analysis = self.analyze_transcript_quality(pair['transcript_path'])
         
         prompts = [
             f"Please analyze the audio file '{pair['filename']}' and compare it with the existing transcript.",
@@ -136,24 +200,16 @@ class AudioTranscriptAnalyzer:
         
         return prompts
     
-    def extract_key_concepts_from_transcript(self, transcript_path: str) -> List[Dict]:
-        """Extract key concepts that should become Anki cards"""
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    def extract_key_concepts_from_transcript(self, transcript_path: str, content: Optional[str] = None) -> List[Dict]:
+        """Extract key concepts that should become Anki cards (reads the file unless content is given)"""
+        if content is None:
+            content, _ = read_transcript(transcript_path)
         
         concepts = []
         
         # Look for definition patterns
-        definition_patterns = [
-            r'(\w+(?:\s+\w+){0,2})\s+is\s+([^\.]{10,100})',
-            r'(\w+(?:\s+\w+){0,2})\s+refers to\s+([^\.]{10,100})',
-            r'(\w+(?:\s+\w+){0,2})\s+means\s+([^\.]{10,100})',
-            r'(\w+(?:\s+\w+){0,2})\s+are\s+([^\.]{10,100})',
-        ]
-        
-        for pattern in definition_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            for term, definition in matches:
+        for pattern in DEFINITION_PATTERNS:
+            for term, definition in pattern.findall(content):
                 concepts.append({
                     'type': 'definition',
                     'term': term.strip(),
@@ -162,14 +218,8 @@ class AudioTranscriptAnalyzer:
                 })
         
         # Look for process descriptions
-        process_patterns = [
-            r'(when|if|during)\s+([^\.]{20,150})',
-            r'(the process of|how)\s+([^\.]{20,150})',
-        ]
-        
-        for pattern in process_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            for trigger, process in matches:
+        for pattern in PROCESS_PATTERNS:
+            for trigger, process in pattern.findall(content):
                 concepts.append({
                     'type': 'process',
                     'trigger': trigger.strip(),
@@ -179,8 +229,15 @@ class AudioTranscriptAnalyzer:
         
         return concepts
     
-    def run_analysis(self) -> Dict:
-        """Run complete audio-transcript analysis"""
+    def run_analysis(self, max_workers: Optional[int] = None, use_cache: bool = True) -> Dict:
+        """
+        Run complete audio-transcript analysis
+        
+        Each transcript is read once and all passes share that text. Results
+        are cached per transcript (keyed by content hash) in
+        source/audio_transcript_cache.json, so only new or changed
+        transcripts are analyzed, in a process pool.
+        """
         print("🎧 Starting Audio-Transcript Analysis...")
         
         pairs = self.find_audio_transcript_pairs()
@@ -194,30 +251,86 @@ class AudioTranscriptAnalyzer:
             'recommended_actions': []
         }
         
+        cache = self._load_cache() if use_cache else {}
+        entries = {}
+        jobs = []
+        for pair in pairs:
+            path = pair['transcript_path']
+            entry = cache.get(path)
+            stat = os.stat(path)
+            if entry and entry['filename'] == pair['filename'] and \
+                    entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                entries[path] = entry
+            else:
+                jobs.append({'pair': pair, 'workspace_path': str(self.workspace_path),
+                             'cached_hash': entry['hash'] if entry and entry['filename'] == pair['filename'] else None,
+                             'stat': (stat.st_size, stat.st_mtime_ns)})
+        
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(jobs)))
+        if jobs:
+            print(f"⚙️  Checking {len(jobs)} new or modified transcripts with {workers} workers")
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(_analyze_pair, jobs))
+        else:
+            outcomes = [_analyze_pair(job) for job in jobs]
+        
+        analyzed = set()
+        for job, outcome in zip(jobs, outcomes):
+            path = job['pair']['transcript_path']
+            if outcome['unchanged']:
+                entry = cache[path]
+            else:
+                entry = {key: outcome[key] for key in
+                         ('transcript_analysis', 'verification_prompts', 'extracted_concepts')}
+                entry.update(filename=job['pair']['filename'], hash=outcome['hash'])
+                analyzed.add(path)
+            entry['size'], entry['mtime_ns'] = job['stat']
+            entries[path] = entry
+        
         for pair in pairs:
             filename = pair['filename']
-            print(f"🔍 Analyzing: {filename}")
-            
-            # Analyze transcript quality
-            transcript_analysis = self.analyze_transcript_quality(pair['transcript_path'])
-            results['transcript_analyses'][filename] = transcript_analysis
-            
-            # Generate verification prompts
-            verification_prompts = self.generate_verification_prompts(pair)
-            results['verification_prompts'][filename] = verification_prompts
-            
-            # Extract concepts for Anki cards
-            concepts = self.extract_key_concepts_from_transcript(pair['transcript_path'])
-            results['extracted_concepts'][filename] = concepts
+            entry = entries[pair['transcript_path']]
+            results['transcript_analyses'][filename] = entry['transcript_analysis']
+            results['verification_prompts'][filename] = entry['verification_prompts']
+            results['extracted_concepts'][filename] = entry['extracted_concepts']
             
-            print(f"   ✅ Found {len(concepts)} potential concepts")
-            print(f"   ⚠️  {len(transcript_analysis['potential_errors'])} potential issues flagged")
+            if pair['transcript_path'] in analyzed:
+                print(f"🔍 Analyzing: {filename}")
+            else:
+                print(f"♻️  Unchanged: {filename} (cached)")
+            print(f"   ✅ Found {len(entry['extracted_concepts'])} potential concepts")
+            print(f"   ⚠️  {len(entry['transcript_analysis']['potential_errors'])} potential issues flagged")
+        
+        if use_cache:
+            self._save_cache(entries)
         
         # Generate recommendations
         results['recommended_actions'] = self._generate_recommendations(results)
         
         return results
     
+    def _cache_path(self) -> Path:
+        return self.workspace_path / "source" / CACHE_FILENAME
+    
+    def _load_cache(self) -> Dict:
+        """Cached per-transcript results (empty if missing or from another analysis version)"""
+        try:
+            with open(self._cache_path(), 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return cache.get('transcripts', {}) if cache.get('version') == ANALYSIS_VERSION else {}
+    
+    def _save_cache(self, entries: Dict):
+        """Store the current transcripts' results (dropping removed transcripts)"""
+        cache_path = self._cache_path()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': ANALYSIS_VERSION, 'transcripts': entries}, f, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+    
     def _generate_recommendations(self, results: Dict) -> List[str]:
         """Generate actionable recommendations based on analysis"""
         recommendations = []
@@ -3,40 +3,35 @@ Comprehensive Search and Fix for ANY problematic PSYC 2240 cards
 Find cards with awkward phrasing, incomplete answers, and grammar issues
 """
 
-import requests
+import argparse
+import sys
+from pathlib import Path
 import json
 import re
 
+# Shared AnkiConnect client, note updater, note mirror and query planner
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared" / "tools"))
+from anki_connect import AnkiConnectClient, DEFAULT_URL
+from note_updater import BulkNoteUpdater
+from note_mirror import NoteMirror
+from query_planner import plan_scope
+from fix_journal import FixJournal, add_journal_arguments, run_saved_plan
+from field_text import field_to_text
+
 class ComprehensiveCardSearcher:
-    def __init__(self, host="127.0.0.1", port=8765):
-        self.url = f"http://{host}:{port}"
+    def __init__(self, host=None, port=8765):
+        self.url = f"http://{host}:{port}" if host else DEFAULT_URL
+        self.anki = AnkiConnectClient(self.url)
+        self.mirror = NoteMirror(self.anki)
         self.fixes_applied = 0
         
     def request(self, action, params=None):
         """Send request to AnkiConnect"""
-        payload = {
-            "action": action,
-            "version": 6,
-            "params": params or {}
-        }
-        
-        try:
-            response = requests.post(self.url, json=payload, timeout=10)
-            result = response.json()
-            return result
-        except Exception as e:
-            print(f"❌ Connection Error: {e}")
-            return None
+        return self.anki.request(action, params)
     
     def clean_html(self, text):
         """Remove HTML tags and CSS styling"""
-        # Remove style blocks completely
-        text = re.sub(r'<style>.*?</style>', '', text, flags=re.DOTALL)
-        # Remove other HTML tags
-        clean = re.sub(r'<[^>]+>', '', text)
-        # Remove extra whitespace
-        clean = re.sub(r'\s+', ' ', clean)
-        return clean.strip()
+        return field_to_text(text, collapse=True)
     
     def search_all_cards_for_problems(self):
         """Search through ALL cards looking for quality issues"""
@@ -55,38 +50,27 @@ class ComprehensiveCardSearcher:
             "tag:*2240*"
         ]
         
-        all_note_ids = set()  # Use set to avoid duplicates
-        for query in deck_queries:
-            result = self.request("findNotes", {"query": query})
-            if result and result.get("result"):
-                note_ids = result["result"]
-                all_note_ids.update(note_ids)  # Use update for sets
-                print(f"   {query}: {len(note_ids)} notes")
+        # One combined search for all scopes, synced into the local note mirror
+        scope = plan_scope(deck_queries)
+        print(f"   Search: {scope}")
+        
+        sync = self.mirror.sync(scope)
+        if sync.get("error"):
+            print(f"❌ Search failed: {sync['error']}")
+            return []
         
-        all_note_ids = list(all_note_ids)  # Convert set to list
-        print(f"📊 Total unique notes to examine: {len(all_note_ids)}")
+        notes = self.mirror.notes(scope)
+        print(f"📊 Total unique notes to examine: {len(notes)} ({sync['fetched']} fetched from Anki)")
         
-        # Examine cards in batches
         problem_cards = []
-        batch_size = 50
         
-        for i in range(0, len(all_note_ids), batch_size):
-            batch = all_note_ids[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (len(all_note_ids) + batch_size - 1) // batch_size
-            
-            print(f"🔍 Examining batch {batch_num}/{total_batches}...")
-            
-            result = self.request("notesInfo", {"notes": batch})
-            
-            if result and result.get("result"):
-                for note in result["result"]:
-                    issues = self.check_card_for_issues(note)
-                    if issues:
-                        problem_cards.append({
-                            "note": note,
-                            "issues": issues
-                        })
+        for note in notes:
+            issues = self.check_card_for_issues(note)
+            if issues:
+                problem_cards.append({
+                    "note": note,
+                    "issues": issues
+                })
         
         print(f"📊 Found {len(problem_cards)} cards with quality issues")
         return problem_cards
@@ -183,6 +167,11 @@ class ComprehensiveCardSearcher:
         """Fix the specific issues found"""
         print(f"\n🔧 Fixing {len(problem_cards)} problematic cards...")
         
+        # Writes are verified against the cleaned text, as the fixes produce plain text
+        updater = BulkNoteUpdater(self.anki, normalize=self.clean_html,
+                                  journal=FixJournal("comprehensive_card_searcher"))
+        staged = []
+        
         for i, card_data in enumerate(problem_cards, 1):
             note = card_data["note"]
             issues = card_data["issues"]
@@ -191,14 +180,21 @@ class ComprehensiveCardSearcher:
             print(f"\n🎯 Card {i}/{len(problem_cards)} (ID: {note_id})")
             print(f"   Issues: {', '.join(issues)}")
             
-            if self.attempt_fix(note, issues):
-                self.fixes_applied += 1
-                print(f"   ✅ FIXED successfully!")
+            if self.attempt_fix(note, issues, updater):
+                staged.append(note_id)
             else:
-                print(f"   ❌ Fix failed")
+                self.fixes_applied += 1  # No changes needed
+        
+        # Send all changed fields in batched, verified updates
+        result = updater.flush()
+        for note_id in staged:
+            if note_id in result["failed"]:
+                print(f"   ❌ Fix failed for {note_id}: {result['failed'][note_id]}")
+        self.fixes_applied += len(result["updated"])
+        print(f"\n✅ {len(result['updated'])} cards updated, {result['fields_sent']} fields written")
     
-    def attempt_fix(self, note, issues):
-        """Attempt to fix a specific card"""
+    def attempt_fix(self, note, issues, updater):
+        """Work out fixes for a card; returns True if changed fields were staged"""
         fields = note.get("fields", {})
         note_id = note.get("noteId")
         
@@ -237,44 +233,14 @@ class ComprehensiveCardSearcher:
             if not fixed_answer.endswith('.') and not fixed_answer.endswith('!') and not fixed_answer.endswith('?'):
                 fixed_answer = fixed_answer + "."
         
-        # Apply the update if changes were made
-        if fixed_question != current_question or fixed_answer != current_answer:
-            return self.update_card_verified(note_id, fixed_question, fixed_answer)
-        
-        return True  # No changes needed
-    
-    def update_card_verified(self, note_id, new_question, new_answer):
-        """Update card with verification"""
-        update_data = {
-            "note": {
-                "id": note_id,
-                "fields": {
-                    "Question": new_question,
-                    "Answer": new_answer
-                }
-            }
-        }
-        
-        # Attempt update
-        result = self.request("updateNoteFields", update_data)
-        
-        if result and result.get("error") is None:
-            # Verify the update worked
-            verify_result = self.request("notesInfo", {"notes": [note_id]})
-            
-            if verify_result and verify_result.get("result"):
-                verified_note = verify_result["result"][0]
-                verified_fields = verified_note.get("fields", {})
-                
-                verified_question = self.clean_html(verified_fields.get("Question", {}).get("value", ""))
-                verified_answer = self.clean_html(verified_fields.get("Answer", {}).get("value", ""))
-                
-                if verified_question == new_question and verified_answer == new_answer:
-                    return True
-        
-        return False
+        # Stage only the fields that changed
+        return updater.stage(
+            note_id,
+            {"Question": fixed_question, "Answer": fixed_answer},
+            {"Question": current_question, "Answer": current_answer}
+        )
     
-    def run_comprehensive_search(self):
+    def run_comprehensive_search(self, args=None):
         """Run comprehensive search and fix"""
         print("🎯 COMPREHENSIVE PSYC 2240 QUALITY SEARCH & FIX")
         print("=" * 55)
@@ -289,6 +255,12 @@ class ComprehensiveCardSearcher:
         
         print(f"✅ Connected to Anki (version {connection_test.get('result', 'unknown')})")
         
+        # Finish or repeat a saved fix run without re-scanning
+        result = run_saved_plan("comprehensive_card_searcher", self.anki, args, normalize=self.clean_html) if args else None
+        if result is not None:
+            print(f"✅ Applied {len(result['updated'])} saved fixes ({len(result['failed'])} failed)")
+            return
+        
         # Search all cards for problems
         problem_cards = self.search_all_cards_for_problems()
         
@@ -305,10 +277,15 @@ class ComprehensiveCardSearcher:
         print(f"⚠️ Problems found: {len(problem_cards)}")
         print(f"✅ Fixes applied: {self.fixes_applied}")
         print(f"🧠 Quality issues resolved!")
+        print(self.anki.report())
 
 def main():
+    parser = argparse.ArgumentParser(description="Search all PSYC 2240 cards for quality issues and fix them")
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+    
     searcher = ComprehensiveCardSearcher()
-    searcher.run_comprehensive_search()
+    searcher.run_comprehensive_search(args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
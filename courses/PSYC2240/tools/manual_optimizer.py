@@ -3,109 +3,113 @@
 Manual Card Optimizer - Fix cards one by one using memory retention principles
 """
 
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import sys
+import re
+from pathlib import Path
+
+# Shared AnkiConnect client, note updater and note mirror
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared" / "tools"))
+from anki_connect import AnkiConnectClient
+from note_updater import BulkNoteUpdater
+from note_mirror import NoteMirror
+from fix_journal import FixJournal, add_journal_arguments, run_saved_plan
+from field_text import fields_to_text
+
+DECK_QUERY = 'deck:"PSYC 2240*"'
+
+FIGURE_REFERENCE_PATTERNS = [
+    re.compile(r'Figure \d+\.\d+[^.]*\.?'),
+    re.compile(r'Fig\. \d+\.\d+[^.]*\.?'),
+]
 
 class ManualCardOptimizer:
     def __init__(self):
-        self.url = "http://127.0.0.1:8765"
+        self.anki = AnkiConnectClient()
+        self.mirror = NoteMirror(self.anki)
         
     def anki_request(self, action, params=None):
         """Make request to AnkiConnect"""
-        payload = {"action": action, "version": 6}
-        if params:
-            payload["params"] = params
-        
-        try:
-            response = requests.post(self.url, json=payload, timeout=10)
-            return response.json()
-        except Exception as e:
-            print(f"AnkiConnect error: {e}")
-            return {"error": str(e)}
+        return self.anki.request(action, params)
     
     def find_problematic_cards(self):
         """Find cards that need manual optimization"""
         print("🔍 Finding problematic cards for manual optimization...")
         
-        # Get all PSYC cards
-        card_response = self.anki_request("findCards", {"query": 'deck:"PSYC 2240*"'})
-        if card_response.get("error"):
-            print(f"Error finding cards: {card_response['error']}")
+        # Sync the local note mirror; only notes edited since the last run are fetched
+        sync = self.mirror.sync(DECK_QUERY)
+        if sync.get("error"):
+            print(f"Error syncing notes: {sync['error']}")
             return []
         
-        card_ids = card_response["result"]
-        print(f"📚 Found {len(card_ids)} total cards")
+        notes = self.mirror.notes(DECK_QUERY)
+        print(f"📚 Found {len(notes)} total notes ({sync['fetched']} fetched from Anki)")
         
         problematic_cards = []
         
-        # Check in batches
-        batch_size = 50
-        for i in range(0, len(card_ids), batch_size):
-            batch = card_ids[i:i + batch_size]
+        for note in notes:
+            note_id = note["noteId"]
+            fields = note["fields"]
             
-            # Get card details
-            info_response = self.anki_request("cardsInfo", {"cards": batch})
-            if info_response.get("error"):
-                continue
-                
-            cards = info_response["result"]
+            question = fields.get("Question", {}).get("value", "")
+            answer = fields.get("Answer", {}).get("value", "")
             
-            for card in cards:
-                note_id = card["note"]
-                fields = card["fields"]
-                
-                question = fields.get("Question", {}).get("value", "")
-                answer = fields.get("Answer", {}).get("value", "")
-                
-                # Clean HTML to analyze
-                q_text = BeautifulSoup(question, 'html.parser').get_text().strip()
-                a_text = BeautifulSoup(answer, 'html.parser').get_text().strip()
-                
-                # Identify problems
-                issues = []
-                
-                # Empty or minimal content
-                if not q_text or len(q_text) < 10:
-                    issues.append("empty_question")
-                if not a_text or len(a_text) < 5:
-                    issues.append("empty_answer")
-                    
-                # Poor question format (not memory optimized)
-                if not q_text.endswith("?") and q_text:
-                    issues.append("not_question_format")
-                    
-                # Figure references
-                if "Figure" in q_text or "Figure" in a_text:
-                    issues.append("figure_reference")
-                    
-                # Generic placeholder text
-                if "Review this" in q_text or "Review this" in a_text:
-                    issues.append("placeholder_text")
-                    
-                # Too long (not concise)
-                if len(a_text) > 200:
-                    issues.append("too_verbose")
-                    
-                # Definition format instead of functional
-                if q_text.startswith("Define") or "definition" in q_text.lower():
-                    issues.append("definition_format")
-                
-                if issues:
-                    problematic_cards.append({
-                        "note_id": note_id,
-                        "card_id": card["cardId"],
-                        "question": q_text,
-                        "answer": a_text,
-                        "issues": issues,
-                        "priority": fields.get("Priority", {}).get("value", ""),
-                        "chapter": fields.get("Chapter", {}).get("value", ""),
-                        "clinical": fields.get("Clinical", {}).get("value", "")
-                    })
+            # Clean HTML to analyze
+            q_text, a_text = fields_to_text([question, answer])
+            
+            issues = self.detect_issues(q_text, a_text)
+            
+            if issues:
+                problematic_cards.append({
+                    "note_id": note_id,
+                    "question": q_text,
+                    "answer": a_text,
+                    "issues": issues,
+                    "priority": fields.get("Priority", {}).get("value", ""),
+                    "chapter": fields.get("Chapter", {}).get("value", ""),
+                    "clinical": fields.get("Clinical", {}).get("value", ""),
+                    "fields": fields
+                })
         
         print(f"⚠️  Found {len(problematic_cards)} cards needing manual optimization")
         return problematic_cards
     
-    def optimize_card_content(self, card_data):
+    @staticmethod
+    def detect_issues(q_text, a_text):
+        """Return the memory-retention issues found in a card's plain text"""
+        # Identify problems
+        issues = []
+        
+        # Empty or minimal content
+        if not q_text or len(q_text) < 10:
+            issues.append("empty_question")
+        if not a_text or len(a_text) < 5:
+            issues.append("empty_answer")
+            
+        # Poor question format (not memory optimized)
+        if not q_text.endswith("?") and q_text:
+            issues.append("not_question_format")
+            
+        # Figure references
+        if "Figure" in q_text or "Figure" in a_text:
+            issues.append("figure_reference")
+            
+        # Generic placeholder text
+        if "Review this" in q_text or "Review this" in a_text:
+            issues.append("placeholder_text")
+            
+        # Too long (not concise)
+        if len(a_text) > 200:
+            issues.append("too_verbose")
+            
+        # Definition format instead of functional
+        if q_text.startswith("Define") or "definition" in q_text.lower():
+            issues.append("definition_format")
+        
+        return issues
+    
+    @staticmethod
+    def optimize_card_content(card_data):
         """Apply memory retention principles to optimize a single card"""
         question = card_data["question"]
         answer = card_data["answer"]
@@ -149,11 +153,9 @@ class ManualCardOptimizer:
         
         # Remove figure references
         if "figure_reference" in issues:
-            import re
-            new_question = re.sub(r'Figure \d+\.\d+[^.]*\.?', '', new_question).strip()
-            new_answer = re.sub(r'Figure \d+\.\d+[^.]*\.?', '', new_answer).strip()
-            new_question = re.sub(r'Fig\. \d+\.\d+[^.]*\.?', '', new_question).strip()
-            new_answer = re.sub(r'Fig\. \d+\.\d+[^.]*\.?', '', new_answer).strip()
+            for pattern in FIGURE_REFERENCE_PATTERNS:
+                new_question = pattern.sub('', new_question).strip()
+                new_answer = pattern.sub('', new_answer).strip()
         
         # Make answers more concise
         if "too_verbose" in issues:
@@ -192,12 +194,13 @@ class ManualCardOptimizer:
         
         if not problematic_cards:
             print("✅ No problematic cards found!")
-            return
+            return 0
         
         print(f"\n🔧 MANUAL OPTIMIZATION OF {len(problematic_cards)} CARDS")
         print("=" * 60)
         
         fixed_count = 0
+        updater = BulkNoteUpdater(self.anki, journal=FixJournal("manual_optimizer"))
         
         for i, card in enumerate(problematic_cards, 1):
             print(f"\n📝 Card {i}/{len(problematic_cards)}")
@@ -215,35 +218,44 @@ class ManualCardOptimizer:
             print(f"Q: {new_question}")
             print(f"A: {new_answer}")
             
-            # Update the card
-            update_response = self.anki_request("updateNoteFields", {
-                "note": {
-                    "id": card["note_id"],
-                    "fields": {
-                        "Question": new_question,
-                        "Answer": new_answer,
-                        "Priority": card["priority"],
-                        "Chapter": card["chapter"],
-                        "Clinical": card["clinical"]
-                    }
-                }
-            })
-            
-            if update_response.get("error"):
-                print(f"❌ Error updating card: {update_response['error']}")
-            else:
-                print("✅ Updated successfully!")
-                fixed_count += 1
-            
             print("-" * 60)
+            
+            updater.stage(card["note_id"], {"Question": new_question, "Answer": new_answer}, card["fields"])
+        
+        # Send only the changed fields, batched and verified
+        result = updater.flush()
+        for note_id, error in result["failed"].items():
+            print(f"❌ Error updating note {note_id}: {error}")
+        fixed_count += len(result["updated"])
         
         print(f"\n🎉 MANUAL OPTIMIZATION COMPLETE!")
         print(f"✅ Successfully optimized: {fixed_count}/{len(problematic_cards)} cards")
+        print(self.anki.report())
         
         return fixed_count
 
+def register_rules(register):
+    """Register the format checks with the shared rule engine (rule_engine.py --rules)"""
+    def detect(fields):
+        q_text, a_text = fields_to_text([fields.get("Question", ""), fields.get("Answer", "")])
+        issues = ManualCardOptimizer.detect_issues(q_text, a_text)
+        if issues:
+            return {"question": q_text, "answer": a_text, "issues": issues}
+        return None
+    
+    def fix(fields, finding):
+        new_question, new_answer = ManualCardOptimizer.optimize_card_content(finding)
+        return {"Question": new_question, "Answer": new_answer}
+    
+    register("format_problems", detect, fix, priority=50,
+             description="Question format, figure references, verbosity (manual optimizer)")
+
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Optimize card format for memory retention")
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+    
     print("🚀 MANUAL CARD OPTIMIZER")
     print("Applying memory retention principles to each card")
     print("=" * 50)
@@ -258,6 +270,12 @@ def main():
     
     print("✅ AnkiConnect connected")
     
+    # Finish or repeat a saved fix run without re-scanning
+    result = run_saved_plan("manual_optimizer", optimizer.anki, args)
+    if result is not None:
+        print(f"✅ Applied {len(result['updated'])} saved fixes ({len(result['failed'])} failed)")
+        return
+    
     # Fix cards manually
     fixed_count = optimizer.manual_fix_cards()
     
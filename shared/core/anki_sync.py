@@ -0,0 +1,316 @@
+"""
+Anki Sync - Push a built deck straight into a running Anki via AnkiConnect.
+
+Instead of writing a full .apkg and importing it by hand, the sync exporter
+matches the builder's processed cards with the notes already in Anki by
+card identity (the normalized front, see deck_builder.card_identity). New
+cards are created with batched ``addNotes``, changed fields are written in
+place with verified batched updates, and notes can optionally be moved into
+per-priority subdecks. Existing notes are never deleted or re-created, so
+their review history is kept.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from shared.core.deck_builder import BaseDeckBuilder, CourseDeckBuilder, NOTE_MODEL_NAME, card_identity
+
+# The AnkiConnect client and helpers live with the maintenance tools
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+from anki_connect import AnkiConnectClient, AnkiConnectError
+from fetch_pipeline import PipelinedFetcher
+from note_updater import BulkNoteUpdater, field_values
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AnkiDeckSync:
+    """Diffs built cards against a live Anki deck and applies the difference."""
+
+    def __init__(self, builder: BaseDeckBuilder, client: Optional[AnkiConnectClient] = None,
+                 priority_subdecks: bool = False, batch_size: int = 500):
+        """
+        Args:
+            builder: Deck builder whose course, deck name and note model are synced
+            client: AnkiConnect client (a default client if None)
+            priority_subdecks: Place cards in "<deck>::<Priority> Priority"
+                subdecks, moving existing notes whose priority changed
+            batch_size: Notes per addNotes / update batch
+        """
+        self.builder = builder
+        self.client = client or AnkiConnectClient()
+        self.priority_subdecks = priority_subdecks
+        self.batch_size = max(1, batch_size)
+        self.deck_name = builder.course_config.get('course_name', f"Course {builder.course_path.name}")
+
+    def target_deck(self, card: Dict) -> str:
+        """Deck a card belongs in."""
+        if not self.priority_subdecks:
+            return self.deck_name
+        priority = str(card.get('priority', 'medium')).lower()
+        if priority not in ('high', 'medium', 'low'):
+            priority = 'medium'
+        return f"{self.deck_name}::{priority.title()} Priority"
+
+    def fetch_existing(self) -> Dict[str, Dict]:
+        """
+        Load the deck's notes from Anki, keyed by card identity.
+
+        Returns:
+            Dict mapping identity -> notesInfo entry (with a 'deck' key added
+            when priority subdecks are used)
+
+        Raises:
+            AnkiConnectError: If some notes could not be loaded; planning
+                without them would add duplicates of those notes
+        """
+        query = f'deck:"{self.deck_name}" note:"{NOTE_MODEL_NAME}"'
+        note_ids = self.client.invoke('findNotes', query=query) or []
+
+        fetcher = PipelinedFetcher(self.client, 'notesInfo', 'notes')
+        notes = fetcher.fetch_all(note_ids)
+        if fetcher.stats['failed_ids']:
+            raise AnkiConnectError(f"notesInfo failed for {len(fetcher.stats['failed_ids'])} notes "
+                                   f"in {self.deck_name}; not planning a sync from a partial deck")
+
+        existing = {}
+        duplicates = 0
+        for note in notes:
+            if not note or 'Front' not in note.get('fields', {}):
+                continue
+            key = card_identity(note['fields']['Front']['value'])
+            if key in existing:
+                duplicates += 1
+                continue
+            existing[key] = note
+
+        if duplicates:
+            logger.warning(f"{duplicates} notes in {self.deck_name} share a front with another note; "
+                           f"only the first of each is synced")
+
+        if self.priority_subdecks and existing:
+            decks = sorted({self.target_deck({'priority': p}) for p in ('high', 'medium', 'low')})
+            responses = self.client.multi(('findNotes', {'query': f'deck:"{deck}"'}) for deck in decks)
+            deck_of = {}
+            for deck, response in zip(decks, responses):
+                for note_id in response.get('result') or []:
+                    deck_of[note_id] = deck
+            for note in existing.values():
+                note['deck'] = deck_of.get(note['noteId'])
+
+        return existing
+
+    def plan(self, cards: Iterable[Dict]) -> Dict:
+        """
+        Work out what has to change in Anki.
+
+        Args:
+            cards: Processed cards (BaseDeckBuilder.process_cards output)
+
+        Returns:
+            Dict with 'add' (addNotes entries), 'update' (note id -> changed
+            fields), 'move' (deck -> card ids), 'unchanged' and 'orphaned'
+            (notes in Anki with no matching card) counts
+        """
+        existing = self.fetch_existing()
+        plan = {'add': [], 'update': {}, 'move': {}, 'unchanged': 0, 'orphaned': 0}
+        seen = set()
+
+        for card in cards:
+            key = card_identity(card.get('front', ''))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+
+            fields = {
+                'Front': card.get('front', ''),
+                'Back': card.get('back', ''),
+                'Tags': card.get('tags', '')
+            }
+            deck = self.target_deck(card)
+            note = existing.get(key)
+
+            if note is None:
+                plan['add'].append({
+                    'deckName': deck,
+                    'modelName': NOTE_MODEL_NAME,
+                    'fields': fields,
+                    'tags': card.get('tags', '').split(),
+                    'options': {'allowDuplicate': False}
+                })
+                continue
+
+            current = field_values(note['fields'])
+            changes = {name: value for name, value in fields.items()
+                       if name in current and current[name] != value}
+            if changes:
+                plan['update'][note['noteId']] = changes
+
+            moved = self.priority_subdecks and note.get('deck') != deck
+            if moved:
+                plan['move'].setdefault(deck, []).extend(note.get('cards', []))
+
+            if not changes and not moved:
+                plan['unchanged'] += 1
+
+        plan['orphaned'] = len(set(existing) - seen)
+        return plan
+
+    def apply(self, plan: Dict) -> Dict:
+        """
+        Send a plan to Anki.
+
+        Returns:
+            Summary dict with 'added', 'add_failed', 'updated', 'update_failed',
+            'moved' (cards), 'unchanged', 'orphaned' and 'seconds'
+        """
+        start = time.perf_counter()
+        summary = {'added': 0, 'add_failed': 0, 'updated': 0, 'update_failed': 0, 'moved': 0,
+                   'unchanged': plan['unchanged'], 'orphaned': plan['orphaned']}
+
+        if plan['add'] or plan['move']:
+            self._ensure_model_and_decks({note['deckName'] for note in plan['add']} | set(plan['move']))
+
+        if plan['add']:
+            chunks = [plan['add'][i:i + self.batch_size] for i in range(0, len(plan['add']), self.batch_size)]
+            responses = self.client.multi(('addNotes', {'notes': chunk}) for chunk in chunks)
+            unresolved = []
+            for chunk, response in zip(chunks, responses):
+                if response.get('error'):
+                    # AnkiConnect adds what it can, then reports the rejected notes as an error
+                    logger.warning(f"addNotes reported an error for a batch of {len(chunk)} notes: "
+                                   f"{response['error']}")
+                    unresolved.extend(chunk)
+                    continue
+                added = sum(1 for note_id in response.get('result') or [] if note_id)
+                summary['added'] += added
+                summary['add_failed'] += len(chunk) - added
+            if unresolved:
+                added = self._count_added(unresolved)
+                summary['added'] += added
+                summary['add_failed'] += len(unresolved) - added
+
+        if plan['update']:
+            updater = BulkNoteUpdater(self.client, batch_size=self.batch_size)
+            for note_id, changes in plan['update'].items():
+                updater.stage(note_id, changes)
+            result = updater.flush()
+            summary['updated'] = len(result['updated'])
+            summary['update_failed'] = len(result['failed'])
+
+        if plan['move']:
+            decks = list(plan['move'])
+            responses = self.client.multi(('changeDeck', {'cards': plan['move'][deck], 'deck': deck}) for deck in decks)
+            for deck, response in zip(decks, responses):
+                if response.get('error'):
+                    logger.warning(f"changeDeck to {deck} failed: {response['error']}")
+                else:
+                    summary['moved'] += len(plan['move'][deck])
+
+        summary['seconds'] = round(time.perf_counter() - start, 2)
+        logger.info(
+            f"Anki sync {self.deck_name}: {summary['added']} added, {summary['updated']} updated, "
+            f"{summary['moved']} cards moved, {summary['unchanged']} unchanged in {summary['seconds']}s"
+        )
+        return summary
+
+    def _count_added(self, notes: List[Dict]) -> int:
+        """
+        How many of these planned notes are in the deck now.
+
+        Used after an addNotes batch errored, since some of its notes may
+        still have been added. Planned notes had no match in the deck, so any
+        match now was added by this sync.
+        """
+        try:
+            present = self.fetch_existing()
+        except AnkiConnectError as e:
+            logger.warning(f"Could not check which of {len(notes)} notes were added: {e}")
+            return 0
+        return sum(1 for note in notes if card_identity(note['fields']['Front']) in present)
+
+    def sync(self, cards: Iterable[Dict], dry_run: bool = False) -> Dict:
+        """Plan and (unless dry_run) apply a sync; returns the plan counts or the apply summary."""
+        plan = self.plan(cards)
+        if dry_run:
+            return {
+                'to_add': len(plan['add']),
+                'to_update': len(plan['update']),
+                'to_move': sum(len(card_ids) for card_ids in plan['move'].values()),
+                'unchanged': plan['unchanged'],
+                'orphaned': plan['orphaned']
+            }
+        return self.apply(plan)
+
+    def _ensure_model_and_decks(self, decks: Iterable[str]):
+        """Create the note model and target decks in Anki if they are missing."""
+        actions = [('modelNames', None)] + [('createDeck', {'deck': deck}) for deck in sorted(decks)]
+        responses = self.client.multi(actions)
+
+        if NOTE_MODEL_NAME not in (responses[0].get('result') or []):
+            spec = self.builder.note_model_spec()
+            response = self.client.request('createModel', {
+                'modelName': spec['name'],
+                'inOrderFields': spec['fields'],
+                'css': spec['css'],
+                'cardTemplates': [
+                    {'Name': template['name'], 'Front': template['qfmt'], 'Back': template['afmt']}
+                    for template in spec['templates']
+                ]
+            })
+            if response.get('error'):
+                logger.warning(f"Could not create note model {NOTE_MODEL_NAME}: {response['error']}")
+
+
+def sync_course(course_path: str, priority_subdecks: bool = False, dry_run: bool = False,
+                content_filename: str = "extracted_content.json") -> Optional[Dict]:
+    """
+    Build a course's cards from extracted content and sync them into Anki.
+
+    Args:
+        course_path: Path to the course directory
+        priority_subdecks: Sort cards into per-priority subdecks
+        dry_run: Only report what would change
+        content_filename: Extracted content file in processing/extracted/
+
+    Returns:
+        Sync summary, or None if there were no valid cards
+    """
+    builder = CourseDeckBuilder(course_path)
+    cards = builder.process_cards(builder.load_extracted_content(content_filename).get('cards', []))
+    if not cards:
+        logger.error("No valid cards to sync")
+        return None
+
+    syncer = AnkiDeckSync(builder, priority_subdecks=priority_subdecks)
+    summary = syncer.sync(cards, dry_run=dry_run)
+    logger.info(syncer.client.report())
+    return summary
+
+
+def main():
+    """Command-line entry point: sync a course's deck into a running Anki."""
+    parser = argparse.ArgumentParser(description='Sync built cards into Anki over AnkiConnect')
+    parser.add_argument('course_path', help='Path to the course directory')
+    parser.add_argument('--priority-subdecks', action='store_true',
+                        help='Place cards in per-priority subdecks and move notes whose priority changed')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    args = parser.parse_args()
+
+    summary = sync_course(args.course_path, args.priority_subdecks, args.dry_run)
+    if summary is None:
+        sys.exit(1)
+
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+    sys.exit(0 if not summary.get('add_failed') and not summary.get('update_failed') else 1)
+
+
+if __name__ == '__main__':
+    main()
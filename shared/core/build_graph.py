@@ -0,0 +1,538 @@
+"""
+Build Graph - Make-style incremental builds for a course.
+
+The extract → build pipeline is split into stages that declare the files
+they read and write:
+
+    discover  content/ listing             -> processing/build/sources.json
+    text      source files                 -> processing/build/text/ (cleaned text)
+    extract   cleaned text                 -> processing/build/objectives.json
+    cards     objectives and definitions   -> processing/extracted/extracted_content.json
+    process   extracted cards              -> processing/build/processed_cards.json
+    csv, apkg, summary, metadata           -> decks/final/
+
+A stage runs only when one of its outputs is missing or one of its inputs
+(including the config layers and the module implementing it) no longer has
+the content hash recorded after its last successful run. Hashes are cached
+by file size and mtime, so checking an unchanged course costs one stat per
+input. A stage that rewrites an identical output does not make its
+dependents stale, and stages whose dependencies are done run concurrently.
+State is kept in processing/build/build_state.json.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from stat import S_ISREG
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import logging
+
+from shared.core import content_extractor, deck_builder, transcript_store
+from shared.core.config_resolver import config_layer_paths
+from shared.core.content_extractor import CourseExtractor
+from shared.core.deck_builder import CourseDeckBuilder, GENANKI_AVAILABLE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+HASH_CHUNK = 1024 * 1024
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """Write a text file unless it already has this content; True if written."""
+    try:
+        if path.read_text(encoding='utf-8') == text:
+            return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return True
+
+
+class Stage:
+    """One node of the build graph."""
+
+    def __init__(self, name: str, deps: List[str], inputs: Callable[[], List[Path]],
+                 outputs: Callable[[], List[Path]], action: Callable[[set], None],
+                 always_run: bool = False):
+        """
+        Args:
+            name: Stage name
+            deps: Stages that must finish first
+            inputs: Returns the files the stage reads (evaluated after deps ran)
+            outputs: Returns the files the stage writes
+            action: Runs the stage; receives the set of inputs that changed
+            always_run: Run on every build (for cheap stages whose real input
+                is a directory listing). The action returns whether it
+                changed its output.
+        """
+        self.name = name
+        self.deps = deps
+        self.inputs = inputs
+        self.outputs = outputs
+        self.action = action
+        self.always_run = always_run
+
+
+class BuildGraph:
+    """Incremental extract → build graph for one course."""
+
+    def __init__(self, course_path: str, max_workers: Optional[int] = None):
+        """
+        Args:
+            course_path: Path to the course directory
+            max_workers: Concurrent stages (defaults to 4)
+        """
+        # State is keyed by path; resolve so relative and absolute invocations share it
+        self.course_path = Path(course_path).resolve()
+        self.max_workers = max_workers or 4
+        self.build_dir = self.course_path / 'processing' / 'build'
+        self.state_path = self.build_dir / 'build_state.json'
+
+        self.sources_path = self.build_dir / 'sources.json'
+        self.text_dir = self.build_dir / 'text'
+        self.text_index_path = self.build_dir / 'text_index.json'
+        self.objectives_path = self.build_dir / 'objectives.json'
+        self.content_path = self.course_path / 'processing' / 'extracted' / 'extracted_content.json'
+        self.processed_path = self.build_dir / 'processed_cards.json'
+
+        self._lock = threading.Lock()
+        self._extractor = None
+        self._builder = None
+        self._processed = None
+        self.state = self._load_state()
+        self.stages = self._define_stages()
+
+    # --- State and hashing -------------------------------------------------
+
+    def _load_state(self) -> Dict:
+        """Read the build state, starting fresh if it is missing or outdated."""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state
+        except (OSError, json.JSONDecodeError):
+            pass
+        return {'version': STATE_VERSION, 'hashes': {}, 'stages': {}}
+
+    def _save_state(self):
+        """Write the build state atomically, forgetting hashes no stage uses any more."""
+        used = {path for record in self.state['stages'].values() for path in record['inputs']}
+        self.state['hashes'] = {path: value for path, value in self.state['hashes'].items() if path in used}
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.state_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(temp_path, self.state_path)
+
+    def file_hash(self, path: Path) -> Optional[str]:
+        """Content hash of a file (None if missing), re-hashed only when its size or mtime changed."""
+        key = str(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if not S_ISREG(stat.st_mode):
+            return None
+
+        with self._lock:
+            cached = self.state['hashes'].get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()
+        with self._lock:
+            self.state['hashes'][key] = [stat.st_size, stat.st_mtime_ns, value]
+        return value
+
+    # --- Components ----------------------------------------------------------
+
+    @property
+    def extractor(self) -> CourseExtractor:
+        with self._lock:
+            if self._extractor is None:
+                self._extractor = CourseExtractor(self.course_path)
+            return self._extractor
+
+    @property
+    def builder(self) -> CourseDeckBuilder:
+        with self._lock:
+            if self._builder is None:
+                self._builder = CourseDeckBuilder(self.course_path)
+            return self._builder
+
+    def _config_inputs(self, module) -> List[Path]:
+        """Config layer files plus the module implementing a stage."""
+        return config_layer_paths(self.course_path) + [Path(module.__file__)]
+
+    def _final_path(self, name: str) -> Path:
+        """A file in decks/final/ named after the course code."""
+        course_code = self.builder.course_config.get('course_code', 'UNKNOWN')
+        return self.course_path / 'decks' / 'final' / name.format(course_code=course_code)
+
+    def _read_json(self, path: Path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _text_paths(self) -> List[Path]:
+        """Cleaned text files listed in the text index."""
+        try:
+            index = self._read_json(self.text_index_path)
+        except (OSError, json.JSONDecodeError):
+            return []
+        return [self.text_dir / name for name in index.values() if name]
+
+    def _processed_cards(self) -> List[Dict]:
+        """Processed cards, loaded once per build."""
+        with self._lock:
+            if self._processed is None:
+                self._processed = self._read_json(self.processed_path)
+            return self._processed
+
+    # --- Stages --------------------------------------------------------------
+
+    def _define_stages(self) -> Dict[str, Stage]:
+        """The course's stages, in dependency order."""
+        stages = [
+            Stage('discover', [], lambda: [], lambda: [self.sources_path],
+                  self._discover, always_run=True),
+            Stage('text', ['discover'],
+                  lambda: [self.sources_path] + self._source_paths() + self._config_inputs(content_extractor),
+                  lambda: [self.text_index_path] + self._text_paths(),
+                  self._extract_text),
+            Stage('extract', ['text'],
+                  lambda: ([self.text_index_path] + self._text_paths() + self._config_inputs(content_extractor)
+                           + [Path(transcript_store.__file__)]),
+                  lambda: [self.objectives_path],
+                  self._extract_objectives),
+            Stage('cards', ['extract'],
+                  lambda: [self.objectives_path] + self._config_inputs(content_extractor),
+                  lambda: [self.content_path],
+                  self._generate_cards),
+            Stage('process', ['cards'],
+                  lambda: [self.content_path] + self._config_inputs(deck_builder),
+                  lambda: [self.processed_path],
+                  self._process_cards),
+            Stage('csv', ['process'],
+                  lambda: [self.processed_path] + self._config_inputs(deck_builder),
+                  lambda: [self._final_path("{course_code}_Complete_AnkiDeck.csv")],
+                  lambda changed: self.builder.export_to_csv(self._processed_cards())),
+            Stage('apkg', ['process'],
+                  lambda: [self.processed_path] + self._config_inputs(deck_builder),
+                  lambda: [self._final_path("{course_code}_Complete_Deck.apkg")] if GENANKI_AVAILABLE else [],
+                  self._export_apkg),
+            Stage('summary', ['process'],
+                  lambda: [self.processed_path] + self._config_inputs(deck_builder),
+                  lambda: [self._final_path("{course_code}_Deck_Summary.md")],
+                  self._write_summary),
+            Stage('metadata', ['process'],
+                  lambda: [self.processed_path] + self._config_inputs(deck_builder),
+                  lambda: [self._final_path("deck_metadata.json")],
+                  self._write_metadata)
+        ]
+        return {stage.name: stage for stage in stages}
+
+    def _source_paths(self) -> List[Path]:
+        """Unique source files from the discover stage, in discovery order."""
+        try:
+            sources = self._read_json(self.sources_path)
+        except (OSError, json.JSONDecodeError):
+            return []
+        return [Path(path) for path in dict.fromkeys(path for files in sources.values() for path in files)]
+
+    def _source_listing(self) -> str:
+        """The discover stage's output: the course's source files by type, as JSON."""
+        sources = {source_type: [str(path) for path in files]
+                   for source_type, files in self.extractor.content_sources.items()}
+        return json.dumps(sources, indent=2)
+
+    def _discover(self, changed: set) -> bool:
+        return write_if_changed(self.sources_path, self._source_listing())
+
+    def _extract_text(self, changed: set):
+        """Extract and clean the sources that changed, reusing the rest."""
+        sources = self._source_paths()
+        # A config or code change affects every source's cleaned text
+        full = bool(changed - set(sources) - {self.sources_path})
+        try:
+            previous = self._read_json(self.text_index_path)
+        except (OSError, json.JSONDecodeError):
+            previous = {}
+
+        index = {}
+        for source in sources:
+            key = str(source)
+            name = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest() + '.txt'
+            if not full and source not in changed and key in previous and (
+                    previous[key] is None or (self.text_dir / name).exists()):
+                index[key] = previous[key]
+                continue
+
+            text = self.extractor.extract_text_from_file(source)
+            if not text:
+                index[key] = None
+                continue
+            write_if_changed(self.text_dir / name, self.extractor.clean_text(text))
+            index[key] = name
+
+        keep = {name for name in index.values() if name}
+        if self.text_dir.exists():
+            for stale in self.text_dir.iterdir():
+                if stale.name not in keep:
+                    stale.unlink()
+        write_if_changed(self.text_index_path, json.dumps(index, indent=2))
+
+    def _extract_objectives(self, changed: set):
+        """Find objectives and definitions, one record per discovered source."""
+        index = self._read_json(self.text_index_path)
+        sources = self._read_json(self.sources_path)
+        text_paths = {self.text_dir / name for name in index.values() if name}
+        per_text = {}
+        records = []
+
+        # Reuse the results of unchanged texts unless the rules or code changed
+        if not changed - text_paths - {self.text_index_path} and self.objectives_path.exists():
+            for record in self._read_json(self.objectives_path):
+                name = index.get(record['source_file']['path'])
+                if name and self.text_dir / name not in changed:
+                    per_text[name] = (record['source_file']['text_length'],
+                                      record['learning_objectives'], record['definitions'],
+                                      record.get('definition_ranges'))
+
+        for source_type, files in sources.items():
+            for path in files:
+                name = index.get(path)
+                if not name:
+                    continue
+                if name not in per_text:
+                    text = (self.text_dir / name).read_text(encoding='utf-8')
+                    # Timestamped transcripts are extracted segment by segment
+                    timed = self.extractor.extract_timed_definitions(Path(path))
+                    definitions, source_ranges = timed if timed else (self.extractor.extract_definitions(text), None)
+                    per_text[name] = (len(text), self.extractor.extract_learning_objectives(text),
+                                      definitions, source_ranges)
+                text_length, objectives, definitions, source_ranges = per_text[name]
+                record = {
+                    'learning_objectives': objectives,
+                    'definitions': definitions,
+                    'source_file': {
+                        'path': path,
+                        'type': source_type,
+                        'text_length': text_length,
+                        'objectives_found': len(objectives),
+                        'definitions_found': len(definitions)
+                    }
+                }
+                if source_ranges:
+                    record['definition_ranges'] = source_ranges
+                records.append(record)
+
+        write_if_changed(self.objectives_path, json.dumps(records, indent=2, ensure_ascii=False))
+
+    def _generate_cards(self, changed: set):
+        """Turn objectives and definitions into cards (extract_all_content's format)."""
+        records = self._read_json(self.objectives_path)
+        extracted = {
+            'learning_objectives': [],
+            'definitions': [],
+            'key_concepts': [],
+            'cards': [],
+            'source_files': []
+        }
+        definition_ranges = []
+        for record in records:
+            extracted['learning_objectives'].extend(record['learning_objectives'])
+            extracted['definitions'].extend(record['definitions'])
+            definition_ranges.extend(record.get('definition_ranges') or [None] * len(record['definitions']))
+            extracted['source_files'].append(record['source_file'])
+
+        extracted['cards'].extend(self.extractor.generate_cards_from_objectives(extracted['learning_objectives']))
+        extracted['cards'].extend(self.extractor.generate_cards_from_definitions(extracted['definitions'],
+                                                                                 definition_ranges))
+
+        write_if_changed(self.content_path, json.dumps(extracted, indent=2, ensure_ascii=False))
+        logger.info(f"Extraction complete: {len(extracted['cards'])} cards generated")
+
+    def _process_cards(self, changed: set):
+        content = self._read_json(self.content_path)
+        cards = self.builder.process_cards(content.get('cards', []))
+        if not cards:
+            raise ValueError("No valid cards after processing")
+        write_if_changed(self.processed_path, json.dumps(cards, ensure_ascii=False))
+        with self._lock:
+            self._processed = cards
+
+    def _export_apkg(self, changed: set):
+        cards = self._processed_cards()
+        if len(cards) > self.builder.config['deck_settings'].get('max_cards_per_deck', len(cards)):
+            self.builder.export_to_apkg_sharded(cards)
+        else:
+            self.builder.export_to_apkg(cards)
+
+    def _write_summary(self, changed: set):
+        cards = self._processed_cards()
+        self.builder._generate_deck_summary(cards, self.builder.generate_deck_statistics(cards))
+
+    def _write_metadata(self, changed: set):
+        cards = self._processed_cards()
+        self.builder.save_deck_metadata(cards, self.builder.generate_deck_statistics(cards))
+
+    # --- Scheduling ----------------------------------------------------------
+
+    def check(self, stage: Stage, force: bool = False):
+        """
+        Decide whether a stage must run.
+
+        Returns:
+            Tuple of (reason or None if up to date, input hashes, changed inputs)
+        """
+        hashes = {str(path): self.file_hash(path) for path in stage.inputs()}
+        record = self.state['stages'].get(stage.name)
+        recorded = record['inputs'] if record else {}
+        changed = {Path(path) for path, digest in hashes.items() if recorded.get(path) != digest}
+        changed |= {Path(path) for path in recorded if path not in hashes}
+
+        if force:
+            return 'forced', hashes, {Path(path) for path in hashes}
+        if stage.always_run:
+            return 'always', hashes, changed
+        if record is None:
+            return 'never built', hashes, changed
+        missing = [path for path in stage.outputs() if not path.exists()]
+        if missing:
+            return f"missing {missing[0].name}", hashes, changed
+        if changed:
+            return f"changed {sorted(changed)[0].name}", hashes, changed
+        return None, hashes, changed
+
+    def _run_stage(self, stage: Stage, force: bool) -> Dict:
+        """Check and (if stale) run one stage."""
+        start = time.perf_counter()
+        reason, hashes, changed = self.check(stage, force)
+        if reason is None:
+            return {'status': 'up to date', 'seconds': time.perf_counter() - start}
+
+        wrote = stage.action(changed)
+        with self._lock:
+            self.state['stages'][stage.name] = {'inputs': hashes}
+        if stage.always_run and not wrote:
+            return {'status': 'up to date', 'seconds': time.perf_counter() - start}
+        return {'status': 'ran', 'reason': reason, 'seconds': time.perf_counter() - start}
+
+    def run(self, force: bool = False) -> Dict[str, Dict]:
+        """
+        Bring every stage up to date.
+
+        Args:
+            force: Rerun all stages
+
+        Returns:
+            Dict mapping stage name -> {'status': 'ran' | 'up to date' |
+            'failed' | 'skipped', 'seconds', ...}
+        """
+        results: Dict[str, Dict] = {}
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if any(results.get(dep, {}).get('status') in ('failed', 'skipped') for dep in stage.deps):
+                        results[name] = {'status': 'skipped', 'seconds': 0.0}
+                        del pending[name]
+                    elif all(dep in results for dep in stage.deps):
+                        running[executor.submit(self._run_stage, stage, force)] = name
+                        del pending[name]
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Stage {name} failed: {e}")
+                        with self._lock:
+                            self.state['stages'].pop(name, None)
+                        results[name] = {'status': 'failed', 'error': str(e), 'seconds': 0.0}
+
+        self._save_state()
+        return {name: results[name] for name in self.stages}
+
+    def stale_stages(self) -> Dict[str, str]:
+        """
+        Stages a build would run, without running anything or saving state.
+
+        Stages after a stale stage are reported as stale too, since their
+        inputs are about to change.
+
+        Returns:
+            Dict mapping stale stage name -> reason
+        """
+        stale = {}
+        for name, stage in self.stages.items():
+            if stage.always_run:
+                # discover: compare a fresh listing with the stored one, unwritten
+                try:
+                    listed = self.sources_path.read_text(encoding='utf-8')
+                except OSError:
+                    listed = None
+                if listed != self._source_listing():
+                    stale[name] = 'new listing'
+                continue
+            upstream = [dep for dep in stage.deps if dep in stale]
+            if upstream:
+                stale[name] = f"after {upstream[0]}"
+                continue
+            reason, _, _ = self.check(stage)
+            if reason:
+                stale[name] = reason
+        return stale
+
+
+def main():
+    """Command-line entry point: incrementally build a single course."""
+    parser = argparse.ArgumentParser(description='Incrementally extract and build a course')
+    parser.add_argument('course_path', help='Path to the course directory')
+    parser.add_argument('--force', action='store_true', help='Rebuild every stage')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the stages that are stale')
+    parser.add_argument('--workers', type=int, help='Concurrent stages')
+    args = parser.parse_args()
+
+    graph = BuildGraph(args.course_path, args.workers)
+    start = time.perf_counter()
+
+    if args.dry_run:
+        stale = graph.stale_stages()
+        if not stale:
+            print("All stages up to date.")
+        for name, reason in stale.items():
+            print(f"  - {name}: stale ({reason})")
+        sys.exit(0)
+
+    results = graph.run(force=args.force)
+    for name, result in results.items():
+        detail = f" ({result['reason']})" if 'reason' in result else ""
+        print(f"  - {name}: {result['status']} in {result['seconds']:.2f}s{detail}")
+    print(f"Total: {time.perf_counter() - start:.2f}s")
+    sys.exit(0 if all(result['status'] in ('ran', 'up to date') for result in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
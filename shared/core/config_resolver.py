@@ -0,0 +1,184 @@
+"""
+Config Resolver - Layered, memoised configuration for extractors and builders.
+
+Settings are merged key by key, later layers winning:
+
+    1. config/default_settings.json
+    2. the course's template config from config/templates.json
+       (named by "template_used" in the course config)
+    3. the course's course_config.json
+    4. per-run overrides passed by the caller
+
+Parsed files and merged results are memoised per process and re-read only
+when a layer file's mtime changes, so building many courses in one process
+does not repeat config I/O. Regex pattern lists from the config are compiled
+once and shared between components.
+"""
+
+import copy
+import json
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONFIG_DIR = Path(__file__).parent.parent.parent / 'config'
+DEFAULT_SETTINGS_PATH = CONFIG_DIR / 'default_settings.json'
+TEMPLATES_PATH = CONFIG_DIR / 'templates.json'
+
+# Course config locations, in lookup order (config/ for new courses, root for legacy ones)
+COURSE_CONFIG_LOCATIONS = ('config/course_config.json', 'course_config.json')
+
+_lock = threading.Lock()
+_files: Dict[Path, Tuple[Optional[float], Any]] = {}
+_resolved: Dict[Tuple[str, str], Tuple[Tuple, Dict]] = {}
+
+
+def _mtime(path: Optional[Path]) -> Optional[float]:
+    """A file's mtime, or None if there is no such file."""
+    if path is None:
+        return None
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def deep_merge(base: Dict, override: Optional[Dict]) -> Dict:
+    """
+    Merge ``override`` into a copy of ``base``.
+
+    Nested dicts are merged recursively; any other value (including lists)
+    in ``override`` replaces the one in ``base``.
+    """
+    merged = dict(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_json(path: Path) -> Optional[Any]:
+    """
+    Parsed contents of a JSON file, memoised until its mtime changes.
+
+    Returns:
+        The shared parsed object (do not modify it), or None if the file is
+        missing or invalid
+    """
+    path = Path(path)
+    mtime = _mtime(path)
+    with _lock:
+        cached = _files.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    data = None
+    if mtime is not None:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load config {path}: {e}")
+
+    with _lock:
+        _files[path] = (mtime, data)
+    return data
+
+
+def find_course_config(course_path: Path) -> Optional[Path]:
+    """Locate a course's config file, if it has one."""
+    for location in COURSE_CONFIG_LOCATIONS:
+        config_path = Path(course_path) / location
+        if config_path.exists():
+            return config_path
+    return None
+
+
+def load_course_config(course_path: Path) -> Dict:
+    """A copy of a course's own config ({} if it has none)."""
+    config_path = find_course_config(course_path)
+    config = load_json(config_path) if config_path else None
+    return copy.deepcopy(config) if isinstance(config, dict) else {}
+
+
+def config_layer_paths(course_path: Optional[Path] = None) -> List[Path]:
+    """The files a course's resolved config is built from (those that exist)."""
+    course_config_path = find_course_config(course_path) if course_path else None
+    return [path for path in (DEFAULT_SETTINGS_PATH, TEMPLATES_PATH, course_config_path)
+            if path is not None and path.exists()]
+
+
+def resolve_config(course_path: Optional[Path] = None, overrides: Optional[Dict] = None) -> Dict:
+    """
+    Merged configuration for a course.
+
+    Args:
+        course_path: Course directory (None for defaults only)
+        overrides: Per-run settings merged on top of everything else
+
+    Returns:
+        A fresh copy of the merged configuration, safe to modify
+    """
+    course_config_path = find_course_config(course_path) if course_path else None
+    layer_paths = (DEFAULT_SETTINGS_PATH, TEMPLATES_PATH, course_config_path)
+    signature = tuple((str(path), _mtime(path)) for path in layer_paths)
+    key = (str(course_path), json.dumps(overrides or {}, sort_keys=True, default=str))
+
+    with _lock:
+        cached = _resolved.get(key)
+    if cached and cached[0] == signature:
+        return copy.deepcopy(cached[1])
+
+    defaults = load_json(DEFAULT_SETTINGS_PATH)
+    if defaults is None:
+        logger.warning(f"Default settings not found at {DEFAULT_SETTINGS_PATH}")
+    course_config = (load_json(course_config_path) if course_config_path else None) or {}
+
+    template_config = {}
+    template_name = course_config.get('template_used')
+    if template_name:
+        templates = (load_json(TEMPLATES_PATH) or {}).get('templates', {})
+        if template_name in templates:
+            template_config = templates[template_name].get('config', {})
+        else:
+            logger.warning(f"Course template '{template_name}' not found in {TEMPLATES_PATH}")
+
+    merged = deep_merge(defaults or {}, template_config)
+    merged = deep_merge(merged, course_config)
+    merged = deep_merge(merged, overrides)
+
+    with _lock:
+        _resolved[key] = (signature, merged)
+    return copy.deepcopy(merged)
+
+
+@lru_cache(maxsize=256)
+def _compile_patterns(patterns: Tuple[str, ...], flags: int) -> Tuple[Pattern, ...]:
+    """Compile a pattern list once per (patterns, flags) combination."""
+    compiled = []
+    for pattern in patterns:
+        try:
+            compiled.append(re.compile(pattern, flags))
+        except re.error as e:
+            logger.warning(f"Skipping invalid pattern {pattern!r}: {e}")
+    return tuple(compiled)
+
+
+def compiled_patterns(patterns: Iterable[str], flags: int = 0) -> List[Pattern]:
+    """Compiled regexes for a config pattern list (invalid patterns are skipped)."""
+    return list(_compile_patterns(tuple(patterns), flags))
+
+
+def clear_cache() -> None:
+    """Forget all memoised files and merged configs."""
+    with _lock:
+        _files.clear()
+        _resolved.clear()
+    _compile_patterns.cache_clear()
@@ -8,14 +8,27 @@ handling common operations like file reading, text processing, and content valid
 import os
 import json
 import re
-from typing import Dict, List, Tuple, Optional
+import argparse
+import threading
+from typing import Dict, Iterator, List, Tuple, Optional
 from pathlib import Path
 import logging
 
+from shared.core.config_resolver import compiled_patterns, load_course_config, resolve_config
+from shared.core.transcript_store import TranscriptStore, open_store
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Used when a config has no extraction_rules.learning_objective_patterns
+LEARNING_OBJECTIVE_PATTERNS = [
+    r'(?i)learning\s+objective[s]?[:\-]?\s*(.+?)(?=\n\n|\Z)',
+    r'(?i)by\s+the\s+end\s+of\s+this\s+chapter[,.]?\s+you\s+will[:\-]?\s*(.+?)(?=\n\n|\Z)',
+    r'(?i)students?\s+will\s+be\s+able\s+to[:\-]?\s*(.+?)(?=\n\n|\Z)',
+    r'(?i)objectives?[:\-]\s*(.+?)(?=\n\n|\Z)'
+]
+
 class BaseContentExtractor:
     """Base class for course content extraction."""
     
@@ -25,37 +38,24 @@ class BaseContentExtractor:
         
         Args:
             course_path: Path to the course directory
-            config: Optional configuration dictionary
+            config: Optional per-run settings, merged over the resolved
+                default/template/course configuration
         """
         self.course_path = Path(course_path)
-        self.config = config or self._load_default_config()
+        self.config = resolve_config(self.course_path, config)
         self.content_sources = {}
         self.extracted_content = {}
         
+        # Precompile the configured patterns (shared across extractors)
+        rules = self.config['extraction_rules']
+        self._exclude_patterns = compiled_patterns(rules['exclude_patterns'], re.MULTILINE)
+        self._objective_patterns = compiled_patterns(
+            rules.get('learning_objective_patterns', LEARNING_OBJECTIVE_PATTERNS), re.DOTALL
+        )
+        
         # Validate course structure
         self._validate_course_structure()
     
-    def _load_default_config(self) -> Dict:
-        """Load default configuration settings."""
-        return {
-            "extraction_rules": {
-                "min_text_length": 10,
-                "max_text_length": 500,
-                "exclude_patterns": [r'^\s*$', r'^[^a-zA-Z]*$'],
-                "content_markers": ['chapter', 'section', 'learning objective', 'definition']
-            },
-            "quality_filters": {
-                "remove_duplicates": True,
-                "filter_incomplete": True,
-                "validate_format": True
-            },
-            "output_settings": {
-                "question_format": "interrogative",
-                "answer_max_length": 200,
-                "include_context": True
-            }
-        }
-    
     def _validate_course_structure(self) -> None:
         """Validate that the course has the required directory structure."""
         required_dirs = ['content', 'decks', 'config']
@@ -67,15 +67,11 @@ class BaseContentExtractor:
                 dir_path.mkdir(parents=True, exist_ok=True)
     
     def load_course_config(self) -> Dict:
-        """Load course-specific configuration."""
-        config_path = self.course_path / 'config' / 'course_config.json'
-        
-        if config_path.exists():
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            logger.warning(f"No course config found at {config_path}")
-            return {}
+        """Load course-specific configuration (memoised by the config resolver)."""
+        course_config = load_course_config(self.course_path)
+        if not course_config:
+            logger.warning(f"No course config found in {self.course_path}")
+        return course_config
     
     def discover_content_sources(self) -> Dict[str, List[Path]]:
         """
@@ -100,10 +96,11 @@ class BaseContentExtractor:
         if textbook_dir.exists():
             sources['textbooks'] = list(textbook_dir.glob('*.pdf'))
         
-        # Find lecture materials
+        # Find lecture materials, including per-lecture folders ("Lecture N - ...")
         lecture_dir = content_dir / 'lectures'
         if lecture_dir.exists():
-            sources['lectures'] = list(lecture_dir.glob('*'))
+            sources['lectures'] = sorted(f for f in lecture_dir.rglob('*')
+                                        if f.is_file() and not f.name.startswith('.'))
             # Separate transcripts
             sources['transcripts'] = [f for f in sources['lectures'] 
                                     if f.suffix.lower() in ['.txt', '.docx']]
@@ -111,7 +108,7 @@ class BaseContentExtractor:
         # Find additional materials
         materials_dir = content_dir / 'materials'
         if materials_dir.exists():
-            sources['materials'] = list(materials_dir.glob('*'))
+            sources['materials'] = [f for f in materials_dir.glob('*') if f.is_file()]
         
         # Also check root content directory
         for file_path in content_dir.glob('*'):
@@ -208,11 +205,60 @@ class BaseContentExtractor:
         text = '\n'.join(line.strip() for line in text.split('\n') if line.strip())
         
         # Apply exclude patterns
-        for pattern in self.config['extraction_rules']['exclude_patterns']:
-            text = re.sub(pattern, '', text, flags=re.MULTILINE)
+        for pattern in self._exclude_patterns:
+            text = pattern.sub('', text)
         
         return text.strip()
     
+    def transcript_store(self, file_path: Path) -> TranscriptStore:
+        """
+        Time-indexed segment store for a .txt transcript.
+        
+        Stores are kept in processing/transcripts/ and rebuilt when the
+        transcript changes.
+        """
+        return open_store(file_path, self.course_path / 'processing' / 'transcripts')
+    
+    def iter_transcript_segments(self, file_path: Path, lecture: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Stream a transcript's segments without loading the whole transcript.
+        
+        Args:
+            file_path: Transcript .txt file
+            lecture: Only this lecture of a combined transcript
+            
+        Yields:
+            Segment dictionaries (lecture, speaker, start/end in
+            milliseconds or None, text)
+        """
+        return self.transcript_store(file_path).iter_segments(lecture)
+    
+    def extract_timed_definitions(self, file_path: Path) -> Optional[Tuple[List[Tuple[str, str]], List[Optional[Dict]]]]:
+        """
+        Extract definitions from a timestamped transcript one segment at a time.
+        
+        Args:
+            file_path: Source file
+            
+        Returns:
+            (definitions, source_ranges), where source_ranges[i] is the
+            lecture time range definitions[i] came from (None for untimed
+            segments), or None if the file is not a timestamped transcript
+        """
+        if file_path.suffix.lower() != '.txt':
+            return None
+        store = self.transcript_store(file_path)
+        if not store.timed:
+            return None
+        
+        definitions = []
+        source_ranges = []
+        for segment in store.iter_segments():
+            found = self.extract_definitions(self.clean_text(segment['text']))
+            definitions.extend(found)
+            source_ranges.extend([store.source_range(segment)] * len(found))
+        return definitions, source_ranges
+    
     def extract_learning_objectives(self, text: str) -> List[str]:
         """
         Extract learning objectives from text.
@@ -226,16 +272,9 @@ class BaseContentExtractor:
         """
         objectives = []
         
-        # Common patterns for learning objectives
-        patterns = [
-            r'(?i)learning\s+objective[s]?[:\-]?\s*(.+?)(?=\n\n|\Z)',
-            r'(?i)by\s+the\s+end\s+of\s+this\s+chapter[,.]?\s+you\s+will[:\-]?\s*(.+?)(?=\n\n|\Z)',
-            r'(?i)students?\s+will\s+be\s+able\s+to[:\-]?\s*(.+?)(?=\n\n|\Z)',
-            r'(?i)objectives?[:\-]\s*(.+?)(?=\n\n|\Z)'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.DOTALL)
+        # Configured learning objective patterns (extraction_rules)
+        for pattern in self._objective_patterns:
+            matches = pattern.findall(text)
             for match in matches:
                 # Split on bullet points or line breaks
                 obj_lines = re.split(r'[•\-*]\s*|^\s*\d+\.?\s*', match, flags=re.MULTILINE)
@@ -340,6 +379,23 @@ class BaseContentExtractor:
         
         logger.info(f"Extracted content saved to {output_path}")
     
+    def save_extracted_content_async(self, content: Dict,
+                                     filename: str = "extracted_content.json") -> threading.Thread:
+        """
+        Save extracted content to a JSON file on a background thread.
+        
+        The content must not be mutated until the returned thread has been
+        joined. The thread is non-daemon, so the file is always completed
+        before the interpreter exits.
+        
+        Returns:
+            The started writer thread
+        """
+        writer = threading.Thread(target=self.save_extracted_content, args=(content, filename),
+                                  name="extracted-content-writer")
+        writer.start()
+        return writer
+    
     def load_extracted_content(self, filename: str = "extracted_content.json") -> Dict:
         """Load previously extracted content from a JSON file."""
         content_path = self.course_path / 'processing' / 'extracted' / filename
@@ -363,10 +419,93 @@ class CourseExtractor(BaseContentExtractor):
         self.course_config = self.load_course_config()
         self.content_sources = self.discover_content_sources()
     
-    def extract_all_content(self) -> Dict:
+    def extract_source(self, file_path: Path, source_type: str) -> Optional[Dict]:
+        """
+        Extract objectives and definitions from a single source file.
+        
+        Args:
+            file_path: Path to the source file
+            source_type: Content type the file was discovered as
+            
+        Returns:
+            Dictionary with the file's objectives, definitions and source
+            record (plus definition_ranges for timestamped transcripts), or
+            None if no text could be extracted
+        """
+        logger.info(f"Extracting from: {file_path.name}")
+        
+        # Extract text
+        text = self.extract_text_from_file(file_path)
+        if not text:
+            return None
+        
+        # Clean text
+        clean_text = self.clean_text(text)
+        
+        # Extract learning objectives and definitions (per segment for timestamped transcripts)
+        objectives = self.extract_learning_objectives(clean_text)
+        timed = self.extract_timed_definitions(file_path)
+        definitions, source_ranges = timed if timed else (self.extract_definitions(clean_text), None)
+        
+        source = {
+            'learning_objectives': objectives,
+            'definitions': definitions,
+            'source_file': {
+                'path': str(file_path),
+                'type': source_type,
+                'text_length': len(clean_text),
+                'objectives_found': len(objectives),
+                'definitions_found': len(definitions)
+            }
+        }
+        if source_ranges:
+            source['definition_ranges'] = source_ranges
+        return source
+    
+    def iter_source_content(self) -> Iterator[Dict]:
+        """
+        Extract content one source file at a time.
+        
+        Yields:
+            Per-file results from extract_source, in discovery order
+        """
+        for source_type, files in self.content_sources.items():
+            logger.info(f"Processing {len(files)} {source_type} files...")
+            
+            for file_path in files:
+                source = self.extract_source(file_path, source_type)
+                if source:
+                    yield source
+    
+    def iter_cards(self) -> Iterator[Dict]:
+        """
+        Stream cards as each source file is processed.
+        
+        Unlike extract_all_content, nothing is accumulated across sources,
+        so the first cards are available as soon as the first file has been
+        extracted. Pass the result to CourseDeckBuilder.build_streaming_deck.
+        
+        Yields:
+            Card dictionaries
+        """
+        card_count = 0
+        
+        for source in self.iter_source_content():
+            cards = self.generate_cards_from_objectives(source['learning_objectives'])
+            cards.extend(self.generate_cards_from_definitions(source['definitions'],
+                                                              source.get('definition_ranges')))
+            card_count += len(cards)
+            yield from cards
+        
+        logger.info(f"Streaming extraction complete: {card_count} cards generated")
+    
+    def extract_all_content(self, save: bool = True) -> Dict:
         """
         Extract content from all available sources.
         
+        Args:
+            save: Write the result to processing/extracted/ before returning
+            
         Returns:
             Dictionary containing all extracted content
         """
@@ -377,58 +516,43 @@ class CourseExtractor(BaseContentExtractor):
             'cards': [],
             'source_files': []
         }
+        definition_ranges = []
         
         # Process each content source
-        for source_type, files in self.content_sources.items():
-            logger.info(f"Processing {len(files)} {source_type} files...")
-            
-            for file_path in files:
-                logger.info(f"Extracting from: {file_path.name}")
-                
-                # Extract text
-                text = self.extract_text_from_file(file_path)
-                if not text:
-                    continue
-                
-                # Clean text
-                clean_text = self.clean_text(text)
-                
-                # Extract learning objectives
-                objectives = self.extract_learning_objectives(clean_text)
-                extracted['learning_objectives'].extend(objectives)
-                
-                # Extract definitions
-                definitions = self.extract_definitions(clean_text)
-                extracted['definitions'].extend(definitions)
-                
-                # Track source file
-                extracted['source_files'].append({
-                    'path': str(file_path),
-                    'type': source_type,
-                    'text_length': len(clean_text),
-                    'objectives_found': len(objectives),
-                    'definitions_found': len(definitions)
-                })
+        for source in self.iter_source_content():
+            extracted['learning_objectives'].extend(source['learning_objectives'])
+            extracted['definitions'].extend(source['definitions'])
+            definition_ranges.extend(source.get('definition_ranges') or [None] * len(source['definitions']))
+            extracted['source_files'].append(source['source_file'])
         
         # Generate cards from objectives
         objective_cards = self.generate_cards_from_objectives(extracted['learning_objectives'])
         extracted['cards'].extend(objective_cards)
         
         # Generate cards from definitions
-        definition_cards = self.generate_cards_from_definitions(extracted['definitions'])
+        definition_cards = self.generate_cards_from_definitions(extracted['definitions'], definition_ranges)
         extracted['cards'].extend(definition_cards)
         
         # Save extracted content
-        self.save_extracted_content(extracted)
+        if save:
+            self.save_extracted_content(extracted)
         
         logger.info(f"Extraction complete: {len(extracted['cards'])} cards generated")
         return extracted
     
-    def generate_cards_from_definitions(self, definitions: List[Tuple[str, str]]) -> List[Dict]:
-        """Generate flashcards from term-definition pairs."""
+    def generate_cards_from_definitions(self, definitions: List[Tuple[str, str]],
+                                        source_ranges: Optional[List[Optional[Dict]]] = None) -> List[Dict]:
+        """
+        Generate flashcards from term-definition pairs.
+        
+        Args:
+            definitions: (term, definition) pairs
+            source_ranges: Optional lecture time range per definition; cards
+                with one get a source_range pointing back to the lecture
+        """
         cards = []
         
-        for term, definition in definitions:
+        for i, (term, definition) in enumerate(definitions):
             card = {
                 'front': f"What is {term}?",
                 'back': definition,
@@ -436,6 +560,21 @@ class CourseExtractor(BaseContentExtractor):
                 'type': 'basic',
                 'source': 'definition'
             }
+            if source_ranges and source_ranges[i]:
+                card['source_range'] = dict(source_ranges[i])
             cards.append(card)
         
-        return cards
\ No newline at end of file
+        return cards
+
+
+def main():
+    """Command-line entry point: extract content for a single course."""
+    parser = argparse.ArgumentParser(description='Extract course content into processing/extracted/')
+    parser.add_argument('course_path', help='Path to the course directory')
+    args = parser.parse_args()
+    
+    CourseExtractor(args.course_path).extract_all_content()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,13 +6,25 @@ standardized formats, quality validation, and multiple export options.
 """
 
 import os
+import sys
 import json
 import csv
+import argparse
 import uuid
-from typing import Dict, List, Optional, Tuple
+import hashlib
+import itertools
+import sqlite3
+import tempfile
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 import logging
 
+from shared.core.config_resolver import load_course_config, resolve_config
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,6 +37,270 @@ except ImportError:
     GENANKI_AVAILABLE = False
 
 
+class DedupWindow:
+    """
+    Bounded-memory record of recently seen card keys.
+    
+    Keys are stored as 8-byte digests in LRU order, so memory is fixed by
+    max_size no matter how many cards stream through. Duplicates further
+    apart than the window are not detected.
+    """
+    
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._seen = OrderedDict()
+    
+    def check_and_add(self, key: str) -> bool:
+        """Return True if key was already seen, recording it otherwise."""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+        
+        if digest in self._seen:
+            self._seen.move_to_end(digest)
+            return True
+        
+        self._seen[digest] = None
+        if len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+        return False
+
+
+class DeckStatistics:
+    """Incrementally accumulated deck statistics."""
+    
+    def __init__(self):
+        self.total_cards = 0
+        self.card_types = {}
+        self.source_breakdown = {}
+        self.priority_breakdown = {}
+        self._front_length = 0
+        self._back_length = 0
+    
+    def add(self, card: Dict) -> None:
+        """Account for a single card."""
+        self.total_cards += 1
+        self._front_length += len(card.get('front', ''))
+        self._back_length += len(card.get('back', ''))
+        
+        card_type = card.get('type', 'unknown')
+        self.card_types[card_type] = self.card_types.get(card_type, 0) + 1
+        
+        source = card.get('source', 'unknown')
+        self.source_breakdown[source] = self.source_breakdown.get(source, 0) + 1
+        
+        priority = card.get('priority', 'medium')
+        self.priority_breakdown[priority] = self.priority_breakdown.get(priority, 0) + 1
+    
+    def as_dict(self) -> Dict:
+        """Return statistics in the generate_deck_statistics format."""
+        stats = {
+            'total_cards': self.total_cards,
+            'card_types': dict(self.card_types),
+            'source_breakdown': dict(self.source_breakdown),
+            'priority_breakdown': dict(self.priority_breakdown),
+            'avg_front_length': 0,
+            'avg_back_length': 0
+        }
+        
+        if self.total_cards:
+            stats['avg_front_length'] = round(self._front_length / self.total_cards, 1)
+            stats['avg_back_length'] = round(self._back_length / self.total_cards, 1)
+        
+        return stats
+
+
+class CsvDeckWriter:
+    """Append cards to an Anki-importable CSV file as they arrive."""
+    
+    def __init__(self, output_path: Path):
+        self.output_path = output_path
+        self.card_count = 0
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(output_path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        
+        # Write header
+        self._writer.writerow(['Front', 'Back', 'Tags'])
+    
+    def write(self, card: Dict) -> None:
+        """Write a single card row."""
+        self._writer.writerow([
+            card.get('front', ''),
+            card.get('back', ''),
+            card.get('tags', '')
+        ])
+        self.card_count += 1
+    
+    def close(self) -> Path:
+        """Close the file and return its path."""
+        self._file.close()
+        return self.output_path
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ApkgDeckWriter:
+    """
+    Append cards to an Anki package as they arrive.
+    
+    Notes are spooled into the package's SQLite collection every
+    flush_every cards instead of being held in a genanki.Deck until the
+    end, so memory stays flat for large decks.
+    """
+    
+    def __init__(self, output_path: Path, model, deck_id: int, deck_name: str,
+                 flush_every: int = 500, id_start: Optional[int] = None):
+        self.output_path = output_path
+        self.model = model
+        self.deck_id = deck_id
+        self.deck_name = deck_name
+        self.flush_every = flush_every
+        self.card_count = 0
+        self._pending = []
+        
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        dbfile, self._db_path = tempfile.mkstemp(suffix='.anki2')
+        os.close(dbfile)
+        self._conn = sqlite3.connect(self._db_path)
+        self._cursor = self._conn.cursor()
+        self._timestamp = time.time()
+        self._id_gen = itertools.count(id_start or int(self._timestamp * 1000))
+        
+        # Write an empty collection (schema + col row) to append into
+        genanki.Package([]).write_to_db(self._cursor, self._timestamp, self._id_gen)
+    
+    def write(self, card: Dict) -> None:
+        """Queue a single card, flushing to the collection when due."""
+        self._pending.append(genanki.Note(
+            model=self.model,
+            fields=[
+                card.get('front', ''),
+                card.get('back', ''),
+                card.get('tags', '')
+            ],
+            tags=card.get('tags', '').split(),
+            guid=genanki.guid_for(card_identity(card.get('front', '')))
+        ))
+        self.card_count += 1
+        
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Write queued notes into the collection."""
+        deck = genanki.Deck(self.deck_id, self.deck_name)
+        deck.add_model(self.model)
+        for note in self._pending:
+            deck.add_note(note)
+        deck.write_to_db(self._cursor, self._timestamp, self._id_gen)
+        self._conn.commit()
+        self._pending = []
+    
+    def close(self) -> Path:
+        """Finalize the collection and zip it into the .apkg file."""
+        self.flush()
+        self._conn.close()
+        
+        try:
+            with zipfile.ZipFile(self.output_path, 'w') as outzip:
+                outzip.write(self._db_path, 'collection.anki2')
+                outzip.writestr('media', json.dumps({}))
+        finally:
+            os.remove(self._db_path)
+        
+        return self.output_path
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+PRIORITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+NOTE_MODEL_NAME = 'Basic Card Model'
+
+# Spacing between the note/card id ranges of shards written in parallel
+SHARD_ID_STRIDE = 10**7
+
+
+def card_identity(front: str) -> str:
+    """
+    Identity of a card across builds: its front, ignoring case and spacing.
+    
+    Used for duplicate detection, as the note GUID in exported packages (so
+    re-importing a rebuilt deck updates notes instead of duplicating them)
+    and to match built cards with notes already in Anki.
+    """
+    return ' '.join(front.lower().split())
+
+
+def stable_deck_id(deck_name: str) -> int:
+    """Derive a deck ID that is identical across runs and processes."""
+    return int(hashlib.sha1(deck_name.encode('utf-8')).hexdigest()[:12], 16)
+
+
+def _write_shard_package(shard: Dict) -> str:
+    """Write one shard to its own .apkg (runs in a worker process)."""
+    with ApkgDeckWriter(Path(shard['output_path']), shard['model'],
+                        stable_deck_id(shard['deck_name']), shard['deck_name'],
+                        id_start=shard['id_start']) as writer:
+        for card in shard['cards']:
+            writer.write(card)
+    return shard['output_path']
+
+
+def merge_apkg_packages(package_paths: List[Path], output_path: Path) -> Path:
+    """
+    Combine several single-collection .apkg files into one package.
+    
+    Notes, cards and deck definitions are copied into the first package's
+    collection; shards must use disjoint note/card ids.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_paths = []
+        for index, package_path in enumerate(package_paths):
+            db_path = Path(tmp_dir) / f"shard_{index}.anki2"
+            with zipfile.ZipFile(package_path) as package:
+                db_path.write_bytes(package.read('collection.anki2'))
+            db_paths.append(db_path)
+        
+        conn = sqlite3.connect(db_paths[0])
+        decks_json, = conn.execute('SELECT decks FROM col').fetchone()
+        decks = json.loads(decks_json)
+        
+        for db_path in db_paths[1:]:
+            conn.execute('ATTACH DATABASE ? AS shard', (str(db_path),))
+            conn.execute('INSERT INTO notes SELECT * FROM shard.notes')
+            conn.execute('INSERT INTO cards SELECT * FROM shard.cards')
+            shard_decks_json, = conn.execute('SELECT decks FROM shard.col').fetchone()
+            decks.update(json.loads(shard_decks_json))
+            conn.commit()
+            conn.execute('DETACH DATABASE shard')
+        
+        conn.execute('UPDATE col SET decks = ?', (json.dumps(decks),))
+        conn.commit()
+        conn.close()
+        
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(output_path, 'w') as outzip:
+            outzip.write(db_paths[0], 'collection.anki2')
+            outzip.writestr('media', json.dumps({}))
+    
+    return output_path
+
+
+def _remove_if_empty(directory: Path) -> None:
+    """Remove a scratch directory once nothing is left in it."""
+    if directory.is_dir() and not any(directory.iterdir()):
+        directory.rmdir()
+
+
 class BaseDeckBuilder:
     """Base class for Anki deck generation."""
     
@@ -34,52 +310,20 @@ class BaseDeckBuilder:
         
         Args:
             course_path: Path to the course directory
-            config: Optional configuration dictionary
+            config: Optional per-run settings, merged over the resolved
+                default/template/course configuration
         """
         self.course_path = Path(course_path)
-        self.config = config or self._load_default_config()
+        self.config = resolve_config(self.course_path, config)
         self.course_config = self._load_course_config()
         self.cards = []
         self.deck_stats = {}
     
-    def _load_default_config(self) -> Dict:
-        """Load default deck generation settings."""
-        return {
-            "deck_settings": {
-                "model_id": 1607392319,  # Basic model ID
-                "deck_id": None,  # Will be auto-generated
-                "css_styling": True,
-                "enable_cloze": True
-            },
-            "card_quality": {
-                "min_front_length": 10,
-                "max_front_length": 200,
-                "min_back_length": 5,
-                "max_back_length": 500,
-                "remove_duplicates": True,
-                "validate_format": True
-            },
-            "export_options": {
-                "csv_export": True,
-                "apkg_export": True,
-                "include_metadata": True,
-                "split_by_type": False
-            },
-            "tagging": {
-                "include_course_code": True,
-                "include_source": True,
-                "include_priority": True,
-                "format": "{course_code} {chapter} {priority}"
-            }
-        }
-    
     def _load_course_config(self) -> Dict:
-        """Load course-specific configuration."""
-        config_path = self.course_path / 'config' / 'course_config.json'
-        
-        if config_path.exists():
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        """Load course-specific configuration (memoised by the config resolver)."""
+        course_config = load_course_config(self.course_path)
+        if course_config:
+            return course_config
         else:
             return {
                 "course_code": self.course_path.name,
@@ -175,6 +419,34 @@ class BaseDeckBuilder:
         
         return ' '.join(tags)
     
+    def prepare_card(self, card: Dict) -> Optional[Dict]:
+        """
+        Clean, tag and validate a single card.
+        
+        Args:
+            card: Raw card dictionary (left unmodified)
+            
+        Returns:
+            Processed copy of the card, or None if it is invalid
+        """
+        card = dict(card)
+        
+        # Clean text
+        if 'front' in card:
+            card['front'] = self.clean_card_text(card['front'])
+        if 'back' in card:
+            card['back'] = self.clean_card_text(card['back'])
+        
+        # Standardize tags
+        card['tags'] = self.standardize_tags(card)
+        
+        # Validate card
+        if not self.validate_card(card):
+            logger.warning(f"Skipping invalid card: {card.get('front', 'Unknown')}")
+            return None
+        
+        return card
+    
     def process_cards(self, cards: List[Dict]) -> List[Dict]:
         """
         Process and clean a list of cards.
@@ -188,20 +460,9 @@ class BaseDeckBuilder:
         processed_cards = []
         
         for card in cards:
-            # Clean text
-            if 'front' in card:
-                card['front'] = self.clean_card_text(card['front'])
-            if 'back' in card:
-                card['back'] = self.clean_card_text(card['back'])
-            
-            # Standardize tags
-            card['tags'] = self.standardize_tags(card)
-            
-            # Validate card
-            if self.validate_card(card):
+            card = self.prepare_card(card)
+            if card:
                 processed_cards.append(card)
-            else:
-                logger.warning(f"Skipping invalid card: {card.get('front', 'Unknown')}")
         
         # Remove duplicates if configured
         if self.config['card_quality']['remove_duplicates']:
@@ -210,13 +471,47 @@ class BaseDeckBuilder:
         logger.info(f"Processed {len(processed_cards)} valid cards from {len(cards)} input cards")
         return processed_cards
     
+    def iter_processed_cards(self, cards: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Process a stream of cards, deduplicating within a bounded window.
+        
+        Args:
+            cards: Iterable of raw card dictionaries
+            
+        Yields:
+            Processed and validated cards
+        """
+        remove_duplicates = self.config['card_quality']['remove_duplicates']
+        window = DedupWindow(self.config['card_quality'].get('dedup_window', 10000))
+        input_count = 0
+        output_count = 0
+        
+        for card in cards:
+            input_count += 1
+            card = self.prepare_card(card)
+            if not card:
+                continue
+            
+            if remove_duplicates and window.check_and_add(self._card_key(card)):
+                logger.debug(f"Removing duplicate card: {card['front']}")
+                continue
+            
+            output_count += 1
+            yield card
+        
+        logger.info(f"Processed {output_count} valid cards from {input_count} input cards")
+    
+    def _card_key(self, card: Dict) -> str:
+        """Identity used for duplicate detection."""
+        return card_identity(card['front'])
+    
     def remove_duplicate_cards(self, cards: List[Dict]) -> List[Dict]:
         """Remove duplicate cards based on front text."""
         seen_fronts = set()
         unique_cards = []
         
         for card in cards:
-            front_text = card['front'].lower().strip()
+            front_text = self._card_key(card)
             if front_text not in seen_fronts:
                 seen_fronts.add(front_text)
                 unique_cards.append(card)
@@ -254,29 +549,28 @@ class BaseDeckBuilder:
         Returns:
             Path to the created CSV file
         """
-        if not filename:
-            course_code = self.course_config.get('course_code', 'UNKNOWN')
-            filename = f"{course_code}_Complete_AnkiDeck.csv"
+        with self.open_csv_writer(filename) as writer:
+            for card in cards:
+                writer.write(card)
         
-        output_path = self.course_path / 'decks' / 'final' / filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Exported {len(cards)} cards to {writer.output_path}")
+        return writer.output_path
+    
+    def open_csv_writer(self, filename: str = None) -> CsvDeckWriter:
+        """
+        Open an appending CSV writer in the course's final deck directory.
         
-        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            
-            # Write header
-            writer.writerow(['Front', 'Back', 'Tags'])
+        Args:
+            filename: Optional custom filename
             
-            # Write cards
-            for card in cards:
-                front = card.get('front', '')
-                back = card.get('back', '')
-                tags = card.get('tags', '')
-                
-                writer.writerow([front, back, tags])
+        Returns:
+            CsvDeckWriter ready to receive cards
+        """
+        if not filename:
+            course_code = self.course_config.get('course_code', 'UNKNOWN')
+            filename = f"{course_code}_Complete_AnkiDeck.csv"
         
-        logger.info(f"Exported {len(cards)} cards to {output_path}")
-        return output_path
+        return CsvDeckWriter(self.course_path / 'decks' / 'final' / filename)
     
     def export_to_apkg(self, cards: List[Dict], filename: str = None) -> Optional[Path]:
         """
@@ -293,57 +587,182 @@ class BaseDeckBuilder:
             logger.warning("genanki not available. Skipping .apkg export.")
             return None
         
-        if not filename:
-            course_code = self.course_config.get('course_code', 'UNKNOWN')
-            filename = f"{course_code}_Complete_Deck.apkg"
+        with self.open_apkg_writer(filename) as writer:
+            for card_data in cards:
+                writer.write(card_data)
         
-        output_path = self.course_path / 'decks' / 'final' / filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Exported {len(cards)} cards to {writer.output_path}")
+        return writer.output_path
+    
+    def open_apkg_writer(self, filename: str = None, part: int = 1,
+                         id_start: Optional[int] = None) -> Optional[ApkgDeckWriter]:
+        """
+        Open an appending .apkg writer in the course's final deck directory.
         
-        # Create Anki model
-        model = genanki.Model(
-            self.config['deck_settings']['model_id'],
-            'Basic Card Model',
-            fields=[
-                {'name': 'Front'},
-                {'name': 'Back'},
-                {'name': 'Tags'}
-            ],
-            templates=[
+        Args:
+            filename: Optional custom filename
+            part: Part number when a streamed deck rolls over into "::Part N"
+                subdecks; parts after the first go to decks/final/shards
+            id_start: First note/card id (parts need disjoint id ranges)
+            
+        Returns:
+            ApkgDeckWriter ready to receive cards, or None if genanki unavailable
+        """
+        if not GENANKI_AVAILABLE:
+            logger.warning("genanki not available. Skipping .apkg export.")
+            return None
+        
+        course_code = self.course_config.get('course_code', 'UNKNOWN')
+        deck_name = self.course_config.get('course_name', f"Course {self.course_path.name}")
+        output_dir = self.course_path / 'decks' / 'final'
+        
+        if part == 1:
+            filename = filename or f"{course_code}_Complete_Deck.apkg"
+            deck_id = self.config['deck_settings']['deck_id'] or self._generate_deck_id()
+        else:
+            deck_name = f"{deck_name}::Part {part}"
+            filename = f"{course_code}_Part_{part}.apkg"
+            output_dir = output_dir / 'shards'
+            deck_id = stable_deck_id(deck_name)
+        
+        return ApkgDeckWriter(
+            output_dir / filename,
+            self._create_note_model(),
+            deck_id,
+            deck_name,
+            id_start=id_start
+        )
+    
+    def note_model_spec(self) -> Dict:
+        """Name, fields, card templates and CSS of the note model used for exported cards."""
+        return {
+            'name': NOTE_MODEL_NAME,
+            'fields': ['Front', 'Back', 'Tags'],
+            'templates': [
                 {
                     'name': 'Card 1',
                     'qfmt': '{{Front}}',
                     'afmt': '{{FrontSide}}<hr id="answer">{{Back}}',
                 },
             ],
-            css=self._get_card_css() if self.config['deck_settings']['css_styling'] else ''
+            'css': self._get_card_css() if self.config['deck_settings']['css_styling'] else ''
+        }
+    
+    def _create_note_model(self):
+        """Create the Anki note model used for exported cards."""
+        spec = self.note_model_spec()
+        return genanki.Model(
+            self.config['deck_settings']['model_id'],
+            spec['name'],
+            fields=[{'name': name} for name in spec['fields']],
+            templates=spec['templates'],
+            css=spec['css']
         )
+    
+    def shard_cards(self, cards: List[Dict], max_cards_per_deck: Optional[int] = None) -> List[Dict]:
+        """
+        Split cards into subdecks of at most max_cards_per_deck cards.
         
-        # Create deck
-        deck_id = self.config['deck_settings']['deck_id'] or self._generate_deck_id()
-        deck_name = self.course_config.get('course_name', f"Course {self.course_path.name}")
+        Cards are grouped by chapter, ordered by priority within a chapter,
+        and placed under a "Course::Chapter" deck hierarchy. Chapters that
+        overflow are split into "::Part N" subdecks.
         
-        deck = genanki.Deck(deck_id, deck_name)
-        
-        # Add cards to deck
-        for card_data in cards:
-            note = genanki.Note(
-                model=model,
-                fields=[
-                    card_data.get('front', ''),
-                    card_data.get('back', ''),
-                    card_data.get('tags', '')
-                ],
-                tags=card_data.get('tags', '').split()
-            )
-            deck.add_note(note)
+        Args:
+            cards: List of processed card dictionaries
+            max_cards_per_deck: Shard size limit (defaults to deck_settings)
+            
+        Returns:
+            List of shard dictionaries with 'deck_name', 'chapter' and 'cards'
+        """
+        max_cards = max_cards_per_deck or self.config['deck_settings'].get('max_cards_per_deck', 1000)
+        course_name = self.course_config.get('course_name', f"Course {self.course_path.name}")
         
-        # Create package
-        package = genanki.Package(deck)
-        package.write_to_file(str(output_path))
+        chapters = {}
+        for card in cards:
+            chapters.setdefault(str(card.get('chapter', 'General')), []).append(card)
         
-        logger.info(f"Exported {len(cards)} cards to {output_path}")
-        return output_path
+        shards = []
+        for chapter, chapter_cards in chapters.items():
+            chapter_cards.sort(key=lambda c: PRIORITY_ORDER.get(str(c.get('priority', 'medium')).lower(), 1))
+            if chapter == 'General' or chapter.lower().startswith('chapter'):
+                chapter_label = chapter
+            else:
+                chapter_label = f"Chapter {chapter}"
+            chunks = [chapter_cards[i:i + max_cards] for i in range(0, len(chapter_cards), max_cards)]
+            
+            for part, chunk in enumerate(chunks, 1):
+                deck_name = f"{course_name}::{chapter_label}"
+                if len(chunks) > 1:
+                    deck_name += f"::Part {part}"
+                shards.append({'deck_name': deck_name, 'chapter': chapter, 'cards': chunk})
+        
+        return shards
+    
+    def export_to_apkg_sharded(self, cards: List[Dict], max_cards_per_deck: Optional[int] = None,
+                               separate_packages: bool = False,
+                               max_workers: Optional[int] = None) -> List[Path]:
+        """
+        Export cards as chapter subdecks written concurrently by a process pool.
+        
+        Args:
+            cards: List of processed card dictionaries
+            max_cards_per_deck: Shard size limit (defaults to deck_settings)
+            separate_packages: Write one .apkg per shard into decks/final/shards
+                instead of combining them into the complete deck package
+            max_workers: Worker processes (defaults to deck_settings.shard_workers,
+                then the CPU count)
+            
+        Returns:
+            Paths of the written package(s)
+        """
+        if not GENANKI_AVAILABLE:
+            logger.warning("genanki not available. Skipping .apkg export.")
+            return []
+        
+        shards = self.shard_cards(cards, max_cards_per_deck)
+        if not shards:
+            return []
+        
+        course_code = self.course_config.get('course_code', 'UNKNOWN')
+        final_dir = self.course_path / 'decks' / 'final'
+        shard_dir = final_dir / 'shards'
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        
+        model = self._create_note_model()
+        id_base = int(time.time() * 1000)
+        jobs = []
+        for index, shard in enumerate(shards):
+            slug = shard['deck_name'].split('::', 1)[-1].replace('::', '_').replace(' ', '_')
+            jobs.append({
+                'output_path': str(shard_dir / f"{course_code}_{slug}.apkg"),
+                'model': model,
+                'deck_name': shard['deck_name'],
+                'id_start': id_base + index * SHARD_ID_STRIDE,
+                'cards': shard['cards']
+            })
+        
+        workers = max_workers or self.config['deck_settings'].get('shard_workers') or os.cpu_count()
+        workers = max(1, min(workers, len(jobs)))
+        logger.info(f"Writing {len(jobs)} shards of up to "
+                    f"{max(len(job['cards']) for job in jobs)} cards with {workers} workers")
+        
+        if workers == 1:
+            shard_paths = [Path(_write_shard_package(job)) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                shard_paths = [Path(path) for path in executor.map(_write_shard_package, jobs)]
+        
+        if separate_packages:
+            logger.info(f"Exported {len(cards)} cards to {len(shard_paths)} packages in {shard_dir}")
+            return shard_paths
+        
+        output_path = merge_apkg_packages(shard_paths, final_dir / f"{course_code}_Complete_Deck.apkg")
+        for shard_path in shard_paths:
+            shard_path.unlink()
+        _remove_if_empty(shard_dir)
+        
+        logger.info(f"Exported {len(cards)} cards in {len(shards)} subdecks to {output_path}")
+        return [output_path]
     
     def _generate_deck_id(self) -> int:
         """Generate a unique deck ID."""
@@ -396,37 +815,10 @@ class BaseDeckBuilder:
     
     def generate_deck_statistics(self, cards: List[Dict]) -> Dict:
         """Generate statistics about the deck."""
-        stats = {
-            'total_cards': len(cards),
-            'card_types': {},
-            'source_breakdown': {},
-            'priority_breakdown': {},
-            'avg_front_length': 0,
-            'avg_back_length': 0
-        }
-        
-        if not cards:
-            return stats
-        
-        # Calculate averages
-        total_front_length = sum(len(card.get('front', '')) for card in cards)
-        total_back_length = sum(len(card.get('back', '')) for card in cards)
-        
-        stats['avg_front_length'] = round(total_front_length / len(cards), 1)
-        stats['avg_back_length'] = round(total_back_length / len(cards), 1)
-        
-        # Count by type
+        stats = DeckStatistics()
         for card in cards:
-            card_type = card.get('type', 'unknown')
-            stats['card_types'][card_type] = stats['card_types'].get(card_type, 0) + 1
-            
-            source = card.get('source', 'unknown')
-            stats['source_breakdown'][source] = stats['source_breakdown'].get(source, 0) + 1
-            
-            priority = card.get('priority', 'medium')
-            stats['priority_breakdown'][priority] = stats['priority_breakdown'].get(priority, 0) + 1
-        
-        return stats
+            stats.add(card)
+        return stats.as_dict()
     
     def save_deck_metadata(self, cards: List[Dict], stats: Dict) -> None:
         """Save deck metadata and statistics."""
@@ -435,7 +827,7 @@ class BaseDeckBuilder:
             'deck_config': self.config,
             'generation_timestamp': str(Path(__file__).stat().st_mtime),
             'statistics': stats,
-            'card_count': len(cards)
+            'card_count': stats['total_cards']
         }
         
         metadata_path = self.course_path / 'decks' / 'final' / 'deck_metadata.json'
@@ -469,6 +861,18 @@ class CourseDeckBuilder(BaseDeckBuilder):
         # Load extracted content
         content = self.load_extracted_content(content_filename)
         
+        return self.build_deck_from_content(content)
+    
+    def build_deck_from_content(self, content: Dict) -> Tuple[Path, Optional[Path]]:
+        """
+        Build a complete deck from in-memory extracted content.
+        
+        Args:
+            content: Result of CourseExtractor.extract_all_content (not modified)
+            
+        Returns:
+            Tuple of (CSV path, APKG path)
+        """
         if not content or 'cards' not in content:
             logger.error("No cards found in extracted content")
             return None, None
@@ -489,8 +893,12 @@ class CourseDeckBuilder(BaseDeckBuilder):
         # Export to CSV
         csv_path = self.export_to_csv(cards)
         
-        # Export to APKG
-        apkg_path = self.export_to_apkg(cards)
+        # Export to APKG, sharding into chapter subdecks past the size limit
+        if len(cards) > self.config['deck_settings'].get('max_cards_per_deck', len(cards)):
+            apkg_paths = self.export_to_apkg_sharded(cards)
+            apkg_path = apkg_paths[0] if apkg_paths else None
+        else:
+            apkg_path = self.export_to_apkg(cards)
         
         # Log results
         logger.info(f"Deck building complete:")
@@ -504,6 +912,74 @@ class CourseDeckBuilder(BaseDeckBuilder):
         
         return csv_path, apkg_path
     
+    def build_streaming_deck(self, cards: Iterable[Dict]) -> Tuple[Optional[Path], Optional[Path]]:
+        """
+        Build a complete deck from a stream of cards.
+        
+        Cards are cleaned, deduplicated within a bounded window and appended
+        to the CSV and .apkg writers as they arrive, so output starts before
+        extraction finishes and memory does not grow with course size. Once
+        the deck passes max_cards_per_deck the .apkg writer rolls over into
+        "::Part N" subdecks, which are merged into the complete deck package.
+        
+        Args:
+            cards: Iterable of raw cards, e.g. CourseExtractor.iter_cards()
+            
+        Returns:
+            Tuple of (CSV path, APKG path)
+        """
+        stats = DeckStatistics()
+        max_cards = self.config['deck_settings'].get('max_cards_per_deck')
+        id_base = int(time.time() * 1000)
+        csv_writer = self.open_csv_writer()
+        apkg_writer = self.open_apkg_writer(id_start=id_base)
+        part_paths = []
+        
+        try:
+            for card in self.iter_processed_cards(cards):
+                csv_writer.write(card)
+                if apkg_writer:
+                    if max_cards and apkg_writer.card_count >= max_cards:
+                        if not part_paths:
+                            apkg_writer.deck_name += "::Part 1"
+                        part_paths.append(apkg_writer.close())
+                        part = len(part_paths) + 1
+                        apkg_writer = self.open_apkg_writer(
+                            part=part, id_start=id_base + (part - 1) * SHARD_ID_STRIDE)
+                    apkg_writer.write(card)
+                stats.add(card)
+        finally:
+            csv_path = csv_writer.close()
+            if apkg_writer:
+                part_paths.append(apkg_writer.close())
+        
+        apkg_path = part_paths[0] if part_paths else None
+        if len(part_paths) > 1:
+            # Part 1 was written straight to the complete deck path
+            apkg_path = merge_apkg_packages(part_paths, part_paths[0])
+            for part_path in part_paths[1:]:
+                part_path.unlink()
+            _remove_if_empty(part_paths[1].parent)
+            logger.info(f"Merged {len(part_paths)} subdecks of up to {max_cards} cards")
+        
+        if not stats.total_cards:
+            logger.error("No valid cards after processing")
+            return None, None
+        
+        stats = stats.as_dict()
+        self.save_deck_metadata([], stats)
+        
+        # Log results
+        logger.info(f"Streaming deck building complete:")
+        logger.info(f"  Total cards: {stats['total_cards']}")
+        logger.info(f"  CSV export: {csv_path}")
+        if apkg_path:
+            logger.info(f"  APKG export: {apkg_path}")
+        
+        self._generate_deck_summary([], stats)
+        
+        return csv_path, apkg_path
+    
     def build_priority_decks(self, content_filename: str = "extracted_content.json") -> Dict[str, Tuple[Path, Optional[Path]]]:
         """
         Build separate decks for different priority levels.
@@ -598,4 +1074,18 @@ class CourseDeckBuilder(BaseDeckBuilder):
         with open(summary_path, 'w', encoding='utf-8') as f:
             f.write(summary_content)
         
-        logger.info(f"Deck summary saved to {summary_path}")
\ No newline at end of file
+        logger.info(f"Deck summary saved to {summary_path}")
+
+
+def main():
+    """Command-line entry point: build decks from previously extracted content."""
+    parser = argparse.ArgumentParser(description='Build Anki decks from processing/extracted/')
+    parser.add_argument('course_path', help='Path to the course directory')
+    args = parser.parse_args()
+    
+    csv_path, _ = CourseDeckBuilder(args.course_path).build_complete_deck()
+    sys.exit(0 if csv_path else 1)
+
+
+if __name__ == '__main__':
+    main()
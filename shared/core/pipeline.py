@@ -0,0 +1,76 @@
+"""
+Course Pipeline - Run content extraction and deck building in one process.
+
+This module hands the extractor's in-memory result straight to the deck
+builder instead of round-tripping it through processing/extracted/. The
+intermediate JSON is still written, but on a background thread that runs
+alongside deck building rather than in front of it.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+import logging
+
+from shared.core.content_extractor import CourseExtractor
+from shared.core.deck_builder import CourseDeckBuilder
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def extract_and_build(course_path: str, persist_intermediate: bool = True,
+                      streaming: bool = False) -> Tuple[Optional[Path], Optional[Path]]:
+    """
+    Extract a course's content and build its decks without a disk round trip.
+
+    Args:
+        course_path: Path to the course directory
+        persist_intermediate: Also write extracted_content.json as a side
+            output (asynchronously; ignored in streaming mode, where the full
+            content is never held in memory)
+        streaming: Stream cards from extractor to builder as each source is
+            processed instead of extracting everything first
+
+    Returns:
+        Tuple of (CSV path, APKG path)
+    """
+    extractor = CourseExtractor(course_path)
+    builder = CourseDeckBuilder(course_path)
+
+    if streaming:
+        return builder.build_streaming_deck(extractor.iter_cards())
+
+    content = extractor.extract_all_content(save=False)
+
+    writer = None
+    if persist_intermediate:
+        writer = extractor.save_extracted_content_async(content)
+
+    try:
+        return builder.build_deck_from_content(content)
+    finally:
+        if writer:
+            writer.join()
+
+
+def main():
+    """Command-line entry point: extract and build a single course."""
+    parser = argparse.ArgumentParser(description='Extract content and build decks in one pass')
+    parser.add_argument('course_path', help='Path to the course directory')
+    parser.add_argument('--no-intermediate', action='store_true',
+                        help='Skip writing processing/extracted/extracted_content.json')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Stream cards to the deck writers as each source is extracted')
+    args = parser.parse_args()
+
+    csv_path, _ = extract_and_build(args.course_path,
+                                    persist_intermediate=not args.no_intermediate,
+                                    streaming=args.streaming)
+    sys.exit(0 if csv_path else 1)
+
+
+if __name__ == '__main__':
+    main()
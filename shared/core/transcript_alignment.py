@@ -0,0 +1,374 @@
+"""
+Transcript Alignment - Link lecture transcript segments to textbook passages.
+
+The textbook is cut into overlapping passages that record their chapter,
+page (PDF sources) and section. Each passage is reduced to n-word shingles
+of its content words, hashed with a rolling polynomial hash, and added to an
+inverted index (shingle hash -> passages). A transcript segment is scored
+only against the passages that share at least one shingle with it, using a
+cosine similarity of IDF-weighted shingle sets. Aligning a whole semester
+therefore costs about one index lookup per segment shingle, not a pairwise
+comparison of every segment with every passage.
+
+Segments come from the transcript store (shared.core.transcript_store). The
+output links each segment to its best (chapter, page, section, score)
+matches and sums them into a per-chapter emphasis. The emphasis shows which
+textbook material was actually taught, so cards can be prioritised by it.
+"""
+
+import argparse
+import json
+import math
+import re
+import time
+from collections import defaultdict
+from heapq import nlargest
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from shared.core.transcript_store import open_store, read_transcript_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HASH_MODULUS = (1 << 61) - 1
+HASH_BASE = 1000003
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+CHAPTER_PATTERN = re.compile(r'\bCHAPTER\s+(\d{1,2})\b')
+SECTION_PATTERN = re.compile(r'\b(\d{1,2})-(\d{1,2})\s+(?=[A-Z][a-z])')
+
+# Function words plus speech fillers, which carry no topic
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same she should so some such than
+that the their theirs them themselves then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours yourself yourselves
+um uh like yeah okay ok right gonna wanna kind sort know mean really actually thing things going get got
+one two say said see look let lot well oh yes guys go
+""".split())
+
+
+def _singular(token: str) -> str:
+    """Fold simple plurals ("neurons" -> "neuron") so speech and prose match."""
+    if len(token) > 4 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased content words of a text (stopwords and single characters removed)."""
+    return [_singular(token) for token in TOKEN_PATTERN.findall(text.lower().replace('’', "'"))
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+def rolling_shingles(token_ids: List[int], size: int) -> List[int]:
+    """
+    Hashes of every run of size consecutive tokens.
+
+    Each hash is derived from the previous one in constant time (polynomial
+    rolling hash modulo a Mersenne prime), so hashing is linear in the text.
+    """
+    if len(token_ids) < size:
+        return []
+    high = pow(HASH_BASE, size - 1, HASH_MODULUS)
+    value = 0
+    for token_id in token_ids[:size]:
+        value = (value * HASH_BASE + token_id) % HASH_MODULUS
+    hashes = [value]
+    for i in range(size, len(token_ids)):
+        value = ((value - token_ids[i - size] * high) * HASH_BASE + token_ids[i]) % HASH_MODULUS
+        hashes.append(value)
+    return hashes
+
+
+class TextbookIndex:
+    """Inverted shingle index over textbook passages."""
+
+    def __init__(self, shingle_sizes: Tuple[int, ...] = (1, 2), passage_words: int = 120,
+                 min_words: int = 12, max_df: float = 0.1):
+        """
+        Initialize an empty index.
+
+        Args:
+            shingle_sizes: Content words per shingle; single words find the
+                topic, longer shingles reward shared phrasing
+            passage_words: Content words per passage (passages overlap by half)
+            min_words: Fewest content words in a passage or query; shorter
+                blocks (bare headings) and remarks match too loosely
+            max_df: Shingles found in more than this share of passages are
+                too common to look up (they still count in similarity norms)
+        """
+        self.shingle_sizes = tuple(shingle_sizes)
+        self.passage_words = passage_words
+        self.min_words = min_words
+        self.max_df = max_df
+        self.passages: List[Dict] = []
+        self._vocabulary: Dict[str, int] = {}
+        self._passage_shingles: List[set] = []
+        self._chapter: Optional[int] = None
+        self._section: Optional[str] = None
+        self.postings: Dict[int, List[int]] = {}
+        self.idf: Dict[int, float] = {}
+        self.norms: List[float] = []
+        self.unseen_idf = 0.0
+
+    def _token_ids(self, tokens: Iterable[str], grow: bool) -> List[int]:
+        """
+        Vocabulary ids of tokens.
+
+        Unknown tokens are added to the vocabulary if grow is set; otherwise
+        they get temporary ids that no indexed shingle can contain.
+        """
+        ids = []
+        unknown = {}
+        for token in tokens:
+            token_id = self._vocabulary.get(token)
+            if token_id is None:
+                if grow:
+                    token_id = self._vocabulary[token] = len(self._vocabulary) + 1
+                else:
+                    token_id = unknown.setdefault(token, len(self._vocabulary) + len(unknown) + 1)
+            ids.append(token_id)
+        return ids
+
+    def _shingles(self, token_ids: List[int]) -> set:
+        """All shingle hashes of a token sequence, for every configured size."""
+        shingles = set()
+        for size in self.shingle_sizes:
+            shingles.update(rolling_shingles(token_ids, size))
+        return shingles
+
+    def _add_block(self, text: str, page: Optional[int]):
+        """Cut one chapter/section block into overlapping passages."""
+        token_ids = self._token_ids(tokenize(text), grow=True)
+        if len(token_ids) < self.min_words:
+            return
+        step = max(self.passage_words // 2, 1)
+        for first in range(0, max(len(token_ids) - step, 1), step):
+            window = token_ids[first:first + self.passage_words]
+            self.passages.append({'chapter': self._chapter, 'page': page, 'section': self._section})
+            self._passage_shingles.append(self._shingles(window))
+
+    def add_text(self, text: str, page: Optional[int] = None):
+        """
+        Add textbook text, tracking "CHAPTER N" and "N-M Title" headings.
+
+        Args:
+            text: Text of the whole book or of one page (call in page order)
+            page: Page number of the text, if known
+        """
+        markers = sorted([(match.start(), 'chapter', match) for match in CHAPTER_PATTERN.finditer(text)] +
+                         [(match.start(), 'section', match) for match in SECTION_PATTERN.finditer(text)],
+                         key=lambda marker: marker[0])
+        position = 0
+        for start, kind, match in markers:
+            if kind == 'section' and self._chapter is not None and int(match.group(1)) != self._chapter:
+                continue  # A cross-reference to another chapter's section
+            self._add_block(text[position:start], page)
+            position = start
+            if kind == 'chapter':
+                self._chapter = int(match.group(1))
+                self._section = None
+            else:
+                self._section = f"{match.group(1)}-{match.group(2)}"
+        self._add_block(text[position:], page)
+
+    def add_file(self, path: Path):
+        """
+        Add a textbook file: a PDF (one call per page) or a text file.
+
+        Text files are split into pages at form feeds, if they contain any.
+        """
+        path = Path(path)
+        self._chapter = self._section = None
+        if path.suffix.lower() == '.pdf':
+            try:
+                import fitz  # PyMuPDF
+            except ImportError:
+                logger.error("PyMuPDF not installed. Cannot index PDF textbooks.")
+                return
+            with fitz.open(path) as doc:
+                for page_number, page in enumerate(doc, start=1):
+                    self.add_text(page.get_text(), page_number)
+            return
+
+        text = read_transcript_text(path)
+        pages = text.split('\f')
+        for page_number, page_text in enumerate(pages, start=1):
+            self.add_text(page_text, page_number if len(pages) > 1 else None)
+
+    def finalize(self):
+        """Build the inverted index and similarity norms once all text is added."""
+        document_frequency = defaultdict(int)
+        for shingles in self._passage_shingles:
+            for shingle in shingles:
+                document_frequency[shingle] += 1
+
+        count = len(self._passage_shingles)
+        self.idf = {shingle: math.log((count + 1) / (df + 1)) + 1.0
+                    for shingle, df in document_frequency.items()}
+        self.unseen_idf = math.log(count + 1) + 1.0
+        self.norms = [math.sqrt(sum(self.idf[shingle] ** 2 for shingle in shingles)) or 1.0
+                      for shingles in self._passage_shingles]
+
+        limit = max(self.max_df * count, 2)
+        postings = defaultdict(list)
+        for passage, shingles in enumerate(self._passage_shingles):
+            for shingle in shingles:
+                if document_frequency[shingle] <= limit:
+                    postings[shingle].append(passage)
+        self.postings = dict(postings)
+        self._passage_shingles = []
+        logger.info(f"Indexed {count} textbook passages ({len(self.postings)} searchable shingles)")
+
+    def query(self, text: str, top: int = 3, min_score: float = 0.03) -> List[Dict]:
+        """
+        The textbook passages most similar to a piece of text.
+
+        Args:
+            text: Query text (e.g. one transcript segment)
+            top: Maximum number of matches
+            min_score: Lowest cosine similarity reported
+
+        Returns:
+            Matches (chapter, page, section, score), best first
+        """
+        token_ids = self._token_ids(tokenize(text), grow=False)
+        if len(token_ids) < self.min_words:
+            return []
+        shingles = self._shingles(token_ids)
+        if not shingles:
+            return []
+
+        scores = defaultdict(float)
+        norm = 0.0
+        for shingle in shingles:
+            weight = self.idf.get(shingle, self.unseen_idf) ** 2
+            norm += weight
+            for passage in self.postings.get(shingle, ()):
+                scores[passage] += weight
+        norm = math.sqrt(norm)
+
+        best = nlargest(top, ((score / (norm * self.norms[passage]), passage)
+                              for passage, score in scores.items()))
+        return [dict(self.passages[passage], score=round(score, 4))
+                for score, passage in best if score >= min_score]
+
+
+def build_textbook_index(textbook_paths: Iterable[Path], **options) -> TextbookIndex:
+    """Index one or more textbook files (options as for TextbookIndex)."""
+    index = TextbookIndex(**options)
+    for path in textbook_paths:
+        index.add_file(path)
+    index.finalize()
+    return index
+
+
+def align_transcripts(index: TextbookIndex, transcript_paths: Iterable[Path], store_dir: Path,
+                      top: int = 3, min_score: float = 0.03) -> Dict:
+    """
+    Link every transcript segment to its most similar textbook passages.
+
+    Args:
+        index: Finalized textbook index
+        transcript_paths: Transcript .txt files
+        store_dir: Directory for transcript segment stores
+        top: Matches kept per segment
+        min_score: Lowest similarity kept
+
+    Returns:
+        Dictionary with per-segment links and per-chapter emphasis
+    """
+    links = []
+    emphasis = defaultdict(float)
+    segment_count = 0
+
+    for transcript_path in transcript_paths:
+        store = open_store(Path(transcript_path), store_dir)
+        for segment in store.iter_segments():
+            segment_count += 1
+            matches = index.query(segment['text'], top, min_score)
+            if not matches:
+                continue
+            best = matches[0]
+            emphasis[str(best['chapter']) if best['chapter'] is not None else 'unknown'] += best['score']
+            time_range = store.source_range(segment) or {}
+            links.append({
+                'transcript': str(transcript_path),
+                'lecture': segment['lecture'],
+                'segment': segment['index'],
+                'start': time_range.get('start'),
+                'end': time_range.get('end'),
+                'matches': matches
+            })
+
+    total = sum(emphasis.values()) or 1.0
+    return {
+        'passages': len(index.passages),
+        'segments': segment_count,
+        'linked_segments': len(links),
+        'chapter_emphasis': {chapter: round(score / total, 4)
+                             for chapter, score in sorted(emphasis.items(), key=lambda item: -item[1])},
+        'links': links
+    }
+
+
+def discover_inputs(course_path: Path) -> Dict[str, List[Path]]:
+    """Default textbook files (content/textbook[s]/) and transcripts (content/lectures/) of a course."""
+    content_dir = Path(course_path) / 'content'
+    textbooks = sorted(path for folder in ('textbooks', 'textbook')
+                       for path in (content_dir / folder).glob('*')
+                       if path.suffix.lower() in ('.pdf', '.txt'))
+    transcripts = sorted(path for path in (content_dir / 'lectures').rglob('*.txt')
+                         if not path.name.startswith('.'))
+    return {'textbooks': textbooks, 'transcripts': transcripts}
+
+
+def main():
+    """Command-line entry point: align a course's transcripts with its textbook."""
+    parser = argparse.ArgumentParser(description='Link lecture transcript segments to textbook passages')
+    parser.add_argument('course_path', help='Path to the course directory')
+    parser.add_argument('--textbook', action='append', type=Path,
+                        help='Textbook .pdf/.txt (repeatable; default: content/textbook[s]/)')
+    parser.add_argument('--transcript', action='append', type=Path,
+                        help='Transcript .txt (repeatable; default: content/lectures/**/*.txt)')
+    parser.add_argument('--top', type=int, default=3, help='Matches per segment (default: 3)')
+    parser.add_argument('--min-score', type=float, default=0.03, help='Lowest similarity kept (default: 0.03)')
+    parser.add_argument('--shingle-sizes', type=int, nargs='+', default=[1, 2],
+                        help='Words per shingle (default: 1 2)')
+    parser.add_argument('--output', type=Path,
+                        help='Output JSON (default: processing/alignment/transcript_alignment.json)')
+    args = parser.parse_args()
+
+    course_path = Path(args.course_path)
+    inputs = discover_inputs(course_path)
+    textbooks = args.textbook or inputs['textbooks']
+    transcripts = args.transcript or inputs['transcripts']
+    if not textbooks or not transcripts:
+        parser.error(f"Need at least one textbook and one transcript (found {len(textbooks)} and {len(transcripts)})")
+
+    started = time.perf_counter()
+    index = build_textbook_index(textbooks, shingle_sizes=args.shingle_sizes)
+    result = align_transcripts(index, transcripts, course_path / 'processing' / 'transcripts',
+                               args.top, args.min_score)
+    result['textbooks'] = [str(path) for path in textbooks]
+    elapsed = time.perf_counter() - started
+
+    output = args.output or course_path / 'processing' / 'alignment' / 'transcript_alignment.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    logger.info(f"Linked {result['linked_segments']}/{result['segments']} segments to "
+                f"{result['passages']} passages in {elapsed:.2f}s -> {output}")
+    for chapter, share in list(result['chapter_emphasis'].items())[:10]:
+        logger.info(f"  Chapter {chapter}: {share:.1%} of matched lecture content")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,452 @@
+"""
+Transcript Store - Time-stamped lecture transcript segments with an on-disk index.
+
+Transcripts are split into segments: one per speaker turn in timestamped
+(Zoom-style) exports, one per paragraph in untimed ones. Combined files with
+"=== <file name> ===" headers are split into one lecture per header.
+
+Each transcript's segments are written to a compact binary store:
+
+    header   magic, version, segment count, source size and mtime,
+             length of the names block
+    names    JSON {"lectures": [...], "speakers": [...]}
+    index    one fixed-size record per segment: lecture id, speaker id,
+             start/end in milliseconds (-1 if untimed), text offset, length
+    text     the segments' UTF-8 text, back to back
+
+Opening a store reads only the header, names and index. Segment text is read
+on demand with a seek, and time lookups bisect the index, so fetching the
+segments around a moment never loads or rescans the whole transcript.
+Stores are rebuilt when the source transcript's size or mtime changes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+STORE_MAGIC = b'TSEG'
+STORE_VERSION = 1
+STORE_SUFFIX = '.tseg'
+
+# magic, version, flags (unused), segment count, source size, source mtime_ns, names length
+HEADER = struct.Struct('<4sHHIQqI')
+# lecture id, speaker id, start ms, end ms, text offset, text length
+RECORD = struct.Struct('<HHiiQI')
+
+NO_SPEAKER = 0xFFFF
+UNTIMED = -1
+
+LECTURE_HEADER = re.compile(r'^===\s*(.+?)\s*===$')
+TIMESTAMP_LINE = re.compile(r'^(?:(\d{1,2}):)?(\d{1,2}):(\d{2})$')
+SENTENCE_END = ('.', ',', '?', '!', ';', ':')
+
+
+def parse_time(value: str) -> Optional[int]:
+    """Milliseconds for an "HH:MM:SS" or "MM:SS" string (None if it is neither)."""
+    match = TIMESTAMP_LINE.match(value.strip())
+    if not match:
+        return None
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000
+
+
+def format_time(milliseconds: int) -> str:
+    """"HH:MM:SS" for a time in milliseconds."""
+    seconds = milliseconds // 1000
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _lecture_name(name: str) -> str:
+    return name[:-4] if name.lower().endswith('.txt') else name
+
+
+def _is_speaker_label(line: str) -> bool:
+    """Whether a line looks like a speaker name rather than speech."""
+    return 0 < len(line) <= 40 and not line.endswith(SENTENCE_END)
+
+
+def _is_initials(line: str, name: str) -> bool:
+    """Whether a line is the initials Zoom prints above a speaker's name."""
+    if line == name:
+        return True
+    initials = ''.join(word[0] for word in name.split() if word).upper()
+    return line.isupper() and len(line) <= 3 and initials.startswith(line)
+
+
+def _take_speaker(lines: List[str]) -> Optional[str]:
+    """Remove a trailing speaker label (name, optionally under its initials) from lines."""
+    while lines and not lines[-1]:
+        lines.pop()
+    if not lines or not _is_speaker_label(lines[-1]):
+        return None
+    speaker = lines.pop()
+    if lines and _is_initials(lines[-1], speaker):
+        lines.pop()
+    return speaker
+
+
+def _split_timed(lines: List[str]) -> List[Dict]:
+    """Segments of a Zoom-style lecture: a speaker label and timestamp start each turn."""
+    segments = []
+    current = {'speaker': None, 'start': 0, 'lines': []}
+
+    # A label may open the lecture before the first timestamp ("JF" / "Joseph FX DeSouza")
+    head = [line for line in lines[:3] if line]
+    if len(head) >= 2 and _is_initials(head[0], head[1]) and _is_speaker_label(head[1]):
+        current['speaker'] = head[1]
+        lines = lines[lines.index(head[1]) + 1:]
+
+    for line in lines:
+        start = parse_time(line)
+        if start is None:
+            current['lines'].append(line)
+            continue
+        speaker = _take_speaker(current['lines'])
+        segments.append(current)
+        current = {'speaker': speaker, 'start': start, 'lines': []}
+    segments.append(current)
+
+    # Clamp out-of-order timestamps so starts stay sorted for bisection
+    last = 0
+    for segment in segments:
+        last = segment['start'] = max(segment['start'], last)
+    for segment, following in zip(segments, segments[1:] + [None]):
+        segment['end'] = following['start'] if following else segment['start']
+        segment['text'] = '\n'.join(line for line in segment.pop('lines') if line).strip()
+    return [segment for segment in segments if segment['text']]
+
+
+def _split_paragraphs(lines: List[str]) -> List[Dict]:
+    """Segments of an untimed lecture, one per blank-line separated paragraph."""
+    segments = []
+    paragraph = []
+    for line in lines + ['']:
+        if line:
+            paragraph.append(line)
+        elif paragraph:
+            segments.append({'speaker': None, 'start': UNTIMED, 'end': UNTIMED,
+                             'text': '\n'.join(paragraph)})
+            paragraph = []
+    return segments
+
+
+def parse_transcript(text: str, name: str = 'transcript') -> List[Dict]:
+    """
+    Split transcript text into segments.
+
+    Args:
+        text: Transcript text
+        name: Lecture name for text before any "=== ... ===" header
+
+    Returns:
+        Segment dictionaries (lecture, speaker, start and end in milliseconds
+        or -1 if untimed, text), in transcript order
+    """
+    lectures: List[Tuple[str, List[str]]] = [(_lecture_name(name), [])]
+    for line in text.splitlines():
+        line = line.strip()
+        header = LECTURE_HEADER.match(line)
+        if header:
+            lectures.append((_lecture_name(header.group(1)), []))
+        else:
+            lectures[-1][1].append(line)
+
+    segments = []
+    for lecture, lines in lectures:
+        timed = any(TIMESTAMP_LINE.match(line) for line in lines)
+        for segment in (_split_timed(lines) if timed else _split_paragraphs(lines)):
+            segment['lecture'] = lecture
+            segments.append(segment)
+    return segments
+
+
+def read_transcript_text(transcript_path: Path) -> str:
+    """A transcript's text (UTF-8, falling back to Latin-1)."""
+    try:
+        return Path(transcript_path).read_text(encoding='utf-8')
+    except UnicodeDecodeError:
+        return Path(transcript_path).read_text(encoding='latin-1')
+
+
+def write_store(segments: List[Dict], store_path: Path,
+                source_size: int = 0, source_mtime_ns: int = 0) -> None:
+    """
+    Write segments to a store file (atomically replacing any existing one).
+
+    Args:
+        segments: Segments as returned by parse_transcript
+        store_path: Destination store file
+        source_size: Size of the transcript the segments came from
+        source_mtime_ns: Its modification time, used to detect stale stores
+    """
+    lectures = list(dict.fromkeys(segment['lecture'] for segment in segments))
+    speakers = list(dict.fromkeys(segment['speaker'] for segment in segments if segment['speaker']))
+    lecture_ids = {lecture: i for i, lecture in enumerate(lectures)}
+    speaker_ids = {speaker: i for i, speaker in enumerate(speakers)}
+
+    # Group by lecture so each lecture's records are contiguous
+    ordered = sorted(segments, key=lambda segment: lecture_ids[segment['lecture']])
+
+    index = bytearray()
+    texts = []
+    offset = 0
+    for segment in ordered:
+        data = segment['text'].encode('utf-8')
+        index += RECORD.pack(lecture_ids[segment['lecture']],
+                             speaker_ids.get(segment['speaker'], NO_SPEAKER),
+                             segment['start'], segment['end'], offset, len(data))
+        texts.append(data)
+        offset += len(data)
+
+    names = json.dumps({'lectures': lectures, 'speakers': speakers}, ensure_ascii=False).encode('utf-8')
+    store_path = Path(store_path)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = store_path.with_name(store_path.name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(STORE_MAGIC, STORE_VERSION, 0, len(ordered),
+                            source_size, source_mtime_ns, len(names)))
+        f.write(names)
+        f.write(index)
+        f.writelines(texts)
+    os.replace(temp_path, store_path)
+
+
+class TranscriptStore:
+    """Read access to a transcript store; segment text is loaded only when asked for."""
+
+    def __init__(self, store_path: Path):
+        """
+        Open a store, reading its header, names and index.
+
+        Args:
+            store_path: Path to a store written by write_store
+
+        Raises:
+            ValueError: If the file is not a store of the current version
+        """
+        self.store_path = Path(store_path)
+        with open(self.store_path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"{self.store_path} is not a transcript store")
+            magic, version, _, count, self.source_size, self.source_mtime_ns, names_length = HEADER.unpack(header)
+            if magic != STORE_MAGIC or version != STORE_VERSION:
+                raise ValueError(f"{self.store_path} is not a version {STORE_VERSION} transcript store")
+            names = json.loads(f.read(names_length).decode('utf-8'))
+            index = f.read(RECORD.size * count)
+        if len(index) != RECORD.size * count:
+            raise ValueError(f"{self.store_path} is truncated")
+
+        self.lectures: List[str] = names['lectures']
+        self.speakers: List[str] = names['speakers']
+        self._text_start = HEADER.size + names_length + RECORD.size * count
+
+        self._lecture_ids = array('H')
+        self._speaker_ids = array('H')
+        self._starts = array('i')
+        self._ends = array('i')
+        self._offsets = array('Q')
+        self._lengths = array('I')
+        for lecture, speaker, start, end, offset, length in RECORD.iter_unpack(index):
+            self._lecture_ids.append(lecture)
+            self._speaker_ids.append(speaker)
+            self._starts.append(start)
+            self._ends.append(end)
+            self._offsets.append(offset)
+            self._lengths.append(length)
+
+        # Records are grouped by lecture: lecture id -> [first, last + 1)
+        self._ranges: Dict[int, Tuple[int, int]] = {}
+        for i, lecture in enumerate(self._lecture_ids):
+            first, _ = self._ranges.get(lecture, (i, i))
+            self._ranges[lecture] = (first, i + 1)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @property
+    def timed(self) -> bool:
+        """Whether any segment has a timestamp."""
+        return any(start != UNTIMED for start in self._starts)
+
+    def lecture_range(self, lecture: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Segment numbers [first, last + 1) of a lecture.
+
+        Args:
+            lecture: Lecture name (may be omitted if the store has one lecture)
+        """
+        if lecture is None:
+            if len(self.lectures) != 1:
+                raise ValueError(f"Specify a lecture: {self.lectures}")
+            lecture = self.lectures[0]
+        if lecture not in self.lectures:
+            raise ValueError(f"Unknown lecture '{lecture}'; expected one of {self.lectures}")
+        return self._ranges.get(self.lectures.index(lecture), (0, 0))
+
+    def _segment(self, i: int, text: str) -> Dict:
+        speaker = self._speaker_ids[i]
+        start, end = self._starts[i], self._ends[i]
+        return {
+            'index': i,
+            'lecture': self.lectures[self._lecture_ids[i]],
+            'speaker': self.speakers[speaker] if speaker != NO_SPEAKER else None,
+            'start': start if start != UNTIMED else None,
+            'end': end if end != UNTIMED else None,
+            'text': text
+        }
+
+    def segments(self, first: int, last: int) -> List[Dict]:
+        """Segments first..last - 1, read from disk in one go."""
+        first, last = max(first, 0), min(last, len(self))
+        if first >= last:
+            return []
+        start = self._offsets[first]
+        with open(self.store_path, 'rb') as f:
+            f.seek(self._text_start + start)
+            data = f.read(self._offsets[last - 1] + self._lengths[last - 1] - start)
+        return [self._segment(i, data[self._offsets[i] - start:
+                                      self._offsets[i] - start + self._lengths[i]].decode('utf-8'))
+                for i in range(first, last)]
+
+    def segment(self, i: int) -> Dict:
+        """A single segment by number."""
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.segments(i, i + 1)[0]
+
+    def iter_segments(self, lecture: Optional[str] = None, batch: int = 256) -> Iterator[Dict]:
+        """
+        Stream segments in order, reading batch segments at a time.
+
+        Args:
+            lecture: Only this lecture's segments (all lectures if None)
+            batch: Segments read from disk per read
+        """
+        first, last = self.lecture_range(lecture) if lecture is not None else (0, len(self))
+        for i in range(first, last, batch):
+            yield from self.segments(i, min(i + batch, last))
+
+    def find(self, milliseconds: int, lecture: Optional[str] = None) -> Optional[int]:
+        """
+        Number of the segment being spoken at a moment of a lecture.
+
+        Returns:
+            Segment number, or None if the lecture is untimed
+        """
+        first, last = self.lecture_range(lecture)
+        if first == last or self._starts[first] == UNTIMED:
+            return None
+        return max(bisect_right(self._starts, milliseconds, first, last) - 1, first)
+
+    def window(self, milliseconds: int, before: int = 60000, after: int = 60000,
+               lecture: Optional[str] = None) -> List[Dict]:
+        """
+        Segments overlapping a window around a moment of a lecture.
+
+        Args:
+            milliseconds: The moment
+            before: Window start, in milliseconds before the moment
+            after: Window end, in milliseconds after the moment
+            lecture: Lecture name (may be omitted if the store has one lecture)
+
+        Returns:
+            Segments in order ([] if the lecture is untimed)
+        """
+        first = self.find(milliseconds - before, lecture)
+        if first is None:
+            return []
+        _, last = self.lecture_range(lecture)
+        return self.segments(first, bisect_right(self._starts, milliseconds + after, first, last))
+
+    @staticmethod
+    def source_range(segment: Dict) -> Optional[Dict]:
+        """A card-friendly pointer back to a segment's lecture time range (None if untimed)."""
+        if segment['start'] is None:
+            return None
+        return {
+            'lecture': segment['lecture'],
+            'start': format_time(segment['start']),
+            'end': format_time(segment['end'])
+        }
+
+
+def build_store(transcript_path: Path, store_path: Path) -> TranscriptStore:
+    """Parse a transcript file and write its store."""
+    transcript_path = Path(transcript_path)
+    stat = transcript_path.stat()
+    segments = parse_transcript(read_transcript_text(transcript_path), transcript_path.name)
+    write_store(segments, store_path, stat.st_size, stat.st_mtime_ns)
+    logger.info(f"Indexed {len(segments)} transcript segments from {transcript_path.name}")
+    return TranscriptStore(store_path)
+
+
+def store_path_for(transcript_path: Path, store_dir: Path) -> Path:
+    """Where a transcript's store lives in store_dir (named by a hash of its path)."""
+    key = str(Path(transcript_path).resolve())
+    return Path(store_dir) / (hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest() + STORE_SUFFIX)
+
+
+def open_store(transcript_path: Path, store_dir: Path) -> TranscriptStore:
+    """
+    A transcript's store, built or rebuilt first if missing or stale.
+
+    Args:
+        transcript_path: Transcript .txt file
+        store_dir: Directory holding stores (e.g. <course>/processing/transcripts)
+    """
+    store_path = store_path_for(transcript_path, store_dir)
+    stat = Path(transcript_path).stat()
+    try:
+        store = TranscriptStore(store_path)
+        if store.source_size == stat.st_size and store.source_mtime_ns == stat.st_mtime_ns:
+            return store
+    except (OSError, ValueError, json.JSONDecodeError):
+        pass
+    return build_store(transcript_path, store_path)
+
+
+def main():
+    """Command-line entry point: index a transcript and show segments around a moment."""
+    parser = argparse.ArgumentParser(description='Index a lecture transcript into time-stamped segments')
+    parser.add_argument('transcript', help='Transcript .txt file')
+    parser.add_argument('--at', help='Show the segments around this time (HH:MM:SS or MM:SS)')
+    parser.add_argument('--lecture', help='Lecture within a combined transcript')
+    parser.add_argument('--before', type=int, default=60, help='Seconds before --at to include (default: 60)')
+    parser.add_argument('--after', type=int, default=60, help='Seconds after --at to include (default: 60)')
+    parser.add_argument('--store-dir', default='processing/transcripts',
+                        help='Directory for segment stores (default: processing/transcripts)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = open_store(Path(args.transcript), Path(args.store_dir))
+
+    if not args.at:
+        for lecture in store.lectures:
+            first, last = store.lecture_range(lecture)
+            timed = store.find(0, lecture) is not None
+            length = format_time(store.segment(last - 1)['start']) if timed else 'untimed'
+            print(f"{lecture}: {last - first} segments ({length})")
+        return
+
+    moment = parse_time(args.at)
+    if moment is None:
+        parser.error(f"--at must be HH:MM:SS or MM:SS, got {args.at!r}")
+    for segment in store.window(moment, args.before * 1000, args.after * 1000, args.lecture):
+        print(f"[{format_time(segment['start'])}] {segment['speaker'] or 'Unknown'}")
+        print(segment['text'])
+        print()
+
+
+if __name__ == '__main__':
+    main()
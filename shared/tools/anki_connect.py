@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+AnkiConnect Client - Shared, pooled client for the AnkiConnect add-on.
+
+Every tool that talks to a running Anki goes through this module instead of
+carrying its own request helper. The client keeps a single keep-alive
+session, packs many actions into AnkiConnect's ``multi`` action, sends
+independent batches concurrently, retries transient connection failures
+with exponential backoff and records per-action latency. Timeouts are only
+retried for read-only actions, since a write that timed out may already
+have been applied.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# ANKI_CONNECT_URL points every tool at another endpoint (e.g. anki_standin.py)
+DEFAULT_URL = os.environ.get("ANKI_CONNECT_URL", "http://127.0.0.1:8765")
+API_VERSION = 6
+
+# Actions that are safe to resend after a timeout
+READ_ONLY_ACTIONS = frozenset({
+    'version', 'deckNames', 'deckNamesAndIds', 'modelNames', 'modelNamesAndIds',
+    'modelFieldNames', 'modelTemplates', 'modelStyling', 'findNotes', 'findCards',
+    'notesInfo', 'cardsInfo', 'cardsToNotes', 'cardsModTime', 'notesModTime', 'getDecks',
+    'getTags', 'getIntervals', 'getEaseFactors', 'areSuspended', 'areDue',
+    'getNumCardsReviewedToday', 'getDeckStats', 'retrieveMediaFile',
+})
+
+
+def is_idempotent(actions: Iterable[str]) -> bool:
+    """Whether every action in a request may safely be sent twice."""
+    return all(action in READ_ONLY_ACTIONS for action in actions)
+
+
+class AnkiConnectError(Exception):
+    """Raised by AnkiConnectClient.invoke when AnkiConnect reports an error."""
+
+
+class LatencyMetrics:
+    """Thread-safe round-trip counter and per-action latency statistics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._actions: Dict[str, Dict] = {}
+        self._transfers: Dict[str, Dict] = {}
+        self.round_trips = 0
+        self.retries = 0
+        self.bytes_received = 0
+
+    def add_round_trip(self, retries: int = 0, nbytes: int = 0):
+        """Count one HTTP round trip (any retries it needed and the response size)."""
+        with self._lock:
+            self.round_trips += 1
+            self.retries += retries
+            self.bytes_received += nbytes
+
+    def record_transfer(self, label: str, items: int, nbytes: int, seconds: float, batches: int = 1):
+        """
+        Record the throughput of a bulk transfer (e.g. a pipelined scan).
+
+        Args:
+            label: Name shown in the report (usually the action)
+            items: Number of items received
+            nbytes: Response bytes received
+            seconds: Wall time of the transfer
+            batches: Number of requests it took
+        """
+        with self._lock:
+            stats = self._transfers.setdefault(label, {
+                'items': 0,
+                'bytes': 0,
+                'seconds': 0.0,
+                'batches': 0
+            })
+            stats['items'] += items
+            stats['bytes'] += nbytes
+            stats['seconds'] += seconds
+            stats['batches'] += batches
+
+    def record(self, action: str, elapsed: float, count: int = 1, errors: int = 0):
+        """
+        Record latency for one or more executions of an action.
+
+        Args:
+            action: AnkiConnect action name
+            elapsed: Wall time attributed to these executions, in seconds
+            count: Number of executions covered by ``elapsed``
+            errors: How many of them returned an error
+        """
+        with self._lock:
+            stats = self._actions.setdefault(action, {
+                'count': 0,
+                'errors': 0,
+                'total_time': 0.0,
+                'max_time': 0.0
+            })
+            stats['count'] += count
+            stats['errors'] += errors
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed / max(count, 1))
+
+    def summary(self) -> Dict:
+        """Return a snapshot of the collected metrics."""
+        with self._lock:
+            actions = {}
+            for action, stats in self._actions.items():
+                actions[action] = dict(stats)
+                actions[action]['avg_ms'] = stats['total_time'] / max(stats['count'], 1) * 1000
+            transfers = {}
+            for label, stats in self._transfers.items():
+                transfers[label] = dict(stats)
+                transfers[label]['items_per_s'] = stats['items'] / stats['seconds'] if stats['seconds'] else 0.0
+                transfers[label]['kb_per_s'] = stats['bytes'] / 1024 / stats['seconds'] if stats['seconds'] else 0.0
+            return {
+                'round_trips': self.round_trips,
+                'retries': self.retries,
+                'bytes_received': self.bytes_received,
+                'actions': actions,
+                'transfers': transfers
+            }
+
+    def format_report(self) -> str:
+        """Format the metrics as a small text table."""
+        summary = self.summary()
+        lines = [
+            f"AnkiConnect: {summary['round_trips']} round trips, {summary['retries']} retries, "
+            f"{summary['bytes_received'] / 1024:.0f} KB received"
+        ]
+        for action, stats in sorted(summary['actions'].items()):
+            lines.append(
+                f"   {action:<20} {stats['count']:>7} calls  "
+                f"avg {stats['avg_ms']:.1f} ms  max {stats['max_time'] * 1000:.1f} ms  "
+                f"errors {stats['errors']}"
+            )
+        for label, stats in sorted(summary['transfers'].items()):
+            lines.append(
+                f"   {label + ' stream':<20} {stats['items']:>7} items  "
+                f"{stats['items_per_s']:.0f}/s  {stats['kb_per_s']:.0f} KB/s  "
+                f"{stats['batches']} batches"
+            )
+        return "\n".join(lines)
+
+
+class AnkiConnectClient:
+    """Pooled AnkiConnect client with ``multi`` batching and retries."""
+
+    def __init__(self, url: str = DEFAULT_URL, timeout: float = 10,
+                 max_retries: int = 3, backoff: float = 0.5,
+                 multi_size: int = 25, chunk_size: int = 100,
+                 max_workers: int = 4):
+        """
+        Initialize the client.
+
+        Args:
+            url: AnkiConnect endpoint
+            timeout: Per-request timeout in seconds
+            max_retries: Retries after a connection error (or a timeout of a
+                read-only request)
+            backoff: Base delay in seconds; doubles on every retry
+            multi_size: Maximum number of actions packed into one ``multi`` call
+            chunk_size: Maximum number of ids per action in ``fetch``
+            max_workers: Number of ``multi`` batches allowed in flight at once
+        """
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.multi_size = max(1, multi_size)
+        self.chunk_size = max(1, chunk_size)
+        self.max_workers = max(1, max_workers)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.metrics = LatencyMetrics()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the underlying HTTP session."""
+        self.session.close()
+
+    def _post(self, payload: Dict, idempotent: bool = False) -> Tuple[Dict, float, int]:
+        """
+        POST a payload, retrying connection failures with backoff.
+
+        A read timeout only means no reply arrived in time; Anki may still
+        have applied the request, so it is retried only when ``idempotent``.
+        Failures to connect never reached Anki and are always retried.
+
+        Returns:
+            Tuple of (response dict, elapsed seconds of the final attempt,
+            response size in bytes). Failures are reported as
+            ``{'result': None, 'error': ...}``.
+        """
+        last_error = None
+        attempt = 0
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+                self.metrics.add_round_trip(attempt, len(response.content))
+                return data, time.perf_counter() - start, len(response.content)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                unsent = isinstance(e, requests.ConnectTimeout) or not isinstance(e, requests.Timeout)
+                if not (idempotent or unsent):
+                    break
+                if attempt < self.max_retries:
+                    delay = self.backoff * (2 ** attempt)
+                    logger.debug(f"AnkiConnect {payload['action']} failed ({e}); retrying in {delay:.2f}s")
+                    time.sleep(delay)
+            except (requests.RequestException, ValueError) as e:
+                last_error = e
+                break
+
+        self.metrics.add_round_trip(attempt)
+        logger.warning(f"AnkiConnect {payload['action']} failed: {last_error}")
+        return {'result': None, 'error': str(last_error)}, 0.0, 0
+
+    def request(self, action: str, params: Optional[Dict] = None,
+                idempotent: Optional[bool] = None) -> Dict:
+        """
+        Send a single action.
+
+        Args:
+            action: AnkiConnect action name
+            params: Action parameters
+            idempotent: Whether a timed-out request may be resent
+                (defaults to whether the action is in READ_ONLY_ACTIONS)
+
+        Returns:
+            AnkiConnect response dict with 'result' and 'error' keys
+        """
+        return self.timed_request(action, params, idempotent)[0]
+
+    def timed_request(self, action: str, params: Optional[Dict] = None,
+                      idempotent: Optional[bool] = None) -> Tuple[Dict, float, int]:
+        """
+        Send a single action and report how long it took and how big the reply was.
+
+        Returns:
+            Tuple of (response dict, elapsed seconds, response bytes)
+        """
+        payload = {'action': action, 'version': API_VERSION}
+        if params:
+            payload['params'] = params
+
+        if idempotent is None:
+            idempotent = is_idempotent([action])
+
+        response, elapsed, nbytes = self._post(payload, idempotent)
+        self.metrics.record(action, elapsed, errors=1 if response.get('error') else 0)
+        return response, elapsed, nbytes
+
+    def invoke(self, action: str, **params) -> Any:
+        """
+        Send a single action and return its result.
+
+        Raises:
+            AnkiConnectError: If AnkiConnect (or the connection) reports an error
+        """
+        response = self.request(action, params)
+        if response.get('error'):
+            raise AnkiConnectError(f"{action}: {response['error']}")
+        return response.get('result')
+
+    def multi(self, actions: Iterable[Tuple[str, Optional[Dict]]],
+              idempotent: Optional[bool] = None) -> List[Dict]:
+        """
+        Send many actions using as few round trips as possible.
+
+        Actions are packed ``multi_size`` at a time into ``multi`` calls and up
+        to ``max_workers`` of those calls run concurrently.
+
+        Args:
+            actions: Iterable of (action, params) tuples
+            idempotent: Whether a timed-out batch may be resent (defaults to
+                whether every action in the batch is in READ_ONLY_ACTIONS)
+
+        Returns:
+            One response dict per action, in input order
+        """
+        actions = list(actions)
+        if not actions:
+            return []
+
+        batches = [actions[i:i + self.multi_size] for i in range(0, len(actions), self.multi_size)]
+
+        def send(batch):
+            return self._send_multi(batch, idempotent)
+
+        if len(batches) == 1 or self.max_workers == 1:
+            results = [send(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                results = list(executor.map(send, batches))
+
+        return [response for batch in results for response in batch]
+
+    def _send_multi(self, batch: List[Tuple[str, Optional[Dict]]],
+                    idempotent: Optional[bool] = None) -> List[Dict]:
+        """Send one batch of actions as a single ``multi`` call."""
+        if len(batch) == 1:
+            action, params = batch[0]
+            return [self.request(action, params, idempotent)]
+
+        if idempotent is None:
+            idempotent = is_idempotent(action for action, _ in batch)
+
+        inner = []
+        for action, params in batch:
+            entry = {'action': action, 'version': API_VERSION}
+            if params:
+                entry['params'] = params
+            inner.append(entry)
+
+        response, elapsed, _ = self._post({
+            'action': 'multi',
+            'version': API_VERSION,
+            'params': {'actions': inner}
+        }, idempotent)
+
+        if response.get('error'):
+            responses = [{'result': None, 'error': response['error']} for _ in batch]
+        else:
+            responses = []
+            for item in response.get('result') or []:
+                # Versioned inner actions come back as {'result', 'error'} dicts
+                if isinstance(item, dict) and 'error' in item and 'result' in item:
+                    responses.append(item)
+                else:
+                    responses.append({'result': item, 'error': None})
+            while len(responses) < len(batch):
+                responses.append({'result': None, 'error': 'missing response from multi'})
+
+        # Attribute the round trip's latency evenly across its actions
+        share = elapsed / len(batch)
+        per_action: Dict[str, List[int]] = {}
+        for (action, _), item in zip(batch, responses):
+            counts = per_action.setdefault(action, [0, 0])
+            counts[0] += 1
+            counts[1] += 1 if item.get('error') else 0
+        for action, (count, errors) in per_action.items():
+            self.metrics.record(action, share * count, count=count, errors=errors)
+
+        return responses
+
+    def fetch(self, action: str, key: str, ids: Iterable, chunk_size: Optional[int] = None) -> List:
+        """
+        Run an id-list action (cardsInfo, notesInfo, ...) over any number of ids.
+
+        Ids are split into chunks, the chunks are packed into ``multi`` calls
+        and the per-chunk results are concatenated. Chunks that fail are
+        logged and skipped.
+
+        Args:
+            action: AnkiConnect action taking a list of ids
+            key: Parameter name for the id list (e.g. 'cards', 'notes')
+            ids: Ids to look up
+            chunk_size: Ids per action (defaults to the client's chunk_size)
+
+        Returns:
+            Flat list of results
+        """
+        ids = list(ids)
+        size = chunk_size or self.chunk_size
+        chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+
+        responses = self.multi((action, {key: chunk}) for chunk in chunks)
+
+        items = []
+        for chunk, response in zip(chunks, responses):
+            if response.get('error'):
+                logger.warning(f"{action} failed for {len(chunk)} ids: {response['error']}")
+                continue
+            items.extend(response.get('result') or [])
+        return items
+
+    def report(self) -> str:
+        """Return a formatted round-trip and latency report."""
+        return self.metrics.format_report()
@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+Anki Stand-in - Local AnkiConnect-compatible server backed by an .apkg.
+
+Serves the AnkiConnect actions our tools use from the notes and cards of a
+generated deck, so the tools can be tested and benchmarked on a headless
+machine. Actions are executed one at a time, like Anki's main thread, and an
+artificial per-request latency can be added to model a real desktop.
+
+Usage:
+    python shared/tools/anki_standin.py --apkg courses/PSYC2240/output/PSYC2240_Consolidated_Deck.apkg
+    ANKI_CONNECT_URL=http://127.0.0.1:8765 python shared/tools/validate_clean.py
+"""
+
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from apkg_collection import ApkgCollection, strip_html
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = 6
+
+# Search syntax tokens: parentheses, optionally negated key:"quoted value",
+# quoted text, or a bare word / key:value
+TOKEN_PATTERN = re.compile(r'\(|\)|-?[\w.]+:"[^"]*"|-?"[^"]*"|[^\s()]+')
+
+
+class SearchError(Exception):
+    """Raised for search syntax the stand-in does not understand."""
+
+
+def _glob(pattern: str) -> Callable[[str], bool]:
+    """Case-insensitive Anki-style wildcard match ('*' and '_')."""
+    regex = re.compile(
+        "".join(".*" if ch == "*" else "." if ch == "_" else re.escape(ch) for ch in pattern),
+        re.IGNORECASE | re.DOTALL
+    )
+    return lambda text: bool(regex.fullmatch(text))
+
+
+def _in_hierarchy(match: Callable[[str], bool], name: str) -> bool:
+    """True if ``name`` or one of its '::' parents matches (deck:/tag: include children)."""
+    parts = name.split("::")
+    return any(match("::".join(parts[:i])) for i in range(len(parts), 0, -1))
+
+
+def _term(token: str) -> Callable[[Dict], bool]:
+    """Compile one search term into a predicate over a card view."""
+    negate = token.startswith("-") and len(token) > 1
+    if negate:
+        token = token[1:]
+
+    key, value = "", token
+    if not token.startswith('"') and ":" in token:
+        key, value = token.split(":", 1)
+        key = key.lower()
+    value = value.strip('"')
+
+    if key == "deck":
+        match = _glob(value)
+        predicate = lambda card: _in_hierarchy(match, card["deck"])
+    elif key == "tag":
+        match = _glob(value)
+        predicate = lambda card: any(_in_hierarchy(match, tag) for tag in card["tags"])
+    elif key == "note":
+        match = _glob(value)
+        predicate = lambda card: match(card["model"])
+    elif key in ("nid", "cid"):
+        ids = {int(part) for part in value.split(",") if part}
+        field = "note" if key == "nid" else "cardId"
+        predicate = lambda card: card[field] in ids
+    elif key == "edited":
+        cutoff = time.time() - int(value) * 86400
+        predicate = lambda card: card["mod"] > cutoff
+    elif key:
+        match = _glob(value)
+        predicate = lambda card: any(
+            name.lower() == key and match(text) for name, text in card["fields"].items()
+        )
+    else:
+        match = _glob(f"*{value}*")
+        predicate = lambda card: any(match(strip_html(text)) for text in card["fields"].values())
+
+    return (lambda card: not predicate(card)) if negate else predicate
+
+
+def compile_search(query: str) -> Callable[[Dict], bool]:
+    """
+    Compile an Anki search into a predicate over card views.
+
+    Supports implicit AND, OR, parentheses, '-' negation and the deck:,
+    tag:, note:, nid:, cid:, edited:, field: and plain-text terms.
+    """
+    tokens = TOKEN_PATTERN.findall(query)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or():
+        nonlocal position
+        branches = [parse_and()]
+        while peek() and peek().upper() == "OR":
+            position += 1
+            branches.append(parse_and())
+        return branches[0] if len(branches) == 1 else (lambda card: any(b(card) for b in branches))
+
+    def parse_group():
+        nonlocal position
+        inner = parse_or()
+        if peek() != ")":
+            raise SearchError(f"unbalanced parentheses in {query!r}")
+        position += 1
+        return inner
+
+    def parse_and():
+        nonlocal position
+        parts = []
+        while peek() not in (None, ")") and peek().upper() != "OR":
+            token = peek()
+            position += 1
+            if token.upper() == "AND":
+                continue
+            if token == "-" and peek() == "(":
+                position += 1
+                group = parse_group()
+                parts.append(lambda card, group=group: not group(card))
+            elif token == "(":
+                parts.append(parse_group())
+            else:
+                parts.append(_term(token))
+        if not parts:
+            return lambda card: True
+        return parts[0] if len(parts) == 1 else (lambda card: all(p(card) for p in parts))
+
+    predicate = parse_or()
+    if peek() is not None:
+        raise SearchError(f"unexpected {peek()!r} in {query!r}")
+    return predicate
+
+
+class StandInCollection:
+    """In-memory notes and cards served by the stand-in."""
+
+    def __init__(self):
+        self.models: Dict[int, Dict] = {}
+        self.decks: Dict[int, str] = {}
+        self.notes: Dict[int, Dict] = {}
+        self.cards: Dict[int, Dict] = {}
+        self.dirty = set()
+
+    @classmethod
+    def from_apkg(cls, apkg_path: str, size: Optional[int] = None) -> "StandInCollection":
+        """
+        Load an .apkg, optionally resized to ``size`` notes.
+
+        Larger sizes repeat the package's notes (and their cards) under new
+        ids, so benchmarks run on real card content at any scale.
+        """
+        collection = cls()
+        with ApkgCollection(apkg_path) as apkg:
+            collection.models = apkg.models
+            collection.decks = apkg.decks
+            source_notes = apkg.notes()
+            cards_by_note: Dict[int, List[Dict]] = {}
+            for card in apkg.cards():
+                cards_by_note.setdefault(card["note"], []).append(card)
+
+        if not source_notes:
+            return collection
+
+        size = len(source_notes) if size is None else size
+        note_base = max(note["noteId"] for note in source_notes) + 1
+        card_base = note_base * 10
+        next_card = card_base
+
+        for i in range(size):
+            source = source_notes[i % len(source_notes)]
+            note_id = source["noteId"] if i < len(source_notes) else note_base + i
+            collection.notes[note_id] = {
+                "model": source["modelName"],
+                "fields": {name: field["value"] for name, field in source["fields"].items()},
+                "tags": list(source["tags"]),
+                "mod": source["mod"]
+            }
+            for card in cards_by_note.get(source["noteId"], []):
+                card_id = card["cardId"] if i < len(source_notes) else next_card
+                next_card += 1
+                collection.cards[card_id] = {
+                    "note": note_id,
+                    "deck": collection.decks.get(card["deckId"], "Default"),
+                    "ord": card["ord"]
+                }
+
+        return collection
+
+    def card_views(self):
+        """Yield the flattened card/note view the search predicates work on."""
+        for card_id, card in self.cards.items():
+            note = self.notes[card["note"]]
+            yield {
+                "cardId": card_id,
+                "note": card["note"],
+                "deck": card["deck"],
+                "model": note["model"],
+                "fields": note["fields"],
+                "tags": note["tags"],
+                "mod": note["mod"]
+            }
+
+    def save(self, apkg_path: str, output_path: Optional[str] = None):
+        """Write edited notes back to the .apkg they were loaded from."""
+        changes = {note_id: self.notes[note_id]["fields"] for note_id in self.dirty if note_id in self.notes}
+        with ApkgCollection(apkg_path) as apkg:
+            apkg.update_notes(changes)
+            apkg.save(output_path)
+        self.dirty.clear()
+
+
+class AnkiStandIn:
+    """Executes AnkiConnect actions against a StandInCollection."""
+
+    def __init__(self, collection: StandInCollection):
+        self.collection = collection
+        self.lock = threading.Lock()
+        self._cards_by_note: Optional[Dict[int, List[int]]] = None
+
+    def execute(self, action: str, params: Dict):
+        """Run one action and return its result; raises on errors."""
+        handler = getattr(self, f"action_{action}", None)
+        if handler is None:
+            raise ValueError(f"unsupported action: {action}")
+        return handler(**params)
+
+    def action_version(self):
+        return API_VERSION
+
+    def action_deckNames(self):
+        return sorted(set(self.collection.decks.values()))
+
+    def action_findCards(self, query: str):
+        predicate = compile_search(query)
+        return [card["cardId"] for card in self.collection.card_views() if predicate(card)]
+
+    def action_findNotes(self, query: str):
+        predicate = compile_search(query)
+        return list(dict.fromkeys(
+            card["note"] for card in self.collection.card_views() if predicate(card)
+        ))
+
+    def action_notesInfo(self, notes: List[int]):
+        cards_by_note = self._card_index()
+        infos = []
+        for note_id in notes:
+            note = self.collection.notes.get(note_id)
+            if note is None:
+                infos.append({})
+                continue
+            infos.append({
+                "noteId": note_id,
+                "modelName": note["model"],
+                "fields": {
+                    name: {"value": value, "order": order}
+                    for order, (name, value) in enumerate(note["fields"].items())
+                },
+                "tags": list(note["tags"]),
+                "cards": cards_by_note.get(note_id, []),
+                "mod": note["mod"]
+            })
+        return infos
+
+    def action_notesModTime(self, notes: List[int]):
+        return [
+            {"noteId": note_id, "mod": self.collection.notes[note_id]["mod"]}
+            for note_id in notes if note_id in self.collection.notes
+        ]
+
+    def action_cardsInfo(self, cards: List[int]):
+        infos = []
+        for card_id in cards:
+            card = self.collection.cards.get(card_id)
+            if card is None:
+                infos.append({})
+                continue
+            note = self.collection.notes[card["note"]]
+            infos.append({
+                "cardId": card_id,
+                "note": card["note"],
+                "deckName": card["deck"],
+                "modelName": note["model"],
+                "ord": card["ord"],
+                "fields": {
+                    name: {"value": value, "order": order}
+                    for order, (name, value) in enumerate(note["fields"].items())
+                },
+                "mod": note["mod"]
+            })
+        return infos
+
+    def action_cardsToNotes(self, cards: List[int]):
+        return list(dict.fromkeys(
+            self.collection.cards[card_id]["note"] for card_id in cards if card_id in self.collection.cards
+        ))
+
+    def action_updateNoteFields(self, note: Dict):
+        stored = self.collection.notes.get(note["id"])
+        if stored is None:
+            raise ValueError("note was not found")
+        for name, value in note.get("fields", {}).items():
+            if name in stored["fields"]:
+                stored["fields"][name] = value
+        stored["mod"] = int(time.time())
+        self.collection.dirty.add(note["id"])
+        return None
+
+    def action_modelNames(self):
+        return sorted(model["name"] for model in self.collection.models.values())
+
+    def action_createModel(self, modelName: str, inOrderFields: List[str], cardTemplates: List[Dict],
+                           css: str = "", **_):
+        if modelName in self.action_modelNames():
+            raise ValueError("Model name already exists")
+        model_id = max(self.collection.models, default=0) + 1
+        self.collection.models[model_id] = {
+            "name": modelName,
+            "fields": list(inOrderFields),
+            "sortf": 0,
+            "templates": len(cardTemplates)
+        }
+        return {"id": model_id, "name": modelName}
+
+    def action_createDeck(self, deck: str):
+        for deck_id, name in self.collection.decks.items():
+            if name == deck:
+                return deck_id
+        deck_id = max(self.collection.decks, default=1) + 1
+        self.collection.decks[deck_id] = deck
+        return deck_id
+
+    def action_addNotes(self, notes: List[Dict]):
+        """Add notes (one card per template); None marks a note that was rejected."""
+        models = {model["name"]: model for model in self.collection.models.values()}
+        decks = set(self.collection.decks.values())
+        next_note = max(self.collection.notes, default=int(time.time() * 1000)) + 1
+        next_card = max(self.collection.cards, default=next_note * 10) + 1
+
+        note_ids = []
+        for note in notes:
+            model = models.get(note.get("modelName"))
+            if model is None or note.get("deckName") not in decks:
+                note_ids.append(None)
+                continue
+            self.collection.notes[next_note] = {
+                "model": model["name"],
+                "fields": {name: note.get("fields", {}).get(name, "") for name in model["fields"]},
+                "tags": list(note.get("tags", [])),
+                "mod": int(time.time())
+            }
+            for ord_ in range(model.get("templates", 1)):
+                self.collection.cards[next_card] = {"note": next_note, "deck": note["deckName"], "ord": ord_}
+                next_card += 1
+            note_ids.append(next_note)
+            next_note += 1
+
+        self._cards_by_note = None
+        return note_ids
+
+    def action_changeDeck(self, cards: List[int], deck: str):
+        self.action_createDeck(deck)
+        for card_id in cards:
+            if card_id in self.collection.cards:
+                self.collection.cards[card_id]["deck"] = deck
+        return None
+
+    def action_multi(self, actions: List[Dict]):
+        results = []
+        for entry in actions:
+            try:
+                result = self.execute(entry["action"], entry.get("params", {}))
+                results.append({"result": result, "error": None})
+            except Exception as e:
+                results.append({"result": None, "error": str(e)})
+        return results
+
+    def _card_index(self) -> Dict[int, List[int]]:
+        """note id -> card ids (rebuilt after addNotes)."""
+        if self._cards_by_note is None:
+            self._cards_by_note = {}
+            for card_id, card in self.collection.cards.items():
+                self._cards_by_note.setdefault(card["note"], []).append(card_id)
+        return self._cards_by_note
+
+
+class RequestLog:
+    """Per-request timings recorded by the server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries: List[Dict] = []
+
+    def add(self, action: str, actions: int, elapsed: float):
+        with self._lock:
+            self.entries.append({"action": action, "actions": actions, "elapsed": elapsed})
+
+    def reset(self):
+        with self._lock:
+            self.entries = []
+
+    def summary(self) -> Dict:
+        """Request/action counts, total handling time and latency percentiles."""
+        with self._lock:
+            timings = sorted(entry["elapsed"] for entry in self.entries)
+            by_action: Dict[str, int] = {}
+            for entry in self.entries:
+                by_action[entry["action"]] = by_action.get(entry["action"], 0) + 1
+            return {
+                "requests": len(self.entries),
+                "actions": sum(entry["actions"] for entry in self.entries),
+                "by_action": by_action,
+                "total_time": sum(timings),
+                "p50_ms": _percentile(timings, 0.50) * 1000,
+                "p95_ms": _percentile(timings, 0.95) * 1000
+            }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+class AnkiStandInServer:
+    """Threaded HTTP front end speaking the AnkiConnect protocol."""
+
+    def __init__(self, collection: StandInCollection, host: str = "127.0.0.1",
+                 port: int = 8765, latency: float = 0.0):
+        """
+        Create the server (call start() to begin serving).
+
+        Args:
+            collection: Notes and cards to serve
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Artificial delay added to every HTTP request, in seconds
+        """
+        self.standin = AnkiStandIn(collection)
+        self.latency = latency
+        self.log = RequestLog()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self) -> "AnkiStandInServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle(self, request: Dict) -> Dict:
+        """Answer one AnkiConnect request body."""
+        action = request.get("action", "")
+        params = request.get("params") or {}
+        start = time.perf_counter()
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.standin.lock:
+            try:
+                response = {"result": self.standin.execute(action, params), "error": None}
+            except Exception as e:
+                response = {"result": None, "error": str(e)}
+
+        actions = len(params.get("actions", [])) if action == "multi" else 1
+        self.log.add(action, actions, time.perf_counter() - start)
+        return response
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    response = server.handle(request)
+                except ValueError as e:
+                    response = {"result": None, "error": f"invalid request: {e}"}
+
+                body = json.dumps(response).encode("utf-8")
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    logger.debug("Client disconnected before the response was sent")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an .apkg over the AnkiConnect protocol")
+    parser.add_argument('--apkg', required=True, help='Deck package to serve')
+    parser.add_argument('--notes', type=int, help='Resize the collection to this many notes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Artificial latency per request, in ms')
+    parser.add_argument('--save', metavar='PATH', help='On exit, write edited notes to this .apkg')
+    args = parser.parse_args()
+
+    collection = StandInCollection.from_apkg(args.apkg, args.notes)
+    server = AnkiStandInServer(collection, args.host, args.port, args.latency / 1000)
+
+    print(f"🧪 Anki stand-in serving {len(collection.notes)} notes / {len(collection.cards)} cards")
+    print(f"   {server.url}  (latency {args.latency:g} ms) - Ctrl+C to stop")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+    summary = server.log.summary()
+    print(f"\n📊 {summary['requests']} requests, {summary['actions']} actions, "
+          f"p95 {summary['p95_ms']:.1f} ms")
+
+    if args.save and collection.dirty:
+        if args.notes:
+            print("⚠️ Not saving: a resized collection does not match the source package")
+        else:
+            edited = len(collection.dirty)
+            collection.save(args.apkg, args.save)
+            print(f"💾 Wrote {edited} edited notes to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
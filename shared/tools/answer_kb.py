@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Answer Knowledge Base - Topic -> answer lookup shared by the answer generators.
+
+Each course keeps its topic answers in knowledge/answer_kb.json. All topic
+patterns are compiled into one Aho-Corasick automaton, so a question is
+scanned once regardless of how many topics exist. The most specific topic
+(longest whole-word match) is returned.
+"""
+
+import json
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+COURSES_DIR = Path(__file__).parent.parent.parent / "courses"
+
+
+class TopicMatcher:
+    """Aho-Corasick automaton over lowercase topic patterns.
+
+    A trailing '*' on a pattern lets it end mid-word ('alzheimer*' matches
+    "alzheimer's" and "alzheimers"); otherwise matches must be whole words.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.lengths = []
+        self.prefix = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail = [0]
+        self.output: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(patterns):
+            is_prefix = pattern.endswith("*")
+            pattern = pattern.rstrip("*").lower()
+            self.lengths.append(len(pattern))
+            self.prefix.append(is_prefix)
+
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(index)
+
+        # Breadth-first failure links; each state also reports its suffixes' matches
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                if state:
+                    fallback = self.fail[state]
+                    while fallback and char not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start, pattern index) for every whole-word match in ``text``."""
+        text = text.lower()
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+
+            for index in self.output[state]:
+                start = position + 1 - self.lengths[index]
+                end = position + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if not self.prefix[index] and end < len(text) and text[end].isalnum():
+                    continue
+                yield start, index
+
+
+def _requirements_met(entry: Dict, question_lower: str) -> bool:
+    """True if the question mentions any of the entry's required words."""
+    required = entry.get("requires")
+    return not required or any(word in question_lower for word in required)
+
+
+class AnswerKB:
+    """A course's topic answers with a compiled matcher."""
+
+    def __init__(self, data: Dict):
+        self.version = data.get("version", 1)
+        self.course = data.get("course", "")
+        self.topics: List[Dict] = data.get("topics", [])
+        self.defaults: Dict[str, List[Dict]] = data.get("defaults", {})
+
+        patterns = []
+        self._pattern_topic = []
+        for topic in self.topics:
+            for pattern in topic.get("patterns", []):
+                patterns.append(pattern)
+                self._pattern_topic.append(topic)
+        self.matcher = TopicMatcher(patterns)
+
+    @classmethod
+    def load(cls, path) -> "AnswerKB":
+        """Load a knowledge base JSON file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def match(self, question: str) -> Optional[Dict]:
+        """Return the most specific topic mentioned in the question, if any."""
+        question_lower = question.lower()
+        candidates = sorted(
+            self.matcher.finditer(question_lower),
+            key=lambda match: (-self.matcher.lengths[match[1]], match[0])
+        )
+        for _, index in candidates:
+            topic = self._pattern_topic[index]
+            if _requirements_met(topic, question_lower):
+                return topic
+        return None
+
+    def answer(self, question: str, tool: Optional[str] = None) -> Optional[str]:
+        """
+        Answer for a question's topic, or the tool's default answer.
+
+        Args:
+            question: Card question text
+            tool: Name of the calling tool, selecting its entry in "defaults"
+
+        Returns:
+            The answer text, or None if nothing matched and the tool has no default
+        """
+        question_lower = question.lower()
+        topic = self.match(question)
+        if topic:
+            for variant in topic.get("variants", []):
+                if _requirements_met(variant, question_lower):
+                    return variant["answer"]
+            return topic["answer"]
+
+        for default in self.defaults.get(tool, []):
+            if _requirements_met(default, question_lower):
+                return default["answer"]
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_answer_kb(course: str) -> AnswerKB:
+    """Load (once per process) courses/<course>/knowledge/answer_kb.json."""
+    return AnswerKB.load(COURSES_DIR / course / "knowledge" / "answer_kb.json")
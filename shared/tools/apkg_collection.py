@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+APKG Collection - Offline access to the notes inside a generated .apkg.
+
+Opens the package's SQLite collection directly so card checks and fixes can
+run at build time without Anki or AnkiConnect. Notes are read with a single
+set-based query, changes are written back in one transaction, and the
+package is re-zipped with its media untouched.
+"""
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from field_text import field_to_text
+from note_updater import field_values
+
+logger = logging.getLogger(__name__)
+
+FIELD_SEPARATOR = "\x1f"
+COLLECTION_NAMES = ("collection.anki21", "collection.anki2")
+
+
+def strip_html(text: str) -> str:
+    """Plain text of a field, as Anki uses for the sort field and checksum."""
+    return field_to_text(text, drop_css=False)
+
+
+def field_checksum(text: str) -> int:
+    """Anki's duplicate-check checksum of a note's first field."""
+    return int(hashlib.sha1(strip_html(text).encode("utf-8")).hexdigest()[:8], 16)
+
+
+class ApkgCollection:
+    """Read and rewrite the notes of an .apkg file."""
+
+    def __init__(self, apkg_path: str):
+        """
+        Extract the collection from an .apkg into a temporary directory.
+
+        Args:
+            apkg_path: Path to the .apkg file
+
+        Raises:
+            ValueError: If the package has no readable collection database
+        """
+        self.apkg_path = Path(apkg_path)
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="apkg_"))
+
+        with zipfile.ZipFile(self.apkg_path) as package:
+            names = package.namelist()
+            member = next((name for name in COLLECTION_NAMES if name in names), None)
+            if member is None:
+                shutil.rmtree(self.temp_dir, ignore_errors=True)
+                raise ValueError(f"{self.apkg_path} has no collection.anki2/anki21 database")
+            package.extract(member, self.temp_dir)
+
+        self.member = member
+        self.db_path = self.temp_dir / member
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.models = self._load_models()
+        self.decks = self._load_decks()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database and remove the temporary directory."""
+        self.conn.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _load_models(self) -> Dict[int, Dict]:
+        """Map model id -> {'name', 'fields', 'sortf'} from the col table."""
+        raw = json.loads(self.conn.execute("SELECT models FROM col").fetchone()[0])
+        models = {}
+        for model_id, model in raw.items():
+            fields = sorted(model.get("flds", []), key=lambda f: f.get("ord", 0))
+            models[int(model_id)] = {
+                "name": model.get("name", ""),
+                "fields": [f["name"] for f in fields],
+                "sortf": model.get("sortf", 0)
+            }
+        return models
+
+    def _load_decks(self) -> Dict[int, str]:
+        """Map deck id -> deck name from the col table."""
+        raw = json.loads(self.conn.execute("SELECT decks FROM col").fetchone()[0])
+        return {int(deck_id): deck.get("name", "") for deck_id, deck in raw.items()}
+
+    def notes(self, deck: Optional[str] = None) -> List[Dict]:
+        """
+        Return notes in AnkiConnect ``notesInfo`` shape.
+
+        Args:
+            deck: Optional deck name glob (e.g. 'PSYC 2240*'); subdecks included
+
+        Returns:
+            List of note dicts with noteId, modelName, fields, tags and mod
+        """
+        if deck is None:
+            rows = self.conn.execute("SELECT id, mid, flds, tags, mod FROM notes ORDER BY id")
+        else:
+            pattern = deck.lower()
+            deck_ids = [
+                deck_id for deck_id, name in self.decks.items()
+                if fnmatch.fnmatchcase(name.lower(), pattern)
+                or fnmatch.fnmatchcase(name.lower(), pattern + "::*")
+            ]
+            if not deck_ids:
+                return []
+            placeholders = ",".join("?" * len(deck_ids))
+            rows = self.conn.execute(
+                "SELECT id, mid, flds, tags, mod FROM notes WHERE id IN "
+                f"(SELECT nid FROM cards WHERE did IN ({placeholders})) ORDER BY id",
+                deck_ids
+            )
+
+        notes = []
+        for note_id, model_id, flds, tags, mod in rows:
+            model = self.models.get(model_id, {"name": "", "fields": []})
+            values = flds.split(FIELD_SEPARATOR)
+            names = model["fields"] or [f"Field {i + 1}" for i in range(len(values))]
+            notes.append({
+                "noteId": note_id,
+                "modelName": model["name"],
+                "fields": {
+                    name: {"value": values[i] if i < len(values) else "", "order": i}
+                    for i, name in enumerate(names)
+                },
+                "tags": tags.split(),
+                "mod": mod
+            })
+        return notes
+
+    def cards(self) -> List[Dict]:
+        """Return every card as {'cardId', 'note', 'deckId', 'ord'}."""
+        rows = self.conn.execute("SELECT id, nid, did, ord FROM cards ORDER BY id")
+        return [
+            {"cardId": card_id, "note": note_id, "deckId": deck_id, "ord": ord_}
+            for card_id, note_id, deck_id, ord_ in rows
+        ]
+
+    def update_notes(self, changes: Dict[int, Dict[str, str]]) -> List[int]:
+        """
+        Write field changes back in one transaction.
+
+        Sort field and first-field checksum are recomputed, and notes are
+        marked modified (mod/usn) so Anki picks the changes up on import.
+
+        Args:
+            changes: note id -> {field name: new value}
+
+        Returns:
+            Ids of the notes updated; ids missing from the collection are skipped
+        """
+        if not changes:
+            return []
+
+        note_ids = list(changes)
+        current = {}
+        for i in range(0, len(note_ids), 500):
+            chunk = note_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for note_id, model_id, flds in self.conn.execute(
+                f"SELECT id, mid, flds FROM notes WHERE id IN ({placeholders})", chunk
+            ):
+                current[note_id] = (model_id, flds.split(FIELD_SEPARATOR))
+
+        now = int(time.time())
+        rows = []
+        updated = []
+        for note_id, fields in changes.items():
+            if note_id not in current:
+                continue
+            updated.append(note_id)
+            model_id, values = current[note_id]
+            model = self.models.get(model_id, {"fields": [], "sortf": 0})
+            for name, value in fields.items():
+                if name in model["fields"]:
+                    index = model["fields"].index(name)
+                    values += [""] * (index + 1 - len(values))
+                    values[index] = value
+
+            sort_index = model["sortf"] if model["sortf"] < len(values) else 0
+            rows.append((
+                FIELD_SEPARATOR.join(values),
+                strip_html(values[sort_index]),
+                field_checksum(values[0]),
+                now,
+                note_id
+            ))
+
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE notes SET flds = ?, sfld = ?, csum = ?, mod = ?, usn = -1 WHERE id = ?",
+                rows
+            )
+        return updated
+
+    def save(self, output_path: Optional[str] = None) -> Path:
+        """
+        Repackage the collection, copying every other member unchanged.
+
+        Args:
+            output_path: Destination .apkg (defaults to overwriting the source)
+
+        Returns:
+            Path of the written package
+        """
+        output_path = Path(output_path) if output_path else self.apkg_path
+        self.conn.commit()
+
+        fd, temp_name = tempfile.mkstemp(suffix=".apkg", dir=str(output_path.parent))
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(self.apkg_path) as source, \
+                    zipfile.ZipFile(temp_name, "w", zipfile.ZIP_DEFLATED) as target:
+                for info in source.infolist():
+                    if info.filename == self.member:
+                        target.write(self.db_path, self.member)
+                    else:
+                        with source.open(info) as src, target.open(info, "w") as dst:
+                            shutil.copyfileobj(src, dst)
+            os.replace(temp_name, output_path)
+        except Exception:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+
+        logger.info(f"Saved {output_path}")
+        return output_path
+
+
+class ApkgNoteUpdater:
+    """BulkNoteUpdater counterpart that writes to an ApkgCollection."""
+
+    def __init__(self, collection: ApkgCollection):
+        self.collection = collection
+        self.pending: Dict[int, Dict[str, str]] = {}
+        self.unchanged = 0
+
+    def stage(self, note_id: int, proposed: Dict[str, str], original: Optional[Dict] = None) -> bool:
+        """Stage the fields that differ from the original values."""
+        current = field_values(original) if original else {}
+        changes = {
+            name: value for name, value in proposed.items()
+            if name not in current or current[name] != value
+        }
+        if not changes:
+            self.unchanged += 1
+            return False
+        self.pending.setdefault(note_id, {}).update(changes)
+        return True
+
+    def flush(self) -> Dict:
+        """Write all staged changes; returns the same summary as BulkNoteUpdater.flush."""
+        updated = self.collection.update_notes(self.pending)
+        written = set(updated)
+        summary = {
+            'updated': updated,
+            'failed': {
+                note_id: "note not found in package"
+                for note_id in self.pending if note_id not in written
+            },
+            'unchanged': self.unchanged,
+            'fields_sent': sum(len(changes) for changes in self.pending.values())
+        }
+        self.pending = {}
+        self.unchanged = 0
+        return summary
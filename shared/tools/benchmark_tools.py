@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK TOOLS - Run the AnkiConnect fixers against the local stand-in
+Each tool runs as a subprocess against a fresh anki_standin.py server, with
+its own throwaway note mirror and fix journals, at several collection
+sizes. The server logs every request, so batching and concurrency changes
+show up as request counts, total time and p95 request latency.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Shared tools live alongside this script
+sys.path.insert(0, str(Path(__file__).parent))
+from anki_standin import AnkiStandInServer, StandInCollection
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+DEFAULT_SOURCE = REPO_ROOT / "courses" / "PSYC2240" / "output" / "PSYC2240_Consolidated_Deck.apkg"
+
+TOOLS = {
+    "css_cleaner": "shared/tools/css_cleaner.py",
+    "corruption_fixer": "shared/tools/corruption_fixer.py",
+    "content_restorer": "shared/tools/content_restorer.py",
+    "smart_content_fixer": "shared/tools/smart_content_fixer.py",
+    "validate_clean": "shared/tools/validate_clean.py",
+    "rule_engine": "shared/tools/rule_engine.py",
+    "manual_optimizer": "courses/PSYC2240/tools/manual_optimizer.py",
+    "comprehensive_card_searcher": "courses/PSYC2240/tools/comprehensive_card_searcher.py",
+}
+
+
+def run_tool(name: str, source: Path, size: int, latency: float, timeout: float) -> dict:
+    """Run one tool against a fresh stand-in of ``size`` notes and return its stats."""
+    collection = StandInCollection.from_apkg(str(source), size)
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as temp_dir, \
+            AnkiStandInServer(collection, port=0, latency=latency) as server:
+        env = dict(os.environ)
+        env["ANKI_CONNECT_URL"] = server.url
+        env["NOTE_MIRROR_DB"] = str(Path(temp_dir) / "note_mirror.sqlite")
+        env["FIX_JOURNAL_DIR"] = str(Path(temp_dir) / "journals")
+        env["PYTHONIOENCODING"] = "utf-8"
+
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run(
+                [sys.executable, str(REPO_ROOT / TOOLS[name])],
+                cwd=temp_dir, env=env, timeout=timeout,
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+            )
+            status = "ok" if completed.returncode == 0 else f"exit {completed.returncode}"
+            if completed.returncode:
+                print(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else status)
+        except subprocess.TimeoutExpired:
+            status = "timeout"
+        elapsed = time.perf_counter() - start
+
+        summary = server.log.summary()
+
+    return {
+        "tool": name,
+        "notes": size,
+        "status": status,
+        "wall_time": elapsed,
+        "requests": summary["requests"],
+        "actions": summary["actions"],
+        "p50_ms": summary["p50_ms"],
+        "p95_ms": summary["p95_ms"],
+        "edited": len(collection.dirty),
+        "by_action": summary["by_action"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AnkiConnect tools against a local stand-in")
+    parser.add_argument('--sizes', default='1000,10000,50000', help='Comma-separated note counts')
+    parser.add_argument('--tools', help=f"Comma-separated tools (default: all of {', '.join(TOOLS)})")
+    parser.add_argument('--source', default=str(DEFAULT_SOURCE), help='.apkg whose notes are served')
+    parser.add_argument('--latency', type=float, default=0.0, help='Artificial latency per request, in ms')
+    parser.add_argument('--timeout', type=float, default=900, help='Per-run timeout in seconds')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results to a JSON file')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    tools = [tool.strip() for tool in args.tools.split(',')] if args.tools else list(TOOLS)
+    unknown = set(tools) - set(TOOLS)
+    if unknown:
+        parser.error(f"unknown tools: {', '.join(sorted(unknown))}")
+
+    print("⏱️  ANKICONNECT TOOL BENCHMARK")
+    print("=" * 86)
+    print(f"Source: {Path(args.source).name}   latency: {args.latency:g} ms/request")
+    print(f"{'tool':<28} {'notes':>7} {'requests':>9} {'actions':>9} {'time s':>8} "
+          f"{'p95 ms':>8} {'edited':>7}  status")
+
+    results = []
+    for size in sizes:
+        for tool in tools:
+            result = run_tool(tool, Path(args.source), size, args.latency / 1000, args.timeout)
+            results.append(result)
+            print(f"{tool:<28} {size:>7} {result['requests']:>9} {result['actions']:>9} "
+                  f"{result['wall_time']:>8.2f} {result['p95_ms']:>8.1f} {result['edited']:>7}  {result['status']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,197 +4,88 @@ CONTENT RESTORER - Add proper content to CSS-cleaned cards
 Fixes cards that now have clean questions but need proper answers
 """
 
-import requests
+import argparse
+import sys
+from pathlib import Path
 import re
 
+# Shared AnkiConnect client, note updater and note mirror live alongside this script
+sys.path.insert(0, str(Path(__file__).parent))
+from anki_connect import AnkiConnectClient
+from note_updater import BulkNoteUpdater
+from note_mirror import NoteMirror
+from fix_journal import FixJournal, add_journal_arguments, run_saved_plan
+from answer_kb import load_answer_kb
+
+COURSE = "PSYC2240"
+DECK_QUERY = 'deck:"PSYC 2240*"'
+
 class ContentRestorer:
     def __init__(self):
-        self.url = "http://127.0.0.1:8765"
+        self.anki = AnkiConnectClient()
+        self.mirror = NoteMirror(self.anki)
         self.restored_count = 0
         
     def anki_request(self, action, params=None):
         """Make request to AnkiConnect"""
-        payload = {"action": action, "version": 6}
-        if params:
-            payload["params"] = params
-        
-        try:
-            response = requests.post(self.url, json=payload, timeout=10)
-            return response.json()
-        except Exception as e:
-            print(f"AnkiConnect error: {e}")
-            return {"error": str(e)}
+        return self.anki.request(action, params)
     
-    def generate_answer_from_question(self, question):
-        """Generate appropriate answer based on the question"""
-        question_lower = question.lower()
-        
-        # Neural transmission
-        if "neural transmission" in question_lower:
-            return "Action potentials travel down axons via depolarization, releasing neurotransmitters at synapses."
-        
-        # Cerebellum
-        if "cerebellum" in question_lower:
-            return "Coordinates voluntary movements, maintains balance, and supports cognitive functions like learning."
-        
-        # Brain disease/disorder
-        if "brain disease" in question_lower or "brain disorder" in question_lower:
-            return "Disrupts normal neural function through cell death, inflammation, or chemical imbalances."
-        
-        # Parkinson's disease
-        if "parkinson" in question_lower:
-            return "Movement disorder caused by dopamine neuron loss in substantia nigra, treated with L-DOPA or DBS."
-        
-        # Visual processing
-        if "visual processing" in question_lower:
-            return "Primary visual cortex processes basic features; higher areas recognize objects and motion."
-        
-        # Brain injury
-        if "brain injury" in question_lower:
-            return "Damages neural tissue, affecting cognition and behavior; recovery depends on neuroplasticity."
-        
-        # Deep brain stimulation (DBS)
-        if "dbs" in question_lower or "deep brain stimulation" in question_lower:
-            return "Electrical stimulation of specific brain regions to treat movement disorders and depression."
-        
-        # Dopamine
-        if "dopamine" in question_lower or "da levels" in question_lower:
-            return "Neurotransmitter controlling movement and reward; deficient in Parkinson's disease."
-        
-        # Brain organoids
-        if "organoid" in question_lower:
-            return "Lab-grown brain tissue models used to study neurodevelopment and disease mechanisms."
-        
-        # Brain chemistry
-        if "brain chemistry" in question_lower:
-            return "Measured through CSF analysis, PET scans, or postmortem tissue examination."
-        
-        # Animal models
-        if "animal" in question_lower and "model" in question_lower:
-            return "Used to study human brain diseases; mice, rats, and primates provide different insights."
-        
-        # Brain imaging
-        if "ct" in question_lower or "mri" in question_lower:
-            return "Structural imaging techniques revealing brain damage, atrophy, and anatomical changes."
-        
-        # Brain regions - temporal lobe
-        if "temporal lobe" in question_lower:
-            return "Processes auditory information, language comprehension, and memory formation."
-        
-        # Brain regions - parietal lobe  
-        if "parietal lobe" in question_lower:
-            return "Integrates sensory information and supports spatial processing and attention."
-        
-        # Auditory cortex
-        if "auditory cortex" in question_lower:
-            return "Primary auditory cortex processes sound; secondary areas analyze complex sounds and speech."
-        
-        # Brain metabolism
-        if "metabolism" in question_lower:
-            return "Brain glucose utilization measured by PET; abnormal in various neurological disorders."
-        
-        # Clinical neuroscience
-        if "clinical neuroscience" in question_lower:
-            return "Studies brain-behavior relationships to understand and treat neurological disorders."
-        
-        # Neurocognitive disorder
-        if "neurocognitive disorder" in question_lower:
-            return "Cognitive decline affecting memory, thinking, and daily functioning; includes dementia."
-        
-        # Lewy bodies
-        if "lewy body" in question_lower:
-            return "Protein aggregates found in Parkinson's disease and dementia; contain alpha-synuclein."
-        
-        # Addiction
-        if "addiction" in question_lower:
-            return "Chronic brain disorder involving reward system dysfunction and compulsive substance use."
-        
-        # Subthalamic nucleus
-        if "subthalamic" in question_lower:
-            return "Brain region involved in movement control; common DBS target for Parkinson's treatment."
-        
-        # Concussion
-        if "concussion" in question_lower:
-            return "Mild traumatic brain injury causing temporary dysfunction; may increase dementia risk."
-        
-        # Sudden infant death syndrome
-        if "sudden infant death" in question_lower or "sids" in question_lower:
-            return "Unexplained infant death possibly linked to brainstem respiratory control abnormalities."
-        
-        # Fetal alcohol spectrum disorder
-        if "fetal alcohol" in question_lower:
-            return "Brain developmental disorder from prenatal alcohol exposure causing cognitive deficits."
-        
-        # Tourette syndrome
-        if "tourette" in question_lower:
-            return "Neurological disorder characterized by involuntary tics and vocalizations."
-        
-        # Default answer for unclear questions
-        if "function" in question_lower:
-            return "This brain structure or process requires review - check your textbook for details."
-        
-        return "Review this concept - content needs to be verified from course materials."
+    @staticmethod
+    def needs_restoration(question, answer):
+        """Check if a card still carries placeholder or missing answer content"""
+        return (
+            "Review this answer - extracted from CSS" in answer or
+            "Review this question - extracted from CSS" in question or
+            len(answer.strip()) < 10 or
+            not answer.strip()
+        )
+    
+    @staticmethod
+    def generate_answer_from_question(question):
+        """Generate appropriate answer based on the question (courses/PSYC2240/knowledge/answer_kb.json)"""
+        return load_answer_kb(COURSE).answer(question, "content_restorer")
     
     def restore_content_to_cleaned_cards(self):
         """Find cards with placeholder answers and restore proper content"""
         print("🔍 Finding cards needing content restoration...")
         
-        # Get all PSYC cards
-        card_response = self.anki_request("findCards", {"query": 'deck:"PSYC 2240*"'})
-        if card_response.get("error"):
-            print(f"Error finding cards: {card_response['error']}")
-            return
+        # Sync the local note mirror; only notes edited since the last run are fetched
+        sync = self.mirror.sync(DECK_QUERY)
+        if sync.get("error"):
+            print(f"Error syncing notes: {sync['error']}")
+            return 0
         
-        card_ids = card_response["result"]
-        print(f"📚 Checking {len(card_ids)} cards for placeholder content...")
+        notes = self.mirror.notes(DECK_QUERY)
+        print(f"📚 Checking {len(notes)} notes for placeholder content... ({sync['fetched']} fetched from Anki)")
         
         # Find cards needing restoration
         cards_to_restore = []
-        batch_size = 50
         
-        for i in range(0, len(card_ids), batch_size):
-            batch = card_ids[i:i + batch_size]
-            
-            # Get card details
-            info_response = self.anki_request("cardsInfo", {"cards": batch})
-            if info_response.get("error"):
-                continue
-                
-            cards = info_response["result"]
+        
+        for note in notes:
+            fields = note["fields"]
+            question = fields.get("Question", {}).get("value", "")
+            answer = fields.get("Answer", {}).get("value", "")
             
-            for card in cards:
-                fields = card["fields"]
-                question = fields.get("Question", {}).get("value", "")
-                answer = fields.get("Answer", {}).get("value", "")
-                
-                # Check if this card needs content restoration
-                needs_restoration = (
-                    "Review this answer - extracted from CSS" in answer or
-                    "Review this question - extracted from CSS" in question or
-                    len(answer.strip()) < 10 or
-                    not answer.strip()
-                )
-                
-                if needs_restoration and question.strip():
-                    cards_to_restore.append({
-                        "note_id": card["note"],
-                        "question": question.strip(),
-                        "answer": answer.strip(),
-                        "priority": fields.get("Priority", {}).get("value", ""),
-                        "source": fields.get("Source", {}).get("value", ""),
-                        "chapter": fields.get("Chapter", {}).get("value", ""),
-                        "clinical": fields.get("Clinical", {}).get("value", "")
-                    })
+            # Check if this card needs content restoration
+            if self.needs_restoration(question, answer) and question.strip():
+                cards_to_restore.append({
+                    "note_id": note["noteId"],
+                    "question": question.strip(),
+                    "answer": answer.strip(),
+                    "fields": fields
+                })
         
         print(f"⚠️  Found {len(cards_to_restore)} cards needing content restoration")
         
         if not cards_to_restore:
             print("✅ No cards need content restoration!")
-            return
+            return 0
         
         # Restore content
         print(f"\n🔧 Restoring content to {len(cards_to_restore)} cards...")
         
+        updater = BulkNoteUpdater(self.anki, journal=FixJournal("content_restorer"))
         for i, card in enumerate(cards_to_restore, 1):
             print(f"📝 Restoring card {i}/{len(cards_to_restore)}...")
             print(f"   Q: {card['question']}")
@@ -202,29 +93,17 @@ class ContentRestorer:
             # Generate appropriate answer
             new_answer = self.generate_answer_from_question(card['question'])
             print(f"   A: {new_answer}")
-            
-            # Update the card
-            update_response = self.anki_request("updateNoteFields", {
-                "note": {
-                    "id": card["note_id"],
-                    "fields": {
-                        "Question": card["question"],
-                        "Answer": new_answer,
-                        "Priority": card["priority"],
-                        "Source": card["source"],
-                        "Chapter": card["chapter"],
-                        "Clinical": card["clinical"]
-                    }
-                }
-            })
-            
-            if update_response.get("error"):
-                print(f"   ❌ Error updating: {update_response['error']}")
-            else:
-                print(f"   ✅ Content restored!")
-                self.restored_count += 1
-            
             print("-" * 60)
+            
+            updater.stage(card["note_id"], {"Answer": new_answer}, card["fields"])
+        
+        # Send only the changed fields, batched and verified
+        result = updater.flush()
+        for note_id, error in result["failed"].items():
+            print(f"   ❌ Error updating note {note_id}: {error}")
+        self.restored_count += len(result["updated"])
+        
+        print(self.anki.report())
         
         print(f"\n🎉 CONTENT RESTORATION COMPLETE!")
         print(f"✅ Successfully restored: {self.restored_count}/{len(cards_to_restore)} cards")
@@ -233,6 +112,10 @@ class ContentRestorer:
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Add proper answers to CSS-cleaned cards")
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+    
     print("🔧 CONTENT RESTORER FOR ANKI CARDS")
     print("Adding proper answers to CSS-cleaned cards")
     print("=" * 60)
@@ -247,6 +130,12 @@ def main():
     
     print("✅ AnkiConnect connected successfully")
     
+    # Finish or repeat a saved fix run without re-scanning
+    result = run_saved_plan("content_restorer", restorer.anki, args)
+    if result is not None:
+        print(f"✅ Applied {len(result['updated'])} saved fixes ({len(result['failed'])} failed)")
+        return
+    
     # Restore content
     restored_count = restorer.restore_content_to_cleaned_cards()
     
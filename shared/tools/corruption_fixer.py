@@ -4,172 +4,89 @@ CORRUPTION FIXER - Fix cards with index numbers and text fragments
 Targets cards with answers containing page references, random numbers, and mangled content
 """
 
-import requests
+import argparse
+import sys
+from pathlib import Path
 import re
 
+# Shared AnkiConnect client, note updater and note mirror live alongside this script
+sys.path.insert(0, str(Path(__file__).parent))
+from anki_connect import AnkiConnectClient
+from note_updater import BulkNoteUpdater
+from note_mirror import NoteMirror
+from fix_journal import FixJournal, add_journal_arguments, run_saved_plan
+from answer_kb import load_answer_kb
+
+COURSE = "PSYC2240"
+DECK_QUERY = 'deck:"PSYC 2240*"'
+
+# Compiled once at import
+CORRUPTION_PATTERNS = [re.compile(pattern) for pattern in [
+    r',\s*\d+,\s*\d+,\s*\d+',  # Page numbers like ", 59, 71, 377"
+    r'\d+f\s+\w+',  # Figure references like "250f Toxins"
+    r'Tower of Hanoi test',  # Random test names
+    r',\s*\d+\s*[A-Z][a-z]+',  # Pattern like ", 378 Tower"
+    r'\bf\s+[A-Z]',  # Figure markers like "f Toxins"
+    r'\d+,\s*\d+\s*[A-Z]',  # Numbers followed by capitalized words
+    r'test,\s*\d+',  # Test references with numbers
+    r'\d+\s*\w+\s*\d+\s*\w+\s*\d+',  # Multiple number-word combinations
+]]
+
 class CorruptionFixer:
     def __init__(self):
-        self.url = "http://127.0.0.1:8765"
+        self.anki = AnkiConnectClient()
+        self.mirror = NoteMirror(self.anki)
         self.fixed_count = 0
         
     def anki_request(self, action, params=None):
         """Make request to AnkiConnect"""
-        payload = {"action": action, "version": 6}
-        if params:
-            payload["params"] = params
-        
-        try:
-            response = requests.post(self.url, json=payload, timeout=10)
-            return response.json()
-        except Exception as e:
-            print(f"AnkiConnect error: {e}")
-            return {"error": str(e)}
+        return self.anki.request(action, params)
     
-    def is_corrupted_answer(self, answer):
+    @staticmethod
+    def is_corrupted_answer(answer):
         """Check if answer contains corruption patterns"""
-        corruption_patterns = [
-            r',\s*\d+,\s*\d+,\s*\d+',  # Page numbers like ", 59, 71, 377"
-            r'\d+f\s+\w+',  # Figure references like "250f Toxins"
-            r'Tower of Hanoi test',  # Random test names
-            r',\s*\d+\s*[A-Z][a-z]+',  # Pattern like ", 378 Tower"
-            r'\bf\s+[A-Z]',  # Figure markers like "f Toxins"
-            r'\d+,\s*\d+\s*[A-Z]',  # Numbers followed by capitalized words
-            r'test,\s*\d+',  # Test references with numbers
-            r'\d+\s*\w+\s*\d+\s*\w+\s*\d+',  # Multiple number-word combinations
-        ]
-        
-        for pattern in corruption_patterns:
-            if re.search(pattern, answer):
-                return True
-        return False
+        return any(pattern.search(answer) for pattern in CORRUPTION_PATTERNS)
     
-    def get_clean_answer_for_question(self, question):
-        """Generate clean answer based on question topic"""
-        question_lower = question.lower()
-        
-        # Tourette syndrome
-        if "tourette" in question_lower:
-            return "Neurological disorder characterized by involuntary motor and vocal tics, often beginning in childhood."
-        
-        # Memory and learning
-        if "tower of hanoi" in question_lower or "hanoi" in question_lower:
-            return "Problem-solving task used to assess executive function and working memory."
-        
-        # Brain structures and functions
-        if "temporal lobe" in question_lower:
-            return "Processes auditory information, language comprehension, and memory formation."
-        
-        if "parietal lobe" in question_lower:
-            return "Integrates sensory information and supports spatial processing and attention."
-        
-        if "frontal lobe" in question_lower:
-            return "Controls executive functions, motor control, and personality."
-        
-        if "occipital lobe" in question_lower:
-            return "Primary visual processing center of the brain."
-        
-        # Neurotransmitters
-        if "dopamine" in question_lower:
-            return "Neurotransmitter involved in reward, motivation, and motor control."
-        
-        if "serotonin" in question_lower:
-            return "Neurotransmitter regulating mood, sleep, and appetite."
-        
-        if "acetylcholine" in question_lower:
-            return "Neurotransmitter important for memory, learning, and muscle control."
-        
-        # Brain disorders
-        if "alzheimer" in question_lower:
-            return "Progressive neurodegenerative disease causing memory loss and cognitive decline."
-        
-        if "parkinson" in question_lower:
-            return "Movement disorder caused by dopamine neuron loss in the substantia nigra."
-        
-        if "huntington" in question_lower:
-            return "Genetic disorder causing progressive motor, cognitive, and emotional dysfunction."
-        
-        # Brain imaging
-        if "pet scan" in question_lower or "pet" in question_lower:
-            return "Brain imaging technique measuring metabolic activity using radioactive tracers."
-        
-        if "mri" in question_lower:
-            return "Magnetic resonance imaging providing detailed brain structure visualization."
-        
-        if "fmri" in question_lower:
-            return "Functional MRI measuring brain activity through blood flow changes."
-        
-        # Memory systems
-        if "working memory" in question_lower:
-            return "Temporary storage and manipulation of information for cognitive tasks."
-        
-        if "long-term memory" in question_lower:
-            return "Permanent storage system for knowledge, experiences, and skills."
-        
-        if "episodic memory" in question_lower:
-            return "Memory for specific personal experiences and events."
-        
-        # Neural processes
-        if "neuroplasticity" in question_lower:
-            return "Brain's ability to reorganize and form new neural connections."
-        
-        if "action potential" in question_lower:
-            return "Electrical signal that travels along neurons to transmit information."
-        
-        if "synapse" in question_lower or "synaptic" in question_lower:
-            return "Junction between neurons where chemical communication occurs."
-        
-        # Default for unclear questions
-        return "Review this concept in your textbook - content needs verification."
+    @staticmethod
+    def get_clean_answer_for_question(question):
+        """Generate clean answer based on question topic (courses/PSYC2240/knowledge/answer_kb.json)"""
+        return load_answer_kb(COURSE).answer(question, "corruption_fixer")
     
     def find_and_fix_corrupted_cards(self):
         """Find and fix cards with corrupted answers"""
         print("🔍 Scanning for cards with corrupted content...")
         
-        # Get all PSYC cards
-        card_response = self.anki_request("findCards", {"query": 'deck:"PSYC 2240*"'})
-        if card_response.get("error"):
-            print(f"Error finding cards: {card_response['error']}")
-            return
+        # Sync the local note mirror; only notes edited since the last run are fetched
+        sync = self.mirror.sync(DECK_QUERY)
+        if sync.get("error"):
+            print(f"Error syncing notes: {sync['error']}")
+            return 0
         
-        card_ids = card_response["result"]
-        print(f"📚 Checking {len(card_ids)} cards for corruption...")
+        notes = self.mirror.notes(DECK_QUERY)
+        print(f"📚 Checking {len(notes)} notes for corruption... ({sync['fetched']} fetched from Anki)")
         
         # Find corrupted cards
         corrupted_cards = []
-        batch_size = 50
         
-        for i in range(0, len(card_ids), batch_size):
-            batch = card_ids[i:i + batch_size]
-            print(f"   Batch {i//batch_size + 1}: Checking cards {i+1}-{min(i+batch_size, len(card_ids))}")
-            
-            # Get card details
-            info_response = self.anki_request("cardsInfo", {"cards": batch})
-            if info_response.get("error"):
-                continue
-                
-            cards = info_response["result"]
+        
+        for note in notes:
+            fields = note["fields"]
+            question = fields.get("Question", {}).get("value", "")
+            answer = fields.get("Answer", {}).get("value", "")
             
-            for card in cards:
-                fields = card["fields"]
-                question = fields.get("Question", {}).get("value", "")
-                answer = fields.get("Answer", {}).get("value", "")
+            # Check if answer is corrupted
+            if self.is_corrupted_answer(answer):
+                corrupted_cards.append({
+                    "note_id": note["noteId"],
+                    "question": question.strip(),
+                    "answer": answer.strip(),
+                    "fields": fields
+                })
                 
-                # Check if answer is corrupted
-                if self.is_corrupted_answer(answer):
-                    corrupted_cards.append({
-                        "note_id": card["note"],
-                        "question": question.strip(),
-                        "answer": answer.strip(),
-                        "priority": fields.get("Priority", {}).get("value", ""),
-                        "source": fields.get("Source", {}).get("value", ""),
-                        "chapter": fields.get("Chapter", {}).get("value", ""),
-                        "clinical": fields.get("Clinical", {}).get("value", "")
-                    })
-                    
-                    print(f"   🚨 CORRUPTED CARD FOUND:")
-                    print(f"      Q: {question[:80]}...")
-                    print(f"      A: {answer[:80]}...")
-                    print()
+                print(f"   🚨 CORRUPTED CARD FOUND:")
+                print(f"      Q: {question[:80]}...")
+                print(f"      A: {answer[:80]}...")
+                print()
         
         print(f"⚠️  Found {len(corrupted_cards)} corrupted cards")
         
@@ -180,6 +97,7 @@ class CorruptionFixer:
         # Fix corrupted cards
         print(f"\n🔧 Fixing {len(corrupted_cards)} corrupted cards...")
         
+        updater = BulkNoteUpdater(self.anki, journal=FixJournal("corruption_fixer"))
         for i, card in enumerate(corrupted_cards, 1):
             print(f"📝 Fixing card {i}/{len(corrupted_cards)}...")
             print(f"   Q: {card['question']}")
@@ -187,34 +105,26 @@ class CorruptionFixer:
             # Generate clean answer
             clean_answer = self.get_clean_answer_for_question(card['question'])
             print(f"   A: {clean_answer}")
-            
-            # Update the card
-            update_response = self.anki_request("updateNoteFields", {
-                "note": {
-                    "id": card["note_id"],
-                    "fields": {
-                        "Question": card["question"],
-                        "Answer": clean_answer,
-                        "Priority": card["priority"],
-                        "Source": card["source"],
-                        "Chapter": card["chapter"],
-                        "Clinical": card["clinical"]
-                    }
-                }
-            })
-            
-            if update_response.get("error"):
-                print(f"   ❌ Error updating: {update_response['error']}")
-            else:
-                print(f"   ✅ Fixed!")
-                self.fixed_count += 1
-            
             print("-" * 60)
+            
+            updater.stage(card["note_id"], {"Answer": clean_answer}, card["fields"])
+        
+        # Send only the changed fields, batched and verified
+        result = updater.flush()
+        for note_id, error in result["failed"].items():
+            print(f"   ❌ Error updating note {note_id}: {error}")
+        self.fixed_count += len(result["updated"])
+        
+        print(self.anki.report())
         
         return self.fixed_count
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Fix cards with index numbers and text fragments")
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+    
     print("🚨 CORRUPTION FIXER FOR ANKI CARDS")
     print("Fixing cards with index numbers and text fragments")
     print("=" * 60)
@@ -229,6 +139,12 @@ def main():
     
     print("✅ AnkiConnect connected successfully")
     
+    # Finish or repeat a saved fix run without re-scanning
+    result = run_saved_plan("corruption_fixer", fixer.anki, args)
+    if result is not None:
+        print(f"✅ Applied {len(result['updated'])} saved fixes ({len(result['failed'])} failed)")
+        return
+    
     # Fix corrupted cards
     fixed_count = fixer.find_and_fix_corrupted_cards()
     
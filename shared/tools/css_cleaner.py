@@ -4,56 +4,72 @@ CSS CLEANER - Remove embedded CSS from existing Anki cards
 Targets the specific CSS pollution problem you're experiencing
 """
 
-import requests
+import argparse
+import sys
+from pathlib import Path
 import re
-from bs4 import BeautifulSoup
+
+# Shared AnkiConnect client, note updater and note mirror live alongside this script
+sys.path.insert(0, str(Path(__file__).parent))
+from anki_connect import AnkiConnectClient
+from note_updater import BulkNoteUpdater
+from note_mirror import NoteMirror
+from fix_journal import FixJournal, add_journal_arguments, run_saved_plan
+from field_text import field_to_text
+
+DECK_QUERY = 'deck:"PSYC 2240*"'
+
+# The CSS pattern that's causing issues, plus leftovers; compiled once at import
+CSS_BLOCK_PATTERN = re.compile(r'\.card\s*\{[^}]*\}.*?\.source,\s*\.chapter\s*\{[^}]*\}', re.DOTALL)
+CSS_RULE_PATTERN = re.compile(r'\.[a-zA-Z-]+\s*\{[^}]*\}', re.DOTALL)
+PRIORITY_LABEL_PATTERN = re.compile(r'\b(HIGH|MEDIUM|LOW)\s+Priority\s+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+HOW_DOES_FUNCTION_PATTERN = re.compile(r'How does (.+?) function\?')
 
 class CSSCleaner:
     def __init__(self):
-        self.url = "http://127.0.0.1:8765"
+        self.anki = AnkiConnectClient()
+        self.mirror = NoteMirror(self.anki)
         self.cleaned_count = 0
         
     def anki_request(self, action, params=None):
         """Make request to AnkiConnect"""
-        payload = {"action": action, "version": 6}
-        if params:
-            payload["params"] = params
-        
-        try:
-            response = requests.post(self.url, json=payload, timeout=10)
-            return response.json()
-        except Exception as e:
-            print(f"AnkiConnect error: {e}")
-            return {"error": str(e)}
+        return self.anki.request(action, params)
+    
+    @staticmethod
+    def has_css_pollution(question, answer):
+        """Check if either side of a card contains embedded CSS"""
+        return (
+            ".card {" in question or ".card {" in answer or
+            "font-family:" in question or "font-family:" in answer or
+            ".priority" in question or ".priority" in answer
+        )
     
-    def extract_clean_content(self, messy_text):
+    @staticmethod
+    def extract_clean_content(messy_text):
         """Extract clean content from CSS-polluted text"""
         if not messy_text:
             return ""
         
-        # Remove HTML tags first
-        soup = BeautifulSoup(messy_text, 'html.parser')
-        text = soup.get_text()
-        
-        # The CSS pattern that's causing issues
-        css_pattern = r'\.card\s*\{[^}]*\}.*?\.source,\s*\.chapter\s*\{[^}]*\}'
+        # Remove HTML tags, style blocks and leaked .card rules first
+        text = field_to_text(messy_text)
         
         # Remove the entire CSS block
-        text = re.sub(css_pattern, '', text, flags=re.DOTALL)
+        text = CSS_BLOCK_PATTERN.sub('', text)
         
         # Remove any remaining CSS rules
-        text = re.sub(r'\.[a-zA-Z-]+\s*\{[^}]*\}', '', text, flags=re.DOTALL)
+        text = CSS_RULE_PATTERN.sub('', text)
         
         # Remove priority indicators that got mixed in
-        text = re.sub(r'\b(HIGH|MEDIUM|LOW)\s+Priority\s+', '', text)
+        text = PRIORITY_LABEL_PATTERN.sub('', text)
         
         # Clean up extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = WHITESPACE_PATTERN.sub(' ', text).strip()
         
         # If the text starts with "How does" and ends with "function?", extract the middle part
         if "How does" in text and "function?" in text:
             # Extract the actual question
-            match = re.search(r'How does (.+?) function\?', text)
+            match = HOW_DOES_FUNCTION_PATTERN.search(text)
             if match:
                 subject = match.group(1).strip()
                 return f"How does {subject} function?"
@@ -64,63 +80,41 @@ class CSSCleaner:
         """Find and clean all cards with embedded CSS"""
         print("🧹 Finding cards with embedded CSS...")
         
-        # Get all PSYC cards
-        card_response = self.anki_request("findCards", {"query": 'deck:"PSYC 2240*"'})
-        if card_response.get("error"):
-            print(f"Error finding cards: {card_response['error']}")
-            return
+        # Sync the local note mirror; only notes edited since the last run are fetched
+        sync = self.mirror.sync(DECK_QUERY)
+        if sync.get("error"):
+            print(f"Error syncing notes: {sync['error']}")
+            return 0
         
-        card_ids = card_response["result"]
-        print(f"📚 Checking {len(card_ids)} cards for CSS pollution...")
+        notes = self.mirror.notes(DECK_QUERY)
+        print(f"📚 Checking {len(notes)} notes for CSS pollution... ({sync['fetched']} fetched from Anki)")
         
-        # Process in batches
-        batch_size = 50
         css_cards = []
         
-        for i in range(0, len(card_ids), batch_size):
-            batch = card_ids[i:i + batch_size]
-            print(f"🔍 Scanning batch {i//batch_size + 1}/{(len(card_ids) + batch_size - 1)//batch_size}...")
-            
-            # Get card details
-            info_response = self.anki_request("cardsInfo", {"cards": batch})
-            if info_response.get("error"):
-                continue
-                
-            cards = info_response["result"]
+        for note in notes:
+            fields = note["fields"]
+            question = fields.get("Question", {}).get("value", "")
+            answer = fields.get("Answer", {}).get("value", "")
             
-            for card in cards:
-                fields = card["fields"]
-                question = fields.get("Question", {}).get("value", "")
-                answer = fields.get("Answer", {}).get("value", "")
-                
-                # Check if this card has CSS pollution
-                has_css = (
-                    ".card {" in question or ".card {" in answer or
-                    "font-family:" in question or "font-family:" in answer or
-                    ".priority" in question or ".priority" in answer
-                )
-                
-                if has_css:
-                    css_cards.append({
-                        "note_id": card["note"],
-                        "card_id": card["cardId"],
-                        "question": question,
-                        "answer": answer,
-                        "priority": fields.get("Priority", {}).get("value", ""),
-                        "source": fields.get("Source", {}).get("value", ""),
-                        "chapter": fields.get("Chapter", {}).get("value", ""),
-                        "clinical": fields.get("Clinical", {}).get("value", "")
-                    })
+            # Check if this card has CSS pollution
+            if self.has_css_pollution(question, answer):
+                css_cards.append({
+                    "note_id": note["noteId"],
+                    "question": question,
+                    "answer": answer,
+                    "fields": fields
+                })
         
         print(f"⚠️  Found {len(css_cards)} cards with CSS pollution")
         
         if not css_cards:
             print("✅ No CSS-polluted cards found!")
-            return
+            return 0
         
         # Clean each card
         print(f"\n🧹 Cleaning {len(css_cards)} CSS-polluted cards...")
         
+        updater = BulkNoteUpdater(self.anki, journal=FixJournal("css_cleaner"))
         for i, card in enumerate(css_cards, 1):
             print(f"📝 Cleaning card {i}/{len(css_cards)}...")
             
@@ -138,37 +132,28 @@ class CSSCleaner:
             print(f"   Clean Q: {clean_question}")
             print(f"   Original A: {card['answer'][:100]}...")
             print(f"   Clean A: {clean_answer}")
-            
-            # Update the card
-            update_response = self.anki_request("updateNoteFields", {
-                "note": {
-                    "id": card["note_id"],
-                    "fields": {
-                        "Question": clean_question,
-                        "Answer": clean_answer,
-                        "Priority": card["priority"],
-                        "Source": card["source"],
-                        "Chapter": card["chapter"],
-                        "Clinical": card["clinical"]
-                    }
-                }
-            })
-            
-            if update_response.get("error"):
-                print(f"   ❌ Error updating: {update_response['error']}")
-            else:
-                print(f"   ✅ Cleaned successfully!")
-                self.cleaned_count += 1
-            
             print("-" * 60)
+            
+            updater.stage(card["note_id"], {"Question": clean_question, "Answer": clean_answer}, card["fields"])
+        
+        # Send only the changed fields, batched and verified
+        result = updater.flush()
+        for note_id, error in result["failed"].items():
+            print(f"   ❌ Error updating note {note_id}: {error}")
+        self.cleaned_count += len(result["updated"])
         
         print(f"\n🎉 CSS CLEANING COMPLETE!")
         print(f"✅ Successfully cleaned: {self.cleaned_count}/{len(css_cards)} cards")
+        print(self.anki.report())
         
         return self.cleaned_count
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Remove embedded CSS from card fields")
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+    
     print("🧹 CSS CLEANER FOR ANKI CARDS")
     print("Removing embedded CSS from question and answer fields")
     print("=" * 60)
@@ -184,6 +169,12 @@ def main():
     
     print("✅ AnkiConnect connected successfully")
     
+    # Finish or repeat a saved fix run without re-scanning
+    result = run_saved_plan("css_cleaner", cleaner.anki, args)
+    if result is not None:
+        print(f"✅ Applied {len(result['updated'])} saved fixes ({len(result['failed'])} failed)")
+        return
+    
     # Clean CSS pollution
     cleaned_count = cleaner.clean_all_css_cards()
     
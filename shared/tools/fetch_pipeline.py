@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Fetch Pipeline - Prefetching, adaptive-batch reads from AnkiConnect.
+
+A producer thread keeps the next batches of an id-list action (notesInfo,
+cardsInfo, ...) in flight while the caller processes the current one. A
+bounded queue caps how far it runs ahead. Batch size follows the observed
+response time and payload size, additive increase and multiplicative
+decrease (AIMD), so scans run at Anki's pace and not at a fixed 50 ids per
+request. Throughput is recorded in the client's metrics report.
+
+A batch that fails is split in half and retried ahead of the remaining ids,
+so one bad note costs a few small requests instead of a whole batch. Ids
+that still fail on their own end up in ``stats['failed_ids']``; callers that
+write state derived from a scan must check it before committing.
+"""
+
+import collections
+import logging
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional
+
+from anki_connect import AnkiConnectClient
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class AdaptiveBatchSizer:
+    """AIMD batch-size controller driven by response latency and size."""
+
+    def __init__(self, initial: int = 50, minimum: int = 10, maximum: int = 2000,
+                 target_latency: float = 0.5, max_bytes: int = 8 * 1024 * 1024):
+        """
+        Args:
+            initial: First batch size
+            minimum: Smallest batch size after backing off
+            maximum: Largest batch size
+            target_latency: Response time (seconds) above which batches shrink
+            max_bytes: Response size above which batches shrink
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.size = min(max(initial, self.minimum), self.maximum)
+        self.step = max(1, initial)
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+
+    def observe(self, elapsed: float, nbytes: int, error: bool = False) -> int:
+        """Adjust the batch size after a response and return the new size."""
+        if error or elapsed > self.target_latency or nbytes > self.max_bytes:
+            self.size = max(self.minimum, self.size // 2)
+        elif elapsed < self.target_latency / 4 and nbytes < self.max_bytes / 4:
+            # Far below target: grow quickly until responses get noticeable
+            self.size = min(self.maximum, self.size * 2)
+        else:
+            self.size = min(self.maximum, self.size + self.step)
+        return self.size
+
+
+class PipelinedFetcher:
+    """Streams the results of an id-list action batch by batch."""
+
+    def __init__(self, client: AnkiConnectClient, action: str, key: str,
+                 prefetch: int = 2, sizer: Optional[AdaptiveBatchSizer] = None,
+                 max_failures: int = 5):
+        """
+        Args:
+            client: Shared AnkiConnect client
+            action: Id-list action, e.g. 'notesInfo'
+            key: Parameter name for the ids, e.g. 'notes'
+            prefetch: Batches that may wait in the queue ahead of the consumer
+            sizer: Batch-size controller (a default AdaptiveBatchSizer if None)
+            max_failures: Ids failing on their own in a row after which the
+                scan gives up (Anki is likely gone) and reports every id not
+                yet fetched as failed
+        """
+        self.client = client
+        self.action = action
+        self.key = key
+        self.prefetch = max(1, prefetch)
+        self.sizer = sizer or AdaptiveBatchSizer()
+        self.max_failures = max(1, max_failures)
+        self.stats = {'items': 0, 'batches': 0, 'failed_batches': 0, 'failed_ids': [],
+                      'bytes': 0, 'fetch_time': 0.0, 'wait_time': 0.0, 'seconds': 0.0}
+
+    def batches(self, ids: Iterable) -> Iterator[List]:
+        """
+        Yield result lists, one per batch, in id order.
+
+        Failed batches are retried in halves; ids that fail on their own are
+        logged, skipped and listed in ``stats['failed_ids']``.
+        """
+        ids = list(ids)
+        if not ids:
+            return
+
+        results: "queue.Queue" = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(ids, results, stop), daemon=True)
+
+        started = time.perf_counter()
+        producer.start()
+        try:
+            while True:
+                waited = time.perf_counter()
+                item = results.get()
+                self.stats['wait_time'] += time.perf_counter() - waited
+                if item is _DONE:
+                    break
+                if item:
+                    yield item
+        finally:
+            stop.set()
+            producer.join()
+            self.stats['seconds'] = time.perf_counter() - started
+            self.client.metrics.record_transfer(
+                self.action, self.stats['items'], self.stats['bytes'],
+                self.stats['seconds'], self.stats['batches']
+            )
+            logger.info(
+                f"{self.action} pipeline: {self.stats['items']} items in {self.stats['batches']} batches, "
+                f"{self.stats['seconds']:.2f}s ({self.stats['wait_time']:.2f}s waiting), "
+                f"final batch size {self.sizer.size}"
+            )
+            if self.stats['failed_ids']:
+                logger.warning(f"{self.action} pipeline: {len(self.stats['failed_ids'])} ids could not be fetched")
+
+    def fetch_all(self, ids: Iterable) -> List:
+        """Fetch everything and return one flat list."""
+        return [item for batch in self.batches(ids) for item in batch]
+
+    def _produce(self, ids: List, results: "queue.Queue", stop: threading.Event):
+        """Request batches until done, blocking while the queue is full."""
+        position = 0
+        retry = collections.deque()
+        failures = 0
+        try:
+            while (retry or position < len(ids)) and not stop.is_set():
+                if retry:
+                    chunk = retry.popleft()
+                else:
+                    chunk = ids[position:position + self.sizer.size]
+                    position += len(chunk)
+
+                response, elapsed, nbytes = self.client.timed_request(self.action, {self.key: chunk})
+                error = response.get('error')
+                self.sizer.observe(elapsed, nbytes, bool(error))
+
+                self.stats['batches'] += 1
+                self.stats['bytes'] += nbytes
+                self.stats['fetch_time'] += elapsed
+                if error:
+                    self.stats['failed_batches'] += 1
+                    if len(chunk) == 1:
+                        failures += 1
+                        self.stats['failed_ids'].extend(chunk)
+                        logger.warning(f"{self.action} failed for id {chunk[0]}: {error}")
+                        if failures >= self.max_failures:
+                            remaining = [i for part in retry for i in part] + ids[position:]
+                            self.stats['failed_ids'].extend(remaining)
+                            logger.warning(f"{self.action} failed for {failures} ids in a row, "
+                                           f"giving up on the remaining {len(remaining)}")
+                            return
+                        continue
+                    # Retry both halves before moving on, keeping id order
+                    half = min(self.sizer.size, (len(chunk) + 1) // 2)
+                    parts = [chunk[i:i + half] for i in range(0, len(chunk), half)]
+                    retry.extendleft(reversed(parts))
+                    logger.debug(f"{self.action} failed for {len(chunk)} ids, retrying in "
+                                 f"{len(parts)} batches: {error}")
+                    continue
+                failures = 0
+
+                items = response.get('result') or []
+                self.stats['items'] += len(items)
+                if not self._put(results, items, stop):
+                    return
+        finally:
+            self._put(results, _DONE, stop)
+
+    @staticmethod
+    def _put(results: "queue.Queue", item, stop: threading.Event) -> bool:
+        """Queue an item, giving up if the consumer has stopped reading."""
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
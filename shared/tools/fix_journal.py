@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Fix Journal - On-disk record of a fix run, for --resume and --replay.
+
+When a fix tool flushes its staged changes, the full fix plan (note id ->
+fields to write) is written to a JSON-lines journal under
+processing/journals/<tool>/. Every verified batch then appends the note ids
+it applied or failed. If the run is interrupted, --resume sends only the
+planned fixes not yet applied. --replay sends a saved plan again, all of it.
+Neither option re-scans the collection.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from anki_connect import AnkiConnectClient
+from note_updater import BulkNoteUpdater
+
+logger = logging.getLogger(__name__)
+
+# FIX_JOURNAL_DIR overrides the location (e.g. throwaway journals per benchmark run)
+JOURNAL_DIR = Path(os.environ.get(
+    "FIX_JOURNAL_DIR",
+    Path(__file__).parent.parent.parent / "processing" / "journals"
+))
+
+
+class FixJournal:
+    """Append-only journal of one fix session."""
+
+    def __init__(self, tool: str, path: Optional[Path] = None):
+        """
+        Open a journal.
+
+        Args:
+            tool: Tool name; journals are grouped per tool
+            path: Existing journal to continue (default: a new session file,
+                created when the plan is recorded)
+        """
+        self.tool = tool
+        self.path = Path(path) if path else JOURNAL_DIR / tool / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl"
+        self.has_plan = self.path.exists() and bool(self.load()["plan"])
+
+    @classmethod
+    def latest(cls, tool: str) -> Optional["FixJournal"]:
+        """The most recent journal of a tool, if any."""
+        journals = sorted((JOURNAL_DIR / tool).glob("*.jsonl"))
+        return cls(tool, journals[-1]) if journals else None
+
+    def _append(self, record: Dict):
+        """Write one record and force it to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        record["time"] = time.time()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_plan(self, plan: Dict[int, Dict[str, str]]):
+        """Record the fixes a run is about to send."""
+        self._append({
+            "type": "plan",
+            "tool": self.tool,
+            "changes": [{"note_id": note_id, "fields": fields} for note_id, fields in plan.items()]
+        })
+        self.has_plan = True
+
+    def record_batch(self, updated: List[int], failed: Dict[int, str]):
+        """Record the outcome of one verified batch."""
+        self._append({
+            "type": "batch",
+            "updated": updated,
+            "failed": {str(note_id): error for note_id, error in failed.items()}
+        })
+
+    def record_complete(self, summary: Dict):
+        """Mark the run as finished."""
+        self._append({
+            "type": "complete",
+            "updated": len(summary.get("updated", [])),
+            "failed": len(summary.get("failed", {}))
+        })
+
+    def load(self) -> Dict:
+        """
+        Read the journal back.
+
+        Returns:
+            Dict with 'plan' (note id -> fields), 'applied' (set of note ids),
+            'failed' (note id -> last error) and 'complete' (bool)
+        """
+        state = {"plan": {}, "applied": set(), "failed": {}, "complete": False}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping truncated journal line in {self.path}")
+                    continue
+
+                if record["type"] == "plan":
+                    for change in record["changes"]:
+                        state["plan"][change["note_id"]] = change["fields"]
+                elif record["type"] == "batch":
+                    state["applied"].update(record["updated"])
+                    for note_id, error in record["failed"].items():
+                        state["failed"][int(note_id)] = error
+                elif record["type"] == "complete":
+                    state["complete"] = True
+
+        for note_id in state["applied"]:
+            state["failed"].pop(note_id, None)
+        return state
+
+    def remaining(self) -> Dict[int, Dict[str, str]]:
+        """Planned fixes that have not been applied yet."""
+        state = self.load()
+        return {
+            note_id: fields for note_id, fields in state["plan"].items()
+            if note_id not in state["applied"]
+        }
+
+
+def add_journal_arguments(parser):
+    """Add --resume and --replay to a fix tool's argument parser."""
+    parser.add_argument('--resume', action='store_true',
+                        help='Apply the unfinished fixes of the last run without re-scanning')
+    parser.add_argument('--replay', nargs='?', const='latest', metavar='JOURNAL',
+                        help='Re-apply a saved fix plan (default: the last run) without re-scanning')
+
+
+def run_saved_plan(tool: str, client: AnkiConnectClient, args,
+                   normalize: Optional[Callable[[str], str]] = None) -> Optional[Dict]:
+    """
+    Handle --resume/--replay for a tool.
+
+    Returns:
+        The updater's flush summary, or None if neither option was given.
+        Prints a message and returns an empty summary if there is no journal.
+    """
+    if not args.resume and not args.replay:
+        return None
+
+    if args.replay and args.replay != 'latest':
+        source = FixJournal(tool, Path(args.replay))
+    else:
+        source = FixJournal.latest(tool)
+
+    empty = {'updated': [], 'failed': {}, 'unchanged': 0, 'fields_sent': 0}
+    if source is None or not source.has_plan:
+        print(f"📭 No saved fix plan for {tool}")
+        return empty
+
+    if args.resume:
+        plan = source.remaining()
+        journal = source
+        print(f"⏯️  Resuming {source.path.name}: {len(plan)} planned fixes left")
+    else:
+        plan = source.load()["plan"]
+        journal = FixJournal(tool)
+        print(f"🔁 Replaying {source.path.name}: {len(plan)} planned fixes")
+
+    if not plan:
+        print("✅ Nothing left to apply")
+        return empty
+
+    updater = BulkNoteUpdater(client, normalize=normalize, journal=journal)
+    for note_id, fields in plan.items():
+        updater.stage(note_id, fields)
+    return updater.flush()
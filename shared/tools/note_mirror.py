@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Note Mirror - Local SQLite copy of Anki notes, synced incrementally.
+
+Scanning tools read notes from the mirror instead of pulling the whole deck
+through AnkiConnect on every run. A sync asks Anki which notes match the
+query and which of them were edited since the previous sync (``edited:N``),
+confirms real changes with note modification times and fetches only those
+notes. Notes that no longer match the query are dropped.
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from anki_connect import AnkiConnectClient
+from fetch_pipeline import PipelinedFetcher
+
+logger = logging.getLogger(__name__)
+
+# NOTE_MIRROR_DB overrides the location (e.g. a throwaway mirror per benchmark run)
+DEFAULT_DB_PATH = Path(os.environ.get(
+    "NOTE_MIRROR_DB",
+    Path(__file__).parent.parent.parent / "processing" / "cache" / "note_mirror.sqlite"
+))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    note_id INTEGER PRIMARY KEY,
+    model TEXT,
+    fields TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    mod INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_scope (
+    query TEXT NOT NULL,
+    note_id INTEGER NOT NULL,
+    PRIMARY KEY (query, note_id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    query TEXT PRIMARY KEY,
+    last_sync REAL NOT NULL
+);
+"""
+
+
+class NoteMirror:
+    """SQLite mirror of the notes matching one or more Anki search queries."""
+
+    def __init__(self, client: AnkiConnectClient, db_path: Optional[Path] = None):
+        """
+        Open (or create) the mirror database.
+
+        Args:
+            client: Shared AnkiConnect client
+            db_path: Mirror database location (defaults to processing/cache/)
+        """
+        self.client = client
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def sync(self, query: str, full: bool = False) -> Dict:
+        """
+        Bring the mirror up to date for a search query.
+
+        Args:
+            query: Anki search query (e.g. 'deck:"PSYC 2240*"')
+            full: Ignore the previous sync and refetch every matching note
+
+        Returns:
+            Dict with 'total', 'fetched' and 'removed' note counts, plus an
+            'error' key if Anki could not be queried or some notes could not
+            be fetched (those are retried on the next sync)
+        """
+        started = time.time()
+        last_sync = None if full else self._last_sync(query)
+
+        lookups = [("findNotes", {"query": query})]
+        if last_sync is not None:
+            # edited:N has day granularity; mod times below narrow it down
+            days = max(1, math.ceil((started - last_sync) / 86400))
+            lookups.append(("findNotes", {"query": f"({query}) edited:{days}"}))
+
+        responses = self.client.multi(lookups)
+        errors = [response["error"] for response in responses if response.get("error")]
+        if errors:
+            logger.warning(f"Mirror sync failed for {query}: {errors[0]}")
+            return {'total': 0, 'fetched': 0, 'removed': 0, 'error': errors[0]}
+
+        current = set(responses[0].get("result") or [])
+        known = self._scope_ids(query)
+
+        if last_sync is None:
+            candidates = current
+        else:
+            edited = set(responses[1].get("result") or [])
+            candidates = (current - known) | (edited & current)
+
+        stale = self._filter_stale(candidates)
+        removed = known - current
+        fetched = 0
+
+        fetcher = PipelinedFetcher(self.client, "notesInfo", "notes")
+
+        with self.conn:
+            # Store each batch while the next ones are still being fetched
+            for notes in fetcher.batches(stale):
+                self._store_notes(notes, started)
+                fetched += len(notes)
+            # Notes that could not be fetched stay out of scope (or keep their
+            # old mod time) so the next sync picks them up again
+            failed = set(fetcher.stats['failed_ids'])
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO note_scope (query, note_id) VALUES (?, ?)",
+                ((query, note_id) for note_id in current - known - failed)
+            )
+            self.conn.executemany(
+                "DELETE FROM note_scope WHERE query = ? AND note_id = ?",
+                ((query, note_id) for note_id in removed)
+            )
+            self.conn.execute(
+                "DELETE FROM notes WHERE note_id NOT IN (SELECT note_id FROM note_scope)"
+            )
+            if not failed:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (query, last_sync) VALUES (?, ?)",
+                    (query, started)
+                )
+
+        logger.info(
+            f"Mirror sync {query}: {len(current)} notes, {fetched} fetched, {len(removed)} removed"
+        )
+        summary = {'total': len(current), 'fetched': fetched, 'removed': len(removed)}
+        if failed:
+            logger.warning(f"Mirror sync {query}: {len(failed)} notes could not be fetched")
+            summary['error'] = f"notesInfo failed for {len(failed)} notes"
+        return summary
+
+    def iter_notes(self, query: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Yield mirrored notes in AnkiConnect ``notesInfo`` shape.
+
+        Args:
+            query: Only yield notes matched by this synced query (all notes if None)
+        """
+        if query is None:
+            rows = self.conn.execute(
+                "SELECT note_id, model, fields, tags, mod FROM notes ORDER BY note_id"
+            )
+        else:
+            rows = self.conn.execute(
+                "SELECT n.note_id, n.model, n.fields, n.tags, n.mod FROM notes n "
+                "JOIN note_scope s ON s.note_id = n.note_id WHERE s.query = ? ORDER BY n.note_id",
+                (query,)
+            )
+
+        for note_id, model, fields, tags, mod in rows:
+            yield {
+                "noteId": note_id,
+                "modelName": model,
+                "fields": json.loads(fields),
+                "tags": json.loads(tags),
+                "mod": mod
+            }
+
+    def notes(self, query: Optional[str] = None) -> List[Dict]:
+        """Return mirrored notes as a list (see iter_notes)."""
+        return list(self.iter_notes(query))
+
+    def _last_sync(self, query: str) -> Optional[float]:
+        """Return the time of the last sync for a query, if any."""
+        row = self.conn.execute(
+            "SELECT last_sync FROM sync_state WHERE query = ?", (query,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _scope_ids(self, query: str) -> Set[int]:
+        """Return the note ids the mirror currently holds for a query."""
+        return {
+            row[0] for row in
+            self.conn.execute("SELECT note_id FROM note_scope WHERE query = ?", (query,))
+        }
+
+    def _filter_stale(self, note_ids: Set[int]) -> List[int]:
+        """
+        Keep only notes that are missing locally or whose Anki mod time changed.
+
+        Falls back to treating every candidate as stale if the connected
+        AnkiConnect does not support ``notesModTime``.
+        """
+        if not note_ids:
+            return []
+
+        stored = self._stored_mods(note_ids)
+        unknown = [note_id for note_id in note_ids if note_id not in stored]
+        known = [note_id for note_id in note_ids if note_id in stored]
+        if not known:
+            return unknown
+
+        response = self.client.request("notesModTime", {"notes": known})
+        if response.get("error"):
+            return unknown + known
+
+        changed = [
+            item["noteId"] for item in response.get("result") or []
+            if item.get("mod") != stored.get(item.get("noteId"))
+        ]
+        return unknown + changed
+
+    def _stored_mods(self, note_ids: Set[int]) -> Dict[int, int]:
+        """Look up the stored mod time for each note id present locally."""
+        mods = {}
+        ids = list(note_ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for note_id, mod in self.conn.execute(
+                f"SELECT note_id, mod FROM notes WHERE note_id IN ({placeholders})", chunk
+            ):
+                mods[note_id] = mod
+        return mods
+
+    def _store_notes(self, notes: List[Dict], synced_at: float):
+        """Upsert fetched notesInfo results."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO notes (note_id, model, fields, tags, mod, synced_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    note["noteId"],
+                    note.get("modelName"),
+                    json.dumps(note.get("fields", {})),
+                    json.dumps(note.get("tags", [])),
+                    note.get("mod", 0),
+                    synced_at
+                )
+                for note in notes if note
+            )
+        )
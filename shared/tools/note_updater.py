@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Bulk Note Updater - Diffed, batched and verified AnkiConnect note updates.
+
+Fix tools stage the fields they want to change against the values they
+fetched. Only fields that actually differ are sent; updates go out packed
+into ``multi`` requests, and each batch is verified with a single
+``notesInfo`` call instead of one per note. With a FixJournal attached, the
+plan and every batch outcome are written to disk so an interrupted run can
+be resumed (see fix_journal.py).
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional
+
+from anki_connect import AnkiConnectClient
+
+logger = logging.getLogger(__name__)
+
+
+def field_values(fields: Dict) -> Dict[str, str]:
+    """
+    Flatten AnkiConnect's ``{"Name": {"value": ..., "order": ...}}`` fields.
+
+    Plain ``{"Name": "value"}`` mappings are returned unchanged.
+    """
+    return {
+        name: value.get("value", "") if isinstance(value, dict) else value
+        for name, value in fields.items()
+    }
+
+
+class BulkNoteUpdater:
+    """Collects field changes per note and applies them in verified batches."""
+
+    def __init__(self, client: AnkiConnectClient, batch_size: int = 100,
+                 verify: bool = True, normalize: Optional[Callable[[str], str]] = None,
+                 journal=None):
+        """
+        Initialize the updater.
+
+        Args:
+            client: Shared AnkiConnect client
+            batch_size: Notes per update/verification batch
+            verify: Re-read each batch with one notesInfo call and check the writes
+            normalize: Optional function applied to stored values before
+                comparing them with the proposed ones during verification
+            journal: Optional FixJournal recording the plan and applied batches
+        """
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self.verify = verify
+        self.normalize = normalize
+        self.journal = journal
+
+        self.pending: Dict[int, Dict[str, str]] = {}
+        self.unchanged = 0
+
+    def stage(self, note_id: int, proposed: Dict[str, str],
+              original: Optional[Dict] = None) -> bool:
+        """
+        Stage proposed field values for a note.
+
+        Args:
+            note_id: Anki note id
+            proposed: Field name -> new value
+            original: Field values as fetched (flat or AnkiConnect-shaped);
+                fields whose value is unchanged are dropped
+
+        Returns:
+            True if at least one field differs and was staged
+        """
+        current = field_values(original) if original else {}
+        changes = {
+            name: value for name, value in proposed.items()
+            if name not in current or current[name] != value
+        }
+
+        if not changes:
+            self.unchanged += 1
+            return False
+
+        self.pending.setdefault(note_id, {}).update(changes)
+        return True
+
+    def flush(self) -> Dict:
+        """
+        Send all staged changes.
+
+        Returns:
+            Summary dict with 'updated' (note ids), 'failed' (note id -> error),
+            'unchanged' (count of notes with nothing to send) and
+            'fields_sent' (total changed fields written)
+        """
+        summary = {
+            'updated': [],
+            'failed': {},
+            'unchanged': self.unchanged,
+            'fields_sent': sum(len(changes) for changes in self.pending.values())
+        }
+
+        if self.journal and self.pending and not self.journal.has_plan:
+            self.journal.record_plan(self.pending)
+
+        note_ids = list(self.pending)
+        for i in range(0, len(note_ids), self.batch_size):
+            batch = note_ids[i:i + self.batch_size]
+            already_updated = len(summary['updated'])
+            self._apply_batch(batch, summary)
+            if self.journal:
+                self.journal.record_batch(
+                    summary['updated'][already_updated:],
+                    {note_id: summary['failed'][note_id] for note_id in batch if note_id in summary['failed']}
+                )
+
+        if self.journal and note_ids:
+            self.journal.record_complete(summary)
+
+        logger.info(
+            f"Bulk update: {len(summary['updated'])} updated, {len(summary['failed'])} failed, "
+            f"{summary['unchanged']} unchanged, {summary['fields_sent']} fields sent"
+        )
+
+        self.pending = {}
+        self.unchanged = 0
+        return summary
+
+    def _apply_batch(self, batch: List[int], summary: Dict):
+        """Write one batch of notes and verify it."""
+        responses = self.client.multi(
+            ("updateNoteFields", {"note": {"id": note_id, "fields": self.pending[note_id]}})
+            for note_id in batch
+        )
+
+        written = []
+        for note_id, response in zip(batch, responses):
+            if response.get("error"):
+                summary['failed'][note_id] = response["error"]
+            else:
+                written.append(note_id)
+
+        if not written:
+            return
+
+        if not self.verify:
+            summary['updated'].extend(written)
+            return
+
+        response = self.client.request("notesInfo", {"notes": written})
+        if response.get("error"):
+            for note_id in written:
+                summary['failed'][note_id] = f"verification failed: {response['error']}"
+            return
+
+        stored = {
+            note.get("noteId"): field_values(note.get("fields", {}))
+            for note in response.get("result") or []
+            if note
+        }
+
+        for note_id in written:
+            mismatch = self._find_mismatch(self.pending[note_id], stored.get(note_id))
+            if mismatch:
+                summary['failed'][note_id] = mismatch
+            else:
+                summary['updated'].append(note_id)
+
+    def _find_mismatch(self, expected: Dict[str, str], stored: Optional[Dict[str, str]]) -> Optional[str]:
+        """Return a description of the first field that did not persist, if any."""
+        if stored is None:
+            return "note missing after update"
+
+        for name, value in expected.items():
+            actual = stored.get(name)
+            if actual is not None and self.normalize:
+                actual = self.normalize(actual)
+            if actual != value:
+                return f"field '{name}' did not persist"
+        return None
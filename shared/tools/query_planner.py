@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Query Planner - Turn overlapping search scopes into a single Anki query.
+
+Tools that want "everything in these decks/tags" hand their scopes to
+plan_scope(), which drops duplicates and scopes already covered by a
+wildcard scope and OR-joins the rest, so Anki runs one search instead of
+one per scope. Tools discover notes with ``findNotes`` (through the note
+mirror), never card ids, so multi-card (e.g. cloze) notes are fetched and
+analysed once.
+"""
+
+import fnmatch
+import logging
+import re
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A single "key:value" search term, with the value optionally quoted
+TERM_PATTERN = re.compile(r'^(deck|tag):(?:"([^"]*)"|(\S+))$', re.IGNORECASE)
+
+
+def _parse_term(query: str) -> Optional[Tuple[str, str]]:
+    """Split a simple deck:/tag: term into (key, value); None for anything else."""
+    match = TERM_PATTERN.match(query.strip())
+    if not match:
+        return None
+    return match.group(1).lower(), (match.group(2) if match.group(2) is not None else match.group(3))
+
+
+def _covers(broad: Tuple[str, str], narrow: Tuple[str, str]) -> bool:
+    """
+    True if every note matched by ``narrow`` is also matched by ``broad``.
+
+    Only literal values under a trailing-wildcard pattern are treated as
+    covered, since such a pattern also matches the subdecks (and child
+    tags) that a plain deck:/tag: term includes.
+    """
+    if broad[0] != narrow[0] or '*' in narrow[1]:
+        return False
+    pattern = broad[1].lower()
+    return pattern.endswith('*') and fnmatch.fnmatchcase(narrow[1].lower(), pattern)
+
+
+def plan_scope(queries: Iterable[str]) -> str:
+    """
+    Compile several search scopes into one OR-joined Anki search.
+
+    Args:
+        queries: Anki search expressions (e.g. 'deck:*PSYC*', 'tag:PSYC2240')
+
+    Returns:
+        A single search expression matching the union of all scopes
+    """
+    unique = []
+    for query in queries:
+        query = query.strip()
+        if query and query not in unique:
+            unique.append(query)
+
+    parsed = [_parse_term(query) for query in unique]
+    kept = []
+    for i, query in enumerate(unique):
+        term = parsed[i]
+        if term and any(other and _covers(other, term) for other in parsed):
+            logger.debug(f"Scope {query} is covered by a wildcard scope; dropped")
+            continue
+        kept.append(query)
+
+    if len(kept) == 1:
+        return kept[0]
+    return " OR ".join(f"({query})" for query in kept)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+RULE ENGINE - Run every card check and fixer in a single pass
+Each fixer's detection logic is a registered rule; notes are read once from
+the local mirror, all detectors run on each note in priority order, and the
+resulting changes go back to Anki as one batched update.
+
+With --apkg the same rules run offline against a generated .apkg file, so
+problems are caught and fixed at build time without Anki running.
+"""
+
+import argparse
+import importlib.util
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Shared tools live alongside this script
+sys.path.insert(0, str(Path(__file__).parent))
+from anki_connect import AnkiConnectClient
+from note_updater import BulkNoteUpdater, field_values
+from note_mirror import NoteMirror
+from apkg_collection import ApkgCollection, ApkgNoteUpdater
+from fix_journal import FixJournal, add_journal_arguments, run_saved_plan
+from query_planner import plan_scope
+from css_cleaner import CSSCleaner
+from corruption_fixer import CorruptionFixer
+from content_restorer import ContentRestorer
+from smart_content_fixer import SmartContentFixer
+from validate_clean import is_still_corrupted
+
+DECK_QUERY = 'deck:"PSYC 2240*"'
+
+
+class Rule:
+    """A named card check with an optional fixer.
+
+    The detector receives a note's flat field values and returns a truthy
+    finding when the rule applies. The fixer receives the same fields plus
+    that finding and returns the field values it wants to change.
+    """
+
+    def __init__(self, name: str, detector: Callable[[Dict[str, str]], object],
+                 fixer: Optional[Callable[[Dict[str, str], object], Dict[str, str]]] = None,
+                 priority: int = 50, description: str = ""):
+        self.name = name
+        self.detector = detector
+        self.fixer = fixer
+        self.priority = priority
+        self.description = description
+
+
+RULES: Dict[str, Rule] = {}
+
+
+def register_rule(name, detector, fixer=None, priority=50, description=""):
+    """Add a rule to the registry (lower priority values run first)"""
+    rule = Rule(name, detector, fixer, priority, description)
+    RULES[name] = rule
+    return rule
+
+
+def load_rule_module(path):
+    """Load a course rule module and let it register its rules.
+
+    The module must define ``register_rules(register)``; it is called with
+    register_rule so course tools do not need to import this module.
+    """
+    path = Path(path).resolve()
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    if not hasattr(module, "register_rules"):
+        raise ValueError(f"{path} does not define register_rules(register)")
+    module.register_rules(register_rule)
+
+
+# Built-in rules: the checks from the shared/tools fixers and validate_clean.py
+
+def _clean_css(fields, finding):
+    clean_question = CSSCleaner.extract_clean_content(fields.get("Question", ""))
+    clean_answer = CSSCleaner.extract_clean_content(fields.get("Answer", ""))
+    if not clean_question or len(clean_question) < 10:
+        clean_question = "Review this question - extracted from CSS"
+    if not clean_answer or len(clean_answer) < 5:
+        clean_answer = "Review this answer - extracted from CSS"
+    return {"Question": clean_question, "Answer": clean_answer}
+
+
+register_rule(
+    "css_pollution",
+    lambda f: CSSCleaner.has_css_pollution(f.get("Question", ""), f.get("Answer", "")),
+    _clean_css,
+    priority=10,
+    description="Embedded CSS in question/answer (css_cleaner)"
+)
+
+register_rule(
+    "index_corruption",
+    lambda f: CorruptionFixer.is_corrupted_answer(f.get("Answer", "")),
+    lambda f, _: {"Answer": CorruptionFixer.get_clean_answer_for_question(f.get("Question", "").strip())},
+    priority=20,
+    description="Index numbers and text fragments in answers (corruption_fixer)"
+)
+
+register_rule(
+    "placeholder_content",
+    lambda f: f.get("Question", "").strip() and ContentRestorer.needs_restoration(f.get("Question", ""), f.get("Answer", "")),
+    lambda f, _: {"Answer": ContentRestorer.generate_answer_from_question(f.get("Question", "").strip())},
+    priority=30,
+    description="CSS-cleanup placeholders and missing answers (content_restorer)"
+)
+
+register_rule(
+    "inadequate_content",
+    lambda f: f.get("Question", "").strip() and SmartContentFixer.has_inadequate_content(f.get("Answer", "")),
+    lambda f, _: {"Answer": SmartContentFixer.generate_proper_answer(f.get("Question", "").strip())},
+    priority=40,
+    description="Vague or very short answers (smart_content_fixer)"
+)
+
+register_rule(
+    "remaining_corruption",
+    lambda f: is_still_corrupted(f.get("Answer", "")),
+    priority=90,
+    description="Corruption left after fixes (validate_clean, report only)"
+)
+
+
+class RuleEngine:
+    """Evaluates registered rules against notes in one pass."""
+
+    def __init__(self, rules: Optional[List[Rule]] = None):
+        rules = list(RULES.values()) if rules is None else rules
+        self.rules = sorted(rules, key=lambda rule: (rule.priority, rule.name))
+
+    def evaluate(self, fields: Dict[str, str], apply_fixes: bool = True) -> Tuple[List[str], Dict[str, str]]:
+        """Run every rule against one note's fields.
+
+        Rules run in priority order on a working copy, so each detector sees
+        the fixes of the rules before it.
+
+        Returns:
+            Tuple of (names of rules that fired, final field values)
+        """
+        working = dict(fields)
+        fired = []
+
+        for rule in self.rules:
+            finding = rule.detector(working)
+            if not finding:
+                continue
+            fired.append(rule.name)
+            if apply_fixes and rule.fixer:
+                working.update(rule.fixer(working, finding) or {})
+
+        return fired, working
+
+    def run(self, notes: List[Dict], updater: Optional[BulkNoteUpdater] = None) -> Dict:
+        """Evaluate all notes and stage their changes on the updater.
+
+        Returns:
+            Dict with 'scanned', 'findings' (rule -> count) and 'changed' notes
+        """
+        findings = {rule.name: 0 for rule in self.rules}
+        changed = 0
+
+        for note in notes:
+            fields = field_values(note.get("fields", {}))
+            fired, proposed = self.evaluate(fields, apply_fixes=updater is not None)
+            for name in fired:
+                findings[name] += 1
+            if updater and updater.stage(note["noteId"], proposed, fields):
+                changed += 1
+
+        return {'scanned': len(notes), 'findings': findings, 'changed': changed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all card checks and fixes in one pass")
+    parser.add_argument('--query', action='append',
+                        help=f'Anki search scope to scan; repeatable, scopes are OR-joined (default: {DECK_QUERY})')
+    parser.add_argument('--rules', action='append', default=[],
+                        help='Extra rule module defining register_rules(register); repeatable')
+    parser.add_argument('--only', help='Comma-separated rule names to run')
+    parser.add_argument('--dry-run', action='store_true', help='Report findings without updating Anki')
+    parser.add_argument('--full-sync', action='store_true', help='Refetch every note instead of syncing changes')
+    parser.add_argument('--list', action='store_true', help='List registered rules and exit')
+    add_journal_arguments(parser)
+    parser.add_argument('--apkg', help='Check and fix an .apkg file offline instead of a running Anki')
+    parser.add_argument('--deck', help="Deck name glob to limit --apkg checks to (e.g. 'PSYC 2240*')")
+    parser.add_argument('--output', help='Where to write the fixed --apkg (default: overwrite it)')
+    args = parser.parse_args()
+
+    for path in args.rules:
+        load_rule_module(path)
+
+    if args.list:
+        for rule in sorted(RULES.values(), key=lambda r: (r.priority, r.name)):
+            fixer = "fix" if rule.fixer else "report"
+            print(f"{rule.priority:>3}  {rule.name:<22} {fixer:<7} {rule.description}")
+        return
+
+    rules = list(RULES.values())
+    if args.only:
+        wanted = {name.strip() for name in args.only.split(',')}
+        unknown = wanted - set(RULES)
+        if unknown:
+            parser.error(f"unknown rules: {', '.join(sorted(unknown))}")
+        rules = [rule for rule in rules if rule.name in wanted]
+
+    print("🔎 RULE ENGINE - single-pass card checks")
+    print("=" * 60)
+
+    if args.apkg:
+        run_offline(args, rules)
+        return
+
+    anki = AnkiConnectClient()
+
+    # Finish or repeat a saved fix run without re-scanning
+    result = run_saved_plan("rule_engine", anki, args)
+    if result is not None:
+        print(f"✅ Applied {len(result['updated'])} saved fixes ({len(result['failed'])} failed)")
+        print(anki.report())
+        return
+
+    mirror = NoteMirror(anki)
+
+    query = plan_scope(args.query or [DECK_QUERY])
+    sync = mirror.sync(query, full=args.full_sync)
+    if sync.get("error"):
+        print(f"❌ AnkiConnect not available: {sync['error']}")
+        return
+
+    notes = mirror.notes(query)
+    print(f"📚 Checking {len(notes)} notes against {len(rules)} rules ({sync['fetched']} fetched from Anki)")
+
+    engine = RuleEngine(rules)
+    updater = None if args.dry_run else BulkNoteUpdater(anki, journal=FixJournal("rule_engine"))
+    report = engine.run(notes, updater)
+
+    for name, count in report['findings'].items():
+        print(f"   {name:<22} {count:>6} notes")
+
+    if updater:
+        result = updater.flush()
+        for note_id, error in result["failed"].items():
+            print(f"   ❌ Error updating note {note_id}: {error}")
+        print(f"\n✅ Updated {len(result['updated'])}/{report['changed']} notes "
+              f"({result['fields_sent']} fields written)")
+
+    print(anki.report())
+
+
+def run_offline(args, rules: List[Rule]):
+    """Run the rules against an .apkg file and repackage it with the fixes."""
+    with ApkgCollection(args.apkg) as collection:
+        notes = collection.notes(args.deck)
+        print(f"📦 Checking {len(notes)} notes in {Path(args.apkg).name} against {len(rules)} rules")
+
+        engine = RuleEngine(rules)
+        updater = None if args.dry_run else ApkgNoteUpdater(collection)
+        report = engine.run(notes, updater)
+
+        for name, count in report['findings'].items():
+            print(f"   {name:<22} {count:>6} notes")
+
+        if updater:
+            result = updater.flush()
+            if result['updated'] or args.output:
+                output = collection.save(args.output)
+                print(f"\n✅ Updated {len(result['updated'])}/{report['changed']} notes "
+                      f"({result['fields_sent']} fields written) -> {output}")
+            else:
+                print("\n✅ No changes needed")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,204 +4,84 @@ SMART CONTENT FIXER - Find and fix all cards with missing/inadequate content
 Uses textbook and lecture materials to populate proper answers
 """
 
-import requests
+import argparse
+import sys
+from pathlib import Path
 import re
 
+# Shared AnkiConnect client, note updater and note mirror live alongside this script
+sys.path.insert(0, str(Path(__file__).parent))
+from anki_connect import AnkiConnectClient
+from note_updater import BulkNoteUpdater
+from note_mirror import NoteMirror
+from fix_journal import FixJournal, add_journal_arguments, run_saved_plan
+from answer_kb import load_answer_kb
+
+COURSE = "PSYC2240"
+DECK_QUERY = 'deck:"PSYC 2240*"'
+
+# Compiled once at import
+INADEQUATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"Review this concept",
+    r"content needs verification",
+    r"check.*textbook",
+    r"Review this answer",
+    r"^This content",
+    r"needs review",
+    r"complete information",
+    r"^[A-Za-z\s]{0,20}$",  # Very short answers
+    r"^\s*$",  # Empty answers
+]]
+
 class SmartContentFixer:
     def __init__(self):
-        self.url = "http://127.0.0.1:8765"
+        self.anki = AnkiConnectClient()
+        self.mirror = NoteMirror(self.anki)
         self.fixed_count = 0
         
     def anki_request(self, action, params=None):
         """Make request to AnkiConnect"""
-        payload = {"action": action, "version": 6}
-        if params:
-            payload["params"] = params
-        
-        try:
-            response = requests.post(self.url, json=payload, timeout=10)
-            return response.json()
-        except Exception as e:
-            print(f"AnkiConnect error: {e}")
-            return {"error": str(e)}
+        return self.anki.request(action, params)
     
-    def has_inadequate_content(self, answer):
+    @staticmethod
+    def has_inadequate_content(answer):
         """Check if answer needs proper content"""
-        inadequate_patterns = [
-            r"Review this concept",
-            r"content needs verification",
-            r"check.*textbook",
-            r"Review this answer",
-            r"^This content",
-            r"needs review",
-            r"complete information",
-            r"^[A-Za-z\s]{0,20}$",  # Very short answers
-            r"^\s*$",  # Empty answers
-        ]
-        
-        for pattern in inadequate_patterns:
-            if re.search(pattern, answer, re.IGNORECASE):
-                return True
+        if any(pattern.search(answer) for pattern in INADEQUATE_PATTERNS):
+            return True
         return len(answer.strip()) < 15  # Very short answers
     
-    def generate_proper_answer(self, question):
-        """Generate proper answer based on PSYC 2240 content"""
-        question_lower = question.lower()
-        
-        # Brain anatomy and structure
-        if "frontal lobe" in question_lower:
-            if "executive" in question_lower or "function" in question_lower:
-                return "Controls executive functions including decision-making, planning, working memory, and voluntary movement."
-            return "Brain region responsible for executive functions, motor control, personality, and decision-making."
-        
-        if "parietal lobe" in question_lower:
-            return "Processes sensory information, spatial awareness, and directs movements for performing tasks."
-        
-        if "temporal lobe" in question_lower:
-            return "Processes auditory information, language, memory formation, and facial recognition."
-        
-        if "occipital lobe" in question_lower:
-            return "Primary visual processing center responsible for interpreting visual information."
-        
-        if "cerebellum" in question_lower:
-            return "Coordinates voluntary movements, maintains balance and posture, and assists in motor learning."
-        
-        if "brainstem" in question_lower:
-            return "Controls vital life-sustaining functions including breathing, heart rate, and consciousness."
-        
-        if "corpus callosum" in question_lower:
-            return "Band of white matter connecting left and right brain hemispheres for interhemispheric communication."
-        
-        if "thalamus" in question_lower:
-            return "Relay station that organizes and integrates sensory information before sending it to the cortex."
-        
-        if "hypothalamus" in question_lower:
-            return "Controls homeostatic functions including hunger, thirst, body temperature, and hormone production."
-        
-        if "hippocampus" in question_lower:
-            return "Essential for memory consolidation, converting short-term memories into long-term storage."
-        
-        if "amygdala" in question_lower:
-            return "Processes emotions, especially fear responses, and forms emotional memories."
-        
-        # Neural processes
-        if "action potential" in question_lower:
-            return "Electrical signal that travels down axons via depolarization and repolarization cycles."
-        
-        if "neurotransmitter" in question_lower:
-            if "release" in question_lower:
-                return "Released when action potentials reach terminal buttons, causing vesicles to fuse with membrane."
-            return "Chemical messengers that transmit signals between neurons across synapses."
-        
-        if "synapse" in question_lower or "synaptic" in question_lower:
-            return "Junction between neurons where chemical communication occurs via neurotransmitters."
-        
-        if "myelin" in question_lower:
-            return "Fatty insulation around axons that speeds up neural transmission and provides protection."
-        
-        if "neuroplasticity" in question_lower:
-            return "Brain's ability to reorganize and form new neural connections throughout life."
-        
-        # Memory and learning
-        if "long-term potentiation" in question_lower or "ltp" in question_lower:
-            return "Strengthening of synaptic connections through repeated activation, basis of learning and memory."
-        
-        if "working memory" in question_lower:
-            return "Temporary storage and manipulation of information for cognitive tasks and decision-making."
-        
-        if "episodic memory" in question_lower:
-            return "Memory for specific personal experiences and events with temporal and spatial context."
-        
-        # Sleep and consciousness
-        if "rem sleep" in question_lower:
-            return "Sleep stage characterized by rapid eye movements, vivid dreams, and memory consolidation."
-        
-        if "circadian rhythm" in question_lower:
-            return "Internal biological clock regulating sleep-wake cycles and other physiological processes."
-        
-        # Disorders and conditions
-        if "alzheimer" in question_lower:
-            return "Progressive neurodegenerative disease causing memory loss due to amyloid plaques and tangles."
-        
-        if "parkinson" in question_lower:
-            return "Movement disorder caused by dopamine neuron loss in substantia nigra, treated with L-DOPA."
-        
-        if "locked-in syndrome" in question_lower:
-            return "Condition where patient is conscious but cannot move or speak, only eye movements possible."
-        
-        if "aphasia" in question_lower:
-            if "broca" in question_lower:
-                return "Motor speech disorder where patients understand but cannot speak fluently."
-            elif "wernicke" in question_lower:
-                return "Language comprehension disorder where patients speak but cannot understand properly."
-            return "Language disorder affecting speech production or comprehension due to brain damage."
-        
-        if "hemispatial neglect" in question_lower:
-            return "Condition where patients ignore one side of space, typically left side after right hemisphere damage."
-        
-        # Visual and sensory processing
-        if "visual cortex" in question_lower or "visual processing" in question_lower:
-            return "Primary visual cortex processes basic features; higher areas recognize objects and motion."
-        
-        if "auditory cortex" in question_lower:
-            return "Processes sound information, with primary areas detecting basic sounds and secondary areas analyzing speech."
-        
-        # Development and genetics
-        if "critical period" in question_lower or "sensitive period" in question_lower:
-            return "Time window during development when experience has maximal impact on brain organization."
-        
-        if "gene expression" in question_lower or "epigenetic" in question_lower:
-            return "Process by which genetic information is turned on/off by environmental and experiential factors."
-        
-        # General brain function
-        if "lateralization" in question_lower or "hemisphere" in question_lower:
-            return "Specialization of brain functions across left and right hemispheres for efficient processing."
-        
-        if "blood-brain barrier" in question_lower:
-            return "Protective barrier preventing harmful substances from entering brain tissue while allowing nutrients."
-        
-        # Default for unclear questions
-        return "Brain structure/process with specialized function - requires specific course material review."
+    @staticmethod
+    def generate_proper_answer(question):
+        """Generate proper answer based on PSYC 2240 content (courses/PSYC2240/knowledge/answer_kb.json)"""
+        return load_answer_kb(COURSE).answer(question, "smart_content_fixer")
     
     def find_and_fix_inadequate_cards(self):
         """Find all cards with inadequate content and fix them"""
         print("🔍 Scanning for cards with inadequate content...")
         
-        # Get all PSYC cards
-        card_response = self.anki_request("findCards", {"query": 'deck:"PSYC 2240*"'})
-        if card_response.get("error"):
-            print(f"Error finding cards: {card_response['error']}")
-            return
+        # Sync the local note mirror; only notes edited since the last run are fetched
+        sync = self.mirror.sync(DECK_QUERY)
+        if sync.get("error"):
+            print(f"Error syncing notes: {sync['error']}")
+            return 0
         
-        card_ids = card_response["result"]
-        print(f"📚 Checking {len(card_ids)} cards for inadequate content...")
+        notes = self.mirror.notes(DECK_QUERY)
+        print(f"📚 Checking {len(notes)} notes for inadequate content... ({sync['fetched']} fetched from Anki)")
         
         inadequate_cards = []
-        batch_size = 50
         
-        for i in range(0, len(card_ids), batch_size):
-            batch = card_ids[i:i + batch_size]
-            print(f"   Batch {i//batch_size + 1}: Checking cards {i+1}-{min(i+batch_size, len(card_ids))}")
+        for note in notes:
+            fields = note["fields"]
+            question = fields.get("Question", {}).get("value", "")
+            answer = fields.get("Answer", {}).get("value", "")
             
-            info_response = self.anki_request("cardsInfo", {"cards": batch})
-            if info_response.get("error"):
-                continue
-                
-            for card in info_response["result"]:
-                fields = card["fields"]
-                question = fields.get("Question", {}).get("value", "")
-                answer = fields.get("Answer", {}).get("value", "")
-                
-                if self.has_inadequate_content(answer) and question.strip():
-                    inadequate_cards.append({
-                        "note_id": card["note"],
-                        "question": question.strip(),
-                        "answer": answer.strip(),
-                        "priority": fields.get("Priority", {}).get("value", ""),
-                        "source": fields.get("Source", {}).get("value", ""),
-                        "chapter": fields.get("Chapter", {}).get("value", ""),
-                        "clinical": fields.get("Clinical", {}).get("value", "")
-                    })
+            if self.has_inadequate_content(answer) and question.strip():
+                inadequate_cards.append({
+                    "note_id": note["noteId"],
+                    "question": question.strip(),
+                    "answer": answer.strip(),
+                    "fields": fields
+                })
         
         print(f"⚠️  Found {len(inadequate_cards)} cards with inadequate content")
         
@@ -212,6 +92,7 @@ class SmartContentFixer:
         # Fix inadequate cards
         print(f"\n🔧 Fixing {len(inadequate_cards)} cards with proper content...")
         
+        updater = BulkNoteUpdater(self.anki, journal=FixJournal("smart_content_fixer"))
         for i, card in enumerate(inadequate_cards, 1):
             print(f"📝 Fixing card {i}/{len(inadequate_cards)}...")
             print(f"   Q: {card['question'][:80]}...")
@@ -220,33 +101,25 @@ class SmartContentFixer:
             # Generate proper answer
             proper_answer = self.generate_proper_answer(card['question'])
             print(f"   NEW: {proper_answer}")
-            
-            # Update the card
-            update_response = self.anki_request("updateNoteFields", {
-                "note": {
-                    "id": card["note_id"],
-                    "fields": {
-                        "Question": card["question"],
-                        "Answer": proper_answer,
-                        "Priority": card["priority"],
-                        "Source": card["source"],
-                        "Chapter": card["chapter"],
-                        "Clinical": card["clinical"]
-                    }
-                }
-            })
-            
-            if update_response.get("error"):
-                print(f"   ❌ Error: {update_response['error']}")
-            else:
-                print(f"   ✅ Fixed!")
-                self.fixed_count += 1
-            
             print("-" * 60)
+            
+            updater.stage(card["note_id"], {"Answer": proper_answer}, card["fields"])
+        
+        # Send only the changed fields, batched and verified
+        result = updater.flush()
+        for note_id, error in result["failed"].items():
+            print(f"   ❌ Error updating note {note_id}: {error}")
+        self.fixed_count += len(result["updated"])
+        
+        print(self.anki.report())
         
         return self.fixed_count
 
 def main():
+    parser = argparse.ArgumentParser(description="Fix cards with missing or inadequate content")
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+    
     print("🧠 SMART CONTENT FIXER FOR ANKI CARDS")
     print("Finding and fixing all cards with inadequate content")
     print("=" * 60)
@@ -261,6 +134,12 @@ def main():
     
     print("✅ AnkiConnect connected")
     
+    # Finish or repeat a saved fix run without re-scanning
+    result = run_saved_plan("smart_content_fixer", fixer.anki, args)
+    if result is not None:
+        print(f"✅ Applied {len(result['updated'])} saved fixes ({len(result['failed'])} failed)")
+        return
+    
     # Fix inadequate cards
     fixed_count = fixer.find_and_fix_inadequate_cards()
     
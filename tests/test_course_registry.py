@@ -0,0 +1,65 @@
+"""Regression tests for CourseRegistry.course_codes picking up config changes."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+
+from course_registry import CourseRegistry
+
+
+def write_config(course_path: Path, location: str = "config/course_config.json"):
+    config_path = course_path / location
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    config_path.write_text(json.dumps({"course_code": course_path.name}), encoding="utf-8")
+
+
+class CourseCodesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.courses_dir = Path(self.tmp.name) / "courses"
+        write_config(self.courses_dir / "TEST101")
+        self.index_path = Path(self.tmp.name) / "processing" / "course_registry.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def course_codes(self):
+        # A fresh registry per call, like separate course_manager runs
+        registry = CourseRegistry(self.courses_dir, self.index_path)
+        codes = registry.course_codes()
+        registry.save()
+        return codes
+
+    def freeze_courses_dir(self):
+        """Undo mtime changes of courses/ so only the config files differ."""
+        stat = self.courses_dir.stat()
+        return lambda: os.utime(self.courses_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    def test_config_added_to_existing_directory(self):
+        (self.courses_dir / "NEW200").mkdir()
+        self.assertEqual(self.course_codes(), ["TEST101"])
+
+        restore = self.freeze_courses_dir()
+        write_config(self.courses_dir / "NEW200", "course_config.json")
+        restore()
+
+        self.assertEqual(self.course_codes(), ["NEW200", "TEST101"])
+
+    def test_config_removed(self):
+        self.assertEqual(self.course_codes(), ["TEST101"])
+
+        restore = self.freeze_courses_dir()
+        (self.courses_dir / "TEST101" / "config" / "course_config.json").unlink()
+        restore()
+
+        self.assertEqual(self.course_codes(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
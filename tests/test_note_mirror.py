@@ -0,0 +1,86 @@
+"""Regression tests for NoteMirror.sync when notesInfo batches fail."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "shared" / "tools"))
+
+from anki_connect import AnkiConnectClient
+from anki_standin import AnkiStandInServer, StandInCollection
+from note_mirror import NoteMirror
+
+QUERY = "deck:Test"
+
+
+def make_collection(count: int) -> StandInCollection:
+    collection = StandInCollection()
+    collection.decks[2] = "Test"
+    for note_id in range(1, count + 1):
+        collection.notes[note_id] = {
+            "model": "Basic",
+            "fields": {"Front": f"Question {note_id}", "Back": "Answer"},
+            "tags": [],
+            "mod": 1
+        }
+        collection.cards[note_id] = {"note": note_id, "deck": "Test", "ord": 0}
+    return collection
+
+
+class NoteMirrorFailedBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = AnkiStandInServer(make_collection(300))
+        self.server.__enter__()
+        self.standin_execute = self.server.standin.execute
+        self.client = AnkiConnectClient(self.server.url, max_retries=0)
+        self.mirror = NoteMirror(self.client, Path(self.tmp.name) / "mirror.sqlite")
+
+    def tearDown(self):
+        self.mirror.close()
+        self.client.close()
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def fail_notes_info(self, should_fail):
+        def execute(action, params):
+            if action == "notesInfo" and should_fail(params["notes"]):
+                raise RuntimeError("injected notesInfo failure")
+            return self.standin_execute(action, params)
+        self.server.standin.execute = execute
+
+    def test_failed_batch_is_retried(self):
+        # Whole batches fail, smaller retries succeed
+        self.fail_notes_info(lambda ids: len(ids) > 20)
+
+        summary = self.mirror.sync(QUERY)
+
+        self.assertNotIn("error", summary)
+        self.assertEqual(summary["fetched"], 300)
+        self.assertEqual(len(self.mirror.notes(QUERY)), 300)
+
+    def test_unfetched_notes_are_picked_up_by_next_sync(self):
+        broken = {7, 150, 151}
+        self.fail_notes_info(lambda ids: bool(broken & set(ids)))
+
+        summary = self.mirror.sync(QUERY)
+
+        self.assertIn("error", summary)
+        self.assertEqual(summary["fetched"], 297)
+        mirrored = {note["noteId"] for note in self.mirror.notes(QUERY)}
+        self.assertEqual(mirrored, set(range(1, 301)) - broken)
+        self.assertIsNone(self.mirror._last_sync(QUERY))
+
+        self.server.standin.execute = self.standin_execute
+        summary = self.mirror.sync(QUERY)
+
+        self.assertNotIn("error", summary)
+        self.assertEqual(summary["fetched"], 3)
+        self.assertEqual(len(self.mirror.notes(QUERY)), 300)
+        self.assertIsNotNone(self.mirror._last_sync(QUERY))
+
+
+if __name__ == "__main__":
+    unittest.main()
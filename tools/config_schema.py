@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Config Schema - Precompiled validation of course configuration files.
+
+The schemas below use a subset of JSON Schema (type, required, properties,
+additionalProperties, items, enum, minimum, minLength, pattern and
+format "regex"). Each schema is compiled once per process into a tree of
+small check functions, so validating a config is a single walk with no
+schema interpretation or regex compilation on the hot path.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
+
+STRING_LIST = {'type': 'array', 'items': {'type': 'string'}}
+REGEX_LIST = {'type': 'array', 'items': {'type': 'string', 'format': 'regex'}}
+FLAGS = {'type': 'object', 'additionalProperties': {'type': 'boolean'}}
+POSITIVE_INT = {'type': 'integer', 'minimum': 1}
+LENGTH = {'type': 'integer', 'minimum': 0}
+
+EXTRACTION_RULES_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'min_text_length': LENGTH,
+        'max_text_length': POSITIVE_INT,
+        'exclude_patterns': REGEX_LIST,
+        'content_markers': STRING_LIST,
+        'learning_objective_patterns': REGEX_LIST
+    }
+}
+
+COURSE_CONFIG_SCHEMA = {
+    'type': 'object',
+    'required': ['course_code', 'course_name'],
+    'properties': {
+        'course_code': {'type': 'string', 'pattern': r'^[A-Za-z0-9_\-]+$'},
+        'course_name': {'type': 'string', 'minLength': 1},
+        'semester': {'type': 'string'},
+        'instructor': {'type': 'string'},
+        'textbook_title': {'type': 'string'},
+        'template_used': {'type': 'string'},
+        'migrated': {'type': 'boolean'},
+        'card_generation': {
+            'type': 'object',
+            'properties': {
+                'target_count': POSITIVE_INT,
+                'question_format': {'type': 'string'},
+                'answer_length': {'enum': ['concise', 'detailed']}
+            },
+            'additionalProperties': {'type': 'boolean'}
+        },
+        'content_sources': FLAGS,
+        'specialized_extraction': FLAGS,
+        'export_formats': {'type': 'array', 'items': {'enum': ['csv', 'apkg', 'cloze']}},
+        'build_pipeline': {
+            'type': 'object',
+            'properties': {'extract': {'type': 'string'}, 'build': {'type': 'string'}},
+            'additionalProperties': False
+        },
+        'extraction_rules': EXTRACTION_RULES_SCHEMA,
+        'deck_settings': {
+            'type': 'object',
+            'properties': {
+                'model_id': POSITIVE_INT,
+                'deck_id': {'type': ['integer', 'null']},
+                'css_styling': {'type': 'boolean'},
+                'enable_cloze': {'type': 'boolean'},
+                'split_by_priority': {'type': 'boolean'},
+                'max_cards_per_deck': POSITIVE_INT,
+                'shard_workers': {'type': ['integer', 'null'], 'minimum': 1}
+            }
+        },
+        'card_quality': {
+            'type': 'object',
+            'properties': {
+                'min_front_length': LENGTH,
+                'max_front_length': POSITIVE_INT,
+                'min_back_length': LENGTH,
+                'max_back_length': POSITIVE_INT,
+                'remove_duplicates': {'type': 'boolean'},
+                'validate_format': {'type': 'boolean'},
+                'dedup_window': POSITIVE_INT
+            }
+        },
+        'tagging': {
+            'type': 'object',
+            'properties': {'format': {'type': 'string'}},
+            'additionalProperties': {'type': ['boolean', 'string']}
+        }
+    }
+}
+
+SCHEMAS = {
+    'course_config': COURSE_CONFIG_SCHEMA,
+    'extraction_rules': EXTRACTION_RULES_SCHEMA
+}
+
+# JSON type name -> Python check (bool is not a JSON integer/number)
+TYPE_CHECKS = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'boolean': lambda value: isinstance(value, bool),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'null': lambda value: value is None
+}
+
+Check = Callable[[Any, str, List[str]], None]
+
+
+class _Stop(Exception):
+    """Ends the checks of one schema node early."""
+
+
+def _is_regex(value: str) -> bool:
+    """Whether a string compiles as a regular expression."""
+    try:
+        re.compile(value)
+        return True
+    except re.error:
+        return False
+
+
+def compile_schema(schema: Dict) -> Check:
+    """
+    Compile a schema into a check function.
+
+    Returns:
+        check(value, path, errors) that appends one message per problem
+        found in ``value`` to ``errors``
+    """
+    checks: List[Check] = []
+
+    if 'type' in schema:
+        names = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        type_checks = [TYPE_CHECKS[name] for name in names]
+        expected = ' or '.join(names)
+
+        def check_type(value, path, errors):
+            if not any(type_check(value) for type_check in type_checks):
+                errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+                raise _Stop
+        checks.append(check_type)
+
+    if 'enum' in schema:
+        allowed = schema['enum']
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+        checks.append(check_enum)
+
+    if 'minimum' in schema:
+        minimum = schema['minimum']
+
+        def check_minimum(value, path, errors):
+            if TYPE_CHECKS['number'](value) and value < minimum:
+                errors.append(f"{path}: {value} is less than {minimum}")
+        checks.append(check_minimum)
+
+    if 'minLength' in schema or 'pattern' in schema or schema.get('format') == 'regex':
+        min_length = schema.get('minLength', 0)
+        pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+        regex_format = schema.get('format') == 'regex'
+
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                return
+            if len(value) < min_length:
+                errors.append(f"{path}: shorter than {min_length} characters")
+            if pattern and not pattern.search(value):
+                errors.append(f"{path}: {value!r} does not match {pattern.pattern}")
+            if regex_format and not _is_regex(value):
+                errors.append(f"{path}: {value!r} is not a valid regular expression")
+        checks.append(check_string)
+
+    if 'required' in schema:
+        required = list(schema['required'])
+
+        def check_required(value, path, errors):
+            if isinstance(value, dict):
+                for key in required:
+                    if key not in value:
+                        errors.append(f"{path}: missing required field '{key}'")
+        checks.append(check_required)
+
+    if 'properties' in schema or 'additionalProperties' in schema:
+        properties = {key: compile_schema(sub) for key, sub in schema.get('properties', {}).items()}
+        additional = schema.get('additionalProperties', True)
+        additional_check = compile_schema(additional) if isinstance(additional, dict) else None
+
+        def check_properties(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for key, item in value.items():
+                item_check = properties.get(key, additional_check)
+                if item_check is not None:
+                    item_check(item, f"{path}.{key}", errors)
+                elif additional is False and key not in properties:
+                    errors.append(f"{path}: unexpected field '{key}'")
+        checks.append(check_properties)
+
+    if 'items' in schema:
+        item_check = compile_schema(schema['items'])
+
+        def check_items(value, path, errors):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    item_check(item, f"{path}[{index}]", errors)
+        checks.append(check_items)
+
+    def check(value, path, errors):
+        try:
+            for step in checks:
+                step(value, path, errors)
+        except _Stop:
+            # A wrong type makes the remaining checks meaningless
+            pass
+    return check
+
+
+@lru_cache(maxsize=None)
+def validator(name: str) -> Check:
+    """The compiled check for one of SCHEMAS, compiled on first use."""
+    return compile_schema(SCHEMAS[name])
+
+
+def validate(name: str, value: Any, path: str = '$') -> List[str]:
+    """
+    Validate a parsed config against one of SCHEMAS.
+
+    Args:
+        name: 'course_config' or 'extraction_rules'
+        value: Parsed JSON
+        path: Prefix for error locations
+
+    Returns:
+        List of error messages (empty if valid)
+    """
+    errors: List[str] = []
+    validator(name)(value, path, errors)
+    return errors
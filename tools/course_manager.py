@@ -7,16 +7,29 @@ This tool provides a command-line interface for:
 - Migrating existing courses to new structure
 - Managing course configurations
 - Validating course structure
+- Building decks for many courses in parallel
+- Watching courses and rebuilding decks as materials arrive
 """
 
 import argparse
 import json
-import shutil
+import os
+import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional
 import logging
 
+sys.path.insert(0, str(Path(__file__).parent))
+import config_schema
+from course_registry import CONFIG_LOCATIONS, CourseRegistry, find_course_config
+from shared.core.config_resolver import load_json
+from course_watcher import CourseWatcher
+from migration_engine import LINK_MODES, migrate_files
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -26,21 +39,22 @@ class CourseManager:
     
     def __init__(self, repo_root: Optional[Path] = None):
         """Initialize the course manager."""
-        self.repo_root = repo_root or Path(__file__).parent
+        self.repo_root = repo_root or Path(__file__).parent.parent
         self.courses_dir = self.repo_root / 'courses'
         self.templates_dir = self.repo_root / 'templates'
         self.config_dir = self.repo_root / 'config'
+        self.registry = CourseRegistry(self.courses_dir)
         
-        # Load configurations
+        # Load configurations (parsed once per process by the config resolver)
         self.templates_config = self._load_templates_config()
         self.default_settings = self._load_default_settings()
+        self.registry.save()
     
     def _load_templates_config(self) -> Dict:
         """Load template configurations."""
         config_path = self.config_dir / 'templates.json'
         if config_path.exists():
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_json(config_path) or {}
         else:
             logger.warning(f"Templates config not found at {config_path}")
             return {}
@@ -49,8 +63,7 @@ class CourseManager:
         """Load default settings."""
         settings_path = self.config_dir / 'default_settings.json'
         if settings_path.exists():
-            with open(settings_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_json(settings_path) or {}
         else:
             logger.warning(f"Default settings not found at {settings_path}")
             return {}
@@ -105,6 +118,9 @@ class CourseManager:
             # Create additional files
             self._create_course_files(course_path, course_code, course_name)
             
+            self.registry.refresh(course_code)
+            self.registry.save()
+            
             logger.info(f"Successfully created course {course_code} at {course_path}")
             return True
             
@@ -278,7 +294,9 @@ Use Anki's filtered decks to study specific topics or priorities.
         
         logger.info(f"Created course files for {course_code}")
     
-    def migrate_course(self, old_path: Path, course_code: str, template: str = 'basic') -> bool:
+    def migrate_course(self, old_path: Path, course_code: str, template: str = 'basic',
+                       link_mode: str = 'copy', workers: Optional[int] = None,
+                       resume: bool = False) -> bool:
         """
         Migrate an existing course to the new structure.
         
@@ -286,6 +304,9 @@ Use Anki's filtered decks to study specific topics or priorities.
             old_path: Path to existing course directory
             course_code: Course code for the migrated course
             template: Template to use for migration
+            link_mode: 'copy', 'hardlink' or 'reflink' (see migration_engine)
+            workers: Concurrent file copies
+            resume: Continue an interrupted migration into an existing target
             
         Returns:
             True if successful, False otherwise
@@ -297,7 +318,7 @@ Use Anki's filtered decks to study specific topics or priorities.
             
             new_path = self.courses_dir / course_code
             
-            if new_path.exists():
+            if new_path.exists() and not resume:
                 logger.error(f"Target course already exists: {new_path}")
                 return False
             
@@ -307,11 +328,18 @@ Use Anki's filtered decks to study specific topics or priorities.
             self._create_course_structure(new_path, template)
             
             # Migrate content
-            self._migrate_content(old_path, new_path)
+            summary = self._migrate_content(old_path, new_path, link_mode, workers, resume)
+            if summary['failed']:
+                logger.error(f"{summary['failed']} files could not be migrated; "
+                             f"re-run with --resume to retry them")
+                return False
             
             # Create configuration based on old structure
             self._create_migration_config(new_path, course_code, template)
             
+            self.registry.refresh(course_code)
+            self.registry.save()
+            
             logger.info(f"Successfully migrated course to {new_path}")
             return True
             
@@ -319,44 +347,10 @@ Use Anki's filtered decks to study specific topics or priorities.
             logger.error(f"Error migrating course: {e}")
             return False
     
-    def _migrate_content(self, old_path: Path, new_path: Path) -> None:
-        """Migrate content from old structure to new structure."""
-        # Common migration mappings
-        migration_map = {
-            'content': 'content/materials',
-            'decks': 'decks/archives',
-            'tools': 'tools',
-            '*.pdf': 'content/textbooks',
-            '*.txt': 'content/lectures',
-            '*.docx': 'content/lectures'
-        }
-        
-        for old_pattern, new_location in migration_map.items():
-            if old_pattern.startswith('*'):
-                # File pattern
-                pattern = old_pattern[1:]  # Remove asterisk
-                for file_path in old_path.rglob(f"*{pattern}"):
-                    if file_path.is_file():
-                        target_dir = new_path / new_location
-                        target_dir.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(file_path, target_dir / file_path.name)
-                        logger.info(f"Migrated file: {file_path.name} → {new_location}")
-            else:
-                # Directory
-                old_dir = old_path / old_pattern
-                if old_dir.exists():
-                    new_dir = new_path / new_location
-                    new_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    # Copy all files
-                    for file_path in old_dir.rglob('*'):
-                        if file_path.is_file():
-                            relative_path = file_path.relative_to(old_dir)
-                            target_path = new_dir / relative_path
-                            target_path.parent.mkdir(parents=True, exist_ok=True)
-                            shutil.copy2(file_path, target_path)
-                    
-                    logger.info(f"Migrated directory: {old_pattern} → {new_location}")
+    def _migrate_content(self, old_path: Path, new_path: Path, link_mode: str = 'copy',
+                         workers: Optional[int] = None, resume: bool = False) -> Dict:
+        """Migrate content from old structure to new structure in one pass."""
+        return migrate_files(old_path, new_path, link_mode, workers, resume)
     
     def _create_migration_config(self, course_path: Path, course_code: str, template: str) -> None:
         """Create configuration for migrated course."""
@@ -365,6 +359,7 @@ Use Anki's filtered decks to study specific topics or priorities.
         config['course_name'] = f"Migrated Course {course_code}"
         config['semester'] = "Unknown"
         config['migrated'] = True
+        config['template_used'] = template
         config['migration_date'] = str(Path(__file__).stat().st_mtime)
         
         config_path = course_path / 'config' / 'course_config.json'
@@ -375,6 +370,9 @@ Use Anki's filtered decks to study specific topics or priorities.
         """
         Validate course structure and configuration.
         
+        The result is cached in the course registry until the course config,
+        templates.json or a directory holding a required directory changes.
+        
         Args:
             course_code: Course code to validate
             
@@ -387,58 +385,253 @@ Use Anki's filtered decks to study specific topics or priorities.
             logger.error(f"Course {course_code} does not exist")
             return False
         
-        # Check required directories
+        required_dirs, watched = self._validation_inputs(course_path)
+        result = self.registry.cached_validation(
+            course_code, lambda: self._check_course(course_path, required_dirs), watched
+        )
+        self.registry.save()
+        
+        for error in result['errors']:
+            logger.error(error)
+        if result['valid']:
+            logger.info(f"Course {course_code} validation passed")
+        return result['valid']
+    
+    def validate_all(self, max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Validate every course concurrently.
+        
+        Courses whose cached result still holds are answered from the
+        registry; the rest are checked on a thread pool.
+        
+        Args:
+            max_workers: Concurrent checks (defaults to twice the CPU count, at most 8)
+            
+        Returns:
+            One dict per course with 'course_code', 'valid', 'errors',
+            'seconds' and 'cached'
+        """
+        results = {}
+        pending = {}
+        
+        for course_code in self.list_courses():
+            start = time.perf_counter()
+            course_path = self.courses_dir / course_code
+            required_dirs, watched = self._validation_inputs(course_path)
+            signature = self.registry.validation_signature(watched)
+            cached = self.registry.current_validation(course_code, signature)
+            if cached:
+                results[course_code] = self._validation_report(
+                    course_code, cached, time.perf_counter() - start, True
+                )
+            else:
+                pending[course_code] = (course_path, required_dirs, signature)
+        
+        if pending:
+            workers = max_workers or min(8, (os.cpu_count() or 1) * 2)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    course_code: executor.submit(self._timed_check, course_path, required_dirs)
+                    for course_code, (course_path, required_dirs, _) in pending.items()
+                }
+                for course_code, future in futures.items():
+                    result, seconds = future.result()
+                    result = self.registry.store_validation(course_code, result, pending[course_code][2])
+                    results[course_code] = self._validation_report(course_code, result, seconds, False)
+        
+        self.registry.save()
+        return [results[course_code] for course_code in sorted(results)]
+    
+    def _validation_inputs(self, course_path: Path):
+        """Required directories of a course and the paths its cached validation depends on."""
         required_dirs = self.templates_config['directory_structure']['required_dirs']
-        missing_dirs = []
+        watched = [
+            self.config_dir / 'templates.json',
+            Path(config_schema.__file__),
+            course_path / 'config' / 'extraction_rules.json'
+        ] + [course_path / location for location in CONFIG_LOCATIONS] + sorted({(course_path / dir_name).parent for dir_name in required_dirs})
+        return required_dirs, watched
+    
+    def _timed_check(self, course_path: Path, required_dirs: List[str]):
+        """Run _check_course and time it; returns (result, seconds)."""
+        start = time.perf_counter()
+        result = self._check_course(course_path, required_dirs)
+        return result, time.perf_counter() - start
+    
+    @staticmethod
+    def _validation_report(course_code: str, result: Dict, seconds: float, cached: bool) -> Dict:
+        """Per-course entry of validate_all's result."""
+        return {
+            'course_code': course_code,
+            'valid': result['valid'],
+            'errors': result['errors'],
+            'seconds': seconds,
+            'cached': cached
+        }
+    
+    def _check_course(self, course_path: Path, required_dirs: List[str]) -> Dict:
+        """
+        Check a course's directories and config files; returns {'valid', 'errors'}.
         
-        for dir_name in required_dirs:
-            dir_path = course_path / dir_name
-            if not dir_path.exists():
-                missing_dirs.append(dir_name)
+        course_config.json (in config/ or, for legacy courses, the course root)
+        and config/extraction_rules.json, if present, are checked against the
+        schemas in config_schema, compiled once per process.
+        """
+        course_code = course_path.name
+        errors = []
         
+        # Check required directories
+        missing_dirs = [dir_name for dir_name in required_dirs if not (course_path / dir_name).exists()]
         if missing_dirs:
-            logger.error(f"Missing directories in {course_code}: {missing_dirs}")
-            return False
+            errors.append(f"Missing directories in {course_code}: {missing_dirs}")
         
-        # Check configuration file
-        config_path = course_path / 'config' / 'course_config.json'
-        if not config_path.exists():
-            logger.error(f"Missing course configuration: {config_path}")
-            return False
+        # Check configuration files
+        config_path = find_course_config(course_path)
+        rules_path = course_path / 'config' / 'extraction_rules.json'
+        if config_path is None:
+            errors.append(f"Missing course configuration: {course_path / CONFIG_LOCATIONS[0]}")
         
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+        for schema_name, path in (('course_config', config_path), ('extraction_rules', rules_path)):
+            if path is None or not path.exists():
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except json.JSONDecodeError as e:
+                errors.append(f"Invalid JSON in {path.name} of {course_code}: {e}")
+                continue
+            errors.extend(
+                f"Invalid {path.name} in {course_code}: {error}"
+                for error in config_schema.validate(schema_name, data, schema_name)
+            )
+        
+        return {'valid': not errors, 'errors': errors}
+    
+    def list_courses(self) -> List[str]:
+        """List all existing courses (from the registry; rescanned when courses/ changes)."""
+        courses = self.registry.course_codes()
+        self.registry.save()
+        return courses
+    
+    def plan_build(self, course_code: str, force: bool = False) -> List[Dict]:
+        """
+        Plan the extract → build stages for a course.
+        
+        Courses with a "build_pipeline" entry in their config run their own
+        scripts; all others run the shared incremental build graph, which
+        reruns only stale stages.
+        
+        Args:
+            course_code: Course code to plan
+            force: Rebuild every stage of the shared build graph
             
-            # Validate required config fields
-            required_fields = ['course_code', 'course_name']
-            missing_fields = [field for field in required_fields if field not in config]
+        Returns:
+            Ordered list of stage dictionaries (name, command, cpu_heavy)
+        """
+        course_path = self.courses_dir / course_code
+        config = self.registry.config(course_code) or {}
+        
+        pipeline = config.get('build_pipeline')
+        if pipeline:
+            return [
+                {
+                    'name': stage,
+                    'command': [sys.executable, str(course_path / pipeline[stage])],
+                    'cpu_heavy': stage == 'extract'
+                }
+                for stage in ('extract', 'build') if stage in pipeline
+            ]
+        
+        # Shared pipeline: make-style graph of extract → build stages
+        command = [sys.executable, '-m', 'shared.core.build_graph', str(course_path)]
+        if force:
+            command.append('--force')
+        return [{'name': 'extract+build', 'command': command, 'cpu_heavy': True}]
+    
+    def _run_build_job(self, course_code: str, stages: List[Dict],
+                       cpu_slots: threading.Semaphore) -> Dict:
+        """Run one course's stages in order, logging output to processing/logs/."""
+        log_dir = self.courses_dir / course_code / 'processing' / 'logs'
+        log_dir.mkdir(parents=True, exist_ok=True)
+        result = {'course_code': course_code, 'success': True, 'stages': {}, 'elapsed': 0.0}
+        job_start = time.perf_counter()
+        
+        for stage in stages:
+            log_path = log_dir / f"build_{stage['name']}.log"
             
-            if missing_fields:
-                logger.error(f"Missing config fields in {course_code}: {missing_fields}")
-                return False
+            # CPU-heavy stages (PDF/text extraction) share a core-sized pool of slots
+            slot = cpu_slots if stage['cpu_heavy'] else None
+            if slot:
+                slot.acquire()
+            stage_start = time.perf_counter()
+            try:
+                with open(log_path, 'w', encoding='utf-8') as log_file:
+                    completed = subprocess.run(stage['command'], cwd=self.repo_root,
+                                               stdout=log_file, stderr=subprocess.STDOUT)
+            finally:
+                if slot:
+                    slot.release()
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in course config: {e}")
-            return False
+            elapsed = time.perf_counter() - stage_start
+            result['stages'][stage['name']] = round(elapsed, 2)
+            
+            if completed.returncode != 0:
+                logger.error(f"{course_code}: {stage['name']} failed "
+                             f"(exit {completed.returncode}), see {log_path}")
+                result['success'] = False
+                break
+            
+            logger.info(f"{course_code}: {stage['name']} finished in {elapsed:.1f}s")
         
-        logger.info(f"Course {course_code} validation passed")
-        return True
+        result['elapsed'] = round(time.perf_counter() - job_start, 2)
+        return result
     
-    def list_courses(self) -> List[str]:
-        """List all existing courses."""
-        if not self.courses_dir.exists():
+    def build_courses(self, course_codes: Optional[List[str]] = None,
+                      max_workers: Optional[int] = None, force: bool = False) -> List[Dict]:
+        """
+        Build decks for several courses concurrently.
+        
+        Each course's stages run in order on a bounded worker pool; extraction
+        stages are additionally limited to one per CPU core.
+        
+        Args:
+            course_codes: Courses to build (defaults to all courses)
+            max_workers: Concurrent course jobs (defaults to twice the CPU count)
+            force: Rebuild up-to-date stages of shared-pipeline courses too
+            
+        Returns:
+            Per-course results with success flag and stage timings
+        """
+        course_codes = course_codes or self.list_courses()
+        available = set(self.list_courses())
+        
+        unknown = [code for code in course_codes if code not in available]
+        if unknown:
+            logger.error(f"Unknown courses: {unknown}")
+            return [{'course_code': code, 'success': False, 'stages': {}, 'elapsed': 0.0}
+                    for code in unknown]
+        
+        if not course_codes:
+            logger.warning("No courses to build")
             return []
         
-        courses = []
-        for item in self.courses_dir.iterdir():
-            if item.is_dir() and not item.name.startswith('.'):
-                # Check if it has a config file
-                config_path = item / 'config' / 'course_config.json'
-                if config_path.exists():
-                    courses.append(item.name)
+        jobs = {code: self.plan_build(code, force) for code in course_codes}
+        cpu_count = os.cpu_count() or 1
+        workers = max_workers or min(len(jobs), cpu_count * 2)
+        cpu_slots = threading.Semaphore(cpu_count)
         
-        return sorted(courses)
+        logger.info(f"Building {len(jobs)} courses with {workers} workers "
+                    f"({cpu_count} extraction slots)")
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._run_build_job, code, stages, cpu_slots)
+                       for code, stages in jobs.items()]
+            results = [future.result() for future in futures]
+        
+        for result in results:
+            self.registry.record_build(result['course_code'], result['success'])
+        self.registry.save()
+        return results
 
 
 def main():
@@ -460,6 +653,11 @@ def main():
     migrate_parser.add_argument('old_path', help='Path to existing course')
     migrate_parser.add_argument('course_code', help='Course code for migrated course')
     migrate_parser.add_argument('--template', default='basic', help='Template to use')
+    migrate_parser.add_argument('--link', choices=LINK_MODES, default='copy',
+                                help='Copy files, hard-link them or reflink (copy-on-write) them')
+    migrate_parser.add_argument('--workers', type=int, help='Concurrent file copies')
+    migrate_parser.add_argument('--resume', action='store_true',
+                                help='Continue an interrupted migration, skipping finished files')
     
     # List commands
     list_parser = subparsers.add_parser('list', help='List available items')
@@ -468,7 +666,33 @@ def main():
     
     # Validate command
     validate_parser = subparsers.add_parser('validate', help='Validate course structure')
-    validate_parser.add_argument('course_code', help='Course code to validate')
+    validate_parser.add_argument('course_code', nargs='?', help='Course code to validate')
+    validate_parser.add_argument('--all', action='store_true', help='Validate every course concurrently')
+    validate_parser.add_argument('--workers', type=int, help='Maximum concurrent course checks')
+    
+    # Build command
+    build_parser = subparsers.add_parser('build', help='Build decks for one or more courses')
+    build_parser.add_argument('course_codes', nargs='*', help='Courses to build (default: all)')
+    build_parser.add_argument('--workers', type=int, help='Maximum concurrent course builds')
+    build_parser.add_argument('--force', action='store_true', help='Rebuild stages that are up to date')
+    build_parser.add_argument('--dry-run', action='store_true', help='Only list the stale stages of each course')
+    
+    # Watch command
+    watch_parser = subparsers.add_parser('watch', help='Rebuild decks whenever course materials change')
+    watch_parser.add_argument('course_codes', nargs='*', help='Courses to watch (default: all)')
+    watch_parser.add_argument('--debounce', type=float, default=2.0,
+                              help='Seconds of quiet before rebuilding (default: 2)')
+    watch_parser.add_argument('--max-delay', type=float, default=10.0,
+                              help='Longest a change waits during a continuous burst (default: 10)')
+    watch_parser.add_argument('--poll', type=float, metavar='SECONDS',
+                              help='Poll at this interval instead of using inotify')
+    
+    # Sync command
+    sync_parser = subparsers.add_parser('sync', help='Sync a built deck into a running Anki')
+    sync_parser.add_argument('course_code', help='Course code to sync')
+    sync_parser.add_argument('--priority-subdecks', action='store_true',
+                             help='Place cards in per-priority subdecks')
+    sync_parser.add_argument('--dry-run', action='store_true', help='Report changes without writing')
     
     args = parser.parse_args()
     
@@ -494,7 +718,10 @@ def main():
         success = manager.migrate_course(
             Path(args.old_path), 
             args.course_code, 
-            args.template
+            args.template,
+            args.link,
+            args.workers,
+            args.resume
         )
         sys.exit(0 if success else 1)
     
@@ -519,8 +746,63 @@ def main():
                 print("No templates found.")
     
     elif args.command == 'validate':
-        success = manager.validate_course(args.course_code)
-        sys.exit(0 if success else 1)
+        if not args.all:
+            if not args.course_code:
+                validate_parser.error('give a course code or --all')
+            success = manager.validate_course(args.course_code)
+            sys.exit(0 if success else 1)
+        
+        validate_start = time.perf_counter()
+        results = manager.validate_all(args.workers)
+        
+        print(f"\nValidation results ({len(results)} courses):")
+        for result in results:
+            status = "OK" if result['valid'] else "INVALID"
+            cached = " (cached)" if result['cached'] else ""
+            print(f"  - {result['course_code']}: {status} in {result['seconds'] * 1000:.1f}ms{cached}")
+            for error in result['errors']:
+                print(f"      {error}")
+        print(f"Total wall time: {(time.perf_counter() - validate_start) * 1000:.0f}ms")
+        
+        sys.exit(0 if all(result['valid'] for result in results) else 1)
+    
+    elif args.command == 'build':
+        if args.dry_run:
+            for course_code in args.course_codes or manager.list_courses():
+                stages = manager.plan_build(course_code)
+                print(f"{course_code}:")
+                if stages[0]['command'][1:3] == ['-m', 'shared.core.build_graph']:
+                    sys.stdout.flush()
+                    subprocess.run(stages[0]['command'] + ['--dry-run'], cwd=manager.repo_root,
+                                   stderr=subprocess.DEVNULL)
+                else:
+                    print(f"  - custom build_pipeline, always runs: {', '.join(stage['name'] for stage in stages)}")
+            return
+        
+        build_start = time.perf_counter()
+        results = manager.build_courses(args.course_codes, args.workers, args.force)
+        
+        print(f"\nBuild results ({len(results)} courses):")
+        for result in results:
+            status = "OK" if result['success'] else "FAILED"
+            stages = ', '.join(f"{name} {elapsed}s" for name, elapsed in result['stages'].items())
+            print(f"  - {result['course_code']}: {status} in {result['elapsed']}s ({stages})")
+        print(f"Total wall time: {time.perf_counter() - build_start:.1f}s")
+        
+        sys.exit(0 if all(result['success'] for result in results) else 1)
+    
+    elif args.command == 'watch':
+        watcher = CourseWatcher(manager, args.course_codes or None, args.debounce,
+                                args.max_delay, args.poll)
+        watcher.run()
+    
+    elif args.command == 'sync':
+        command = [sys.executable, '-m', 'shared.core.anki_sync', str(manager.courses_dir / args.course_code)]
+        if args.priority_subdecks:
+            command.append('--priority-subdecks')
+        if args.dry_run:
+            command.append('--dry-run')
+        sys.exit(subprocess.run(command, cwd=manager.repo_root).returncode)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Course Registry - Cached index of the courses under courses/.
+
+processing/course_registry.json records each course's code, paths, config
+(with its mtime and hash), validation result, last build time and deck
+artifacts. Entries are checked against file mtimes on access and refreshed
+only when something changed. Config files are located with the shared
+config resolver, so the registry and the pipeline agree on where a course's
+config lives. `list`, `validate` and
+`build` can then answer without walking and re-parsing the tree.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# The config lookup is shared with the extraction pipeline
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from shared.core.config_resolver import COURSE_CONFIG_LOCATIONS as CONFIG_LOCATIONS, find_course_config
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_VERSION = 2
+
+# Kept outside courses/ so that writing it does not change the directory's mtime
+REGISTRY_PATH = Path('processing') / 'course_registry.json'
+
+# Where built decks end up, relative to the course
+ARTIFACT_DIRS = ('decks', 'output')
+ARTIFACT_SUFFIXES = ('.apkg', '.csv')
+
+
+def _mtime(path: Path) -> Optional[float]:
+    """A path's mtime, or None if it does not exist."""
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+class CourseRegistry:
+    """Reads and maintains the course registry file."""
+
+    def __init__(self, courses_dir: Path, index_path: Optional[Path] = None):
+        """
+        Args:
+            courses_dir: Directory holding one subdirectory per course
+            index_path: Registry file (defaults to processing/course_registry.json
+                next to courses/)
+        """
+        self.courses_dir = Path(courses_dir)
+        self.index_path = Path(index_path) if index_path else self.courses_dir.parent / REGISTRY_PATH
+        self.data = self._load()
+        self.dirty = False
+
+    def _load(self) -> Dict:
+        """Read the index, starting fresh if it is missing, corrupt or outdated."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == REGISTRY_VERSION:
+                return data
+        except (OSError, json.JSONDecodeError):
+            pass
+        return {'version': REGISTRY_VERSION, 'courses_mtime': None, 'course_dirs': [], 'courses': {}}
+
+    def save(self):
+        """Write the index atomically if anything changed."""
+        if not self.dirty:
+            return
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.index_path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(temp_path, self.index_path)
+            self.dirty = False
+        except OSError as e:
+            # The index is only a cache; never fail a command over it
+            logger.warning(f"Could not write course registry {self.index_path}: {e}")
+
+    def course_codes(self) -> List[str]:
+        """
+        Codes of all courses with a config file.
+
+        courses/ is listed again only when its mtime changed. A config file
+        can appear or disappear without touching that mtime, so every known
+        course directory is still checked through entry(), which costs a
+        stat per course unless its config changed.
+        """
+        mtime = _mtime(self.courses_dir)
+        if mtime is None:
+            return []
+
+        if mtime != self.data['courses_mtime']:
+            self.data['course_dirs'] = sorted(
+                item.name for item in self.courses_dir.iterdir()
+                if item.is_dir() and not item.name.startswith('.')
+            )
+            self.data['courses_mtime'] = mtime
+            self.dirty = True
+
+        found = {code for code in self.data['course_dirs'] if self.entry(code)}
+        for code in set(self.data['courses']) - found:
+            del self.data['courses'][code]
+            self.dirty = True
+
+        return sorted(self.data['courses'])
+
+    def entry(self, course_code: str) -> Optional[Dict]:
+        """
+        A course's registry entry, refreshed if its config file changed.
+
+        Returns:
+            Entry dict, or None if the course has no config file
+        """
+        entry = self.data['courses'].get(course_code)
+        if entry and _mtime(Path(entry['config_path'])) == entry['config_mtime']:
+            return entry
+        return self.refresh(course_code)
+
+    def refresh(self, course_code: str) -> Optional[Dict]:
+        """Re-read a course's config into the registry (keeping build history)."""
+        course_path = self.courses_dir / course_code
+        config_path = find_course_config(course_path)
+        if config_path is None:
+            if self.data['courses'].pop(course_code, None) is not None:
+                self.dirty = True
+            return None
+
+        raw = config_path.read_bytes()
+        try:
+            config = json.loads(raw)
+        except json.JSONDecodeError as e:
+            config = None
+            logger.warning(f"Invalid JSON in {config_path}: {e}")
+
+        previous = self.data['courses'].get(course_code, {})
+        entry = {
+            'course_code': course_code,
+            'path': str(course_path),
+            'config_path': str(config_path),
+            'config_mtime': _mtime(config_path),
+            'config_hash': hashlib.sha1(raw).hexdigest(),
+            'config': config,
+            'last_build': previous.get('last_build'),
+            'last_build_success': previous.get('last_build_success'),
+            'artifacts': previous.get('artifacts', []),
+            'validation': None
+        }
+        self.data['courses'][course_code] = entry
+        self.dirty = True
+        return entry
+
+    def config(self, course_code: str) -> Optional[Dict]:
+        """A course's parsed config, or None if it is missing or invalid."""
+        entry = self.entry(course_code)
+        return entry['config'] if entry else None
+
+    def cached_validation(self, course_code: str, check: Callable[[], Dict],
+                          watched: List[Path]) -> Dict:
+        """
+        Validation result for a course, re-running ``check`` only when needed.
+
+        Args:
+            course_code: Course to validate
+            check: Runs the validation and returns {'valid': bool, 'errors': [...]}
+            watched: Paths whose mtimes decide whether a cached result still holds
+
+        Returns:
+            The (possibly cached) validation result
+        """
+        signature = self.validation_signature(watched)
+        result = self.current_validation(course_code, signature)
+        if result is None:
+            result = self.store_validation(course_code, check(), signature)
+        return result
+
+    @staticmethod
+    def validation_signature(watched: List[Path]) -> List[Optional[float]]:
+        """The mtimes a cached validation result is keyed on."""
+        return [_mtime(path) for path in watched]
+
+    def current_validation(self, course_code: str, signature: List[Optional[float]]) -> Optional[Dict]:
+        """A course's stored validation result if it matches ``signature``, else None."""
+        entry = self.entry(course_code)
+        if entry and entry.get('validation') and entry['validation']['signature'] == signature:
+            return entry['validation']
+        return None
+
+    def store_validation(self, course_code: str, result: Dict, signature: List[Optional[float]]) -> Dict:
+        """Record a fresh validation result under ``signature``."""
+        result['signature'] = signature
+        entry = self.entry(course_code)
+        if entry:
+            entry['validation'] = result
+            self.dirty = True
+        return result
+
+    def record_build(self, course_code: str, success: bool):
+        """Store a build's time, outcome and the deck files it left behind."""
+        entry = self.entry(course_code)
+        if entry is None:
+            return
+        entry['last_build'] = time.time()
+        entry['last_build_success'] = success
+        entry['artifacts'] = self._scan_artifacts(Path(entry['path']))
+        self.dirty = True
+
+    @staticmethod
+    def _scan_artifacts(course_path: Path) -> List[Dict]:
+        """Deck files under the course's deck/output directories."""
+        artifacts = []
+        for directory in ARTIFACT_DIRS:
+            for root, _, files in os.walk(course_path / directory):
+                for name in files:
+                    if name.endswith(ARTIFACT_SUFFIXES):
+                        path = Path(root) / name
+                        stat = path.stat()
+                        artifacts.append({
+                            'path': str(path.relative_to(course_path)),
+                            'size': stat.st_size,
+                            'mtime': stat.st_mtime
+                        })
+        return sorted(artifacts, key=lambda artifact: artifact['path'])
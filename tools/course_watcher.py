@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Course Watcher - Rebuild decks as new course materials arrive.
+
+Watches the course directories for new, changed, moved or deleted source
+files (lecture folders, transcripts, slides, course configs) and rebuilds
+the affected courses once a burst of changes has settled. On Linux the
+kernel reports changes through inotify (called via ctypes, no extra
+dependency); elsewhere the trees are polled with os.scandir. Builds go
+through CourseManager.build_courses, so shared-pipeline courses only
+re-extract the sources that changed. Courses with a "build_pipeline" entry
+(PSYC2120, PSYC2240) run their own scripts, which rebuild everything on
+every change.
+
+Generated files (processing/, decks/, output/, analysis JSON) are not
+watched, so a build never triggers itself.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Directories holding build output or tooling rather than course materials
+IGNORED_DIRS = {'processing', 'decks', 'output', 'tools', '__pycache__', '.git'}
+
+# Config files whose changes also trigger a rebuild
+WATCHED_CONFIG_FILES = {'course_config.json', 'extraction_rules.json'}
+
+# Used when default_settings.json does not list file_processing.supported_formats
+DEFAULT_SOURCE_SUFFIXES = ('.pdf', '.docx', '.txt', '.md')
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _walk_dirs(root: Path) -> Iterable[Path]:
+    """A directory and all its watchable subdirectories."""
+    yield root
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False) and not _ignored_dir(entry.name):
+            yield from _walk_dirs(Path(entry.path))
+
+
+def _ignored_dir(name: str) -> bool:
+    return name in IGNORED_DIRS or name.startswith('.')
+
+
+class InotifyWatcher:
+    """Recursive directory watch on Linux inotify."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, Path] = {}
+        self._buffer = b''
+
+    @staticmethod
+    def available() -> bool:
+        """Whether inotify can be used on this system."""
+        if not hasattr(select, 'poll') or not os.path.exists('/proc/sys/fs/inotify'):
+            return False
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        try:
+            return hasattr(ctypes.CDLL(libc_name), 'inotify_init1')
+        except OSError:
+            return False
+
+    def add_tree(self, root: Path) -> List[Path]:
+        """
+        Watch a directory tree.
+
+        Returns:
+            Files already in the tree (a new directory may have been filled
+            before its watch was added)
+        """
+        files = []
+        for directory in _walk_dirs(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                logger.warning(f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+                continue
+            self._dirs[wd] = directory
+            try:
+                files.extend(Path(entry.path) for entry in os.scandir(directory) if entry.is_file())
+            except OSError:
+                pass
+        return files
+
+    def watch_new_dirs(self, root: Path):
+        """Also notice directories created directly under ``root`` (they are then watched too)."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), IN_CREATE | IN_MOVED_TO)
+        if wd >= 0:
+            self._dirs[wd] = root
+
+    def read(self, timeout: float) -> Tuple[Set[Path], bool]:
+        """
+        Wait up to ``timeout`` seconds for changes.
+
+        Returns:
+            Tuple of (changed file paths, overflowed). After an overflow
+            events were lost and the caller should treat everything as changed.
+        """
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        if not poller.poll(max(0, int(timeout * 1000))):
+            return set(), False
+
+        changed: Set[Path] = set()
+        overflowed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            self._buffer += data
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(self._buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(self._buffer, offset)
+            end = offset + EVENT_HEADER.size + length
+            if end > len(self._buffer):
+                break
+            name = self._buffer[offset + EVENT_HEADER.size:end].rstrip(b'\0')
+            offset = end
+
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            directory = self._dirs.get(wd)
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if directory is None or not name:
+                continue
+
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if _ignored_dir(path.name):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self.add_tree(path))
+                # A removed or moved-away folder counts as a change in its parent
+                changed.add(path)
+            elif not mask & IN_CREATE:
+                # Files are reported once written (IN_CLOSE_WRITE), not on creation
+                changed.add(path)
+
+        self._buffer = self._buffer[offset:]
+        return changed, overflowed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Portable fallback: compare (size, mtime) snapshots of the watched trees."""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._roots: List[Path] = []
+        self._parents: List[Path] = []
+        self._snapshot: Dict[Path, Tuple[int, int]] = {}
+
+    @staticmethod
+    def _scan(root: Path) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for directory in _walk_dirs(root):
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            snapshot[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+        return snapshot
+
+    def add_tree(self, root: Path) -> List[Path]:
+        self._roots.append(root)
+        snapshot = self._scan(root)
+        self._snapshot.update(snapshot)
+        return list(snapshot)
+
+    def watch_new_dirs(self, root: Path):
+        """Also notice directories created directly under ``root`` (they are then watched too)."""
+        self._parents.append(root)
+
+    def read(self, timeout: float) -> Tuple[Set[Path], bool]:
+        """Sleep up to ``timeout`` (at most one interval) and report what changed."""
+        time.sleep(max(0.0, min(timeout, self.interval)))
+        new_dirs = set()
+        for parent in self._parents:
+            try:
+                entries = list(os.scandir(parent))
+            except OSError:
+                continue
+            for entry in entries:
+                path = Path(entry.path)
+                if entry.is_dir() and not _ignored_dir(entry.name) and path not in self._roots:
+                    self._roots.append(path)
+                    new_dirs.add(path)
+
+        current = {}
+        for root in self._roots:
+            current.update(self._scan(root))
+        changed = {path for path, signature in current.items() if self._snapshot.get(path) != signature}
+        changed |= set(self._snapshot) - set(current)
+        self._snapshot = current
+        return changed | new_dirs, False
+
+    def close(self):
+        pass
+
+
+class CourseWatcher:
+    """Debounces source changes per course and triggers incremental builds."""
+
+    def __init__(self, manager, course_codes: Optional[List[str]] = None, debounce: float = 2.0,
+                 max_delay: float = 10.0, poll_interval: Optional[float] = None):
+        """
+        Args:
+            manager: CourseManager used to build the courses
+            course_codes: Courses to watch (defaults to all, including new ones)
+            debounce: Seconds without further changes before a build starts
+            max_delay: Longest a change waits during a continuous burst
+            poll_interval: Poll every this many seconds instead of using
+                inotify (polling is also used when inotify is unavailable)
+        """
+        self.manager = manager
+        self.course_codes = course_codes
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+        supported = manager.default_settings.get('file_processing', {}).get('supported_formats')
+        self.source_suffixes = tuple(suffix.lower() for suffix in (supported or DEFAULT_SOURCE_SUFFIXES))
+
+        if poll_interval is None and InotifyWatcher.available():
+            self.watcher = InotifyWatcher()
+            self.mode = 'inotify'
+        else:
+            self.watcher = PollingWatcher(poll_interval or 2.0)
+            self.mode = 'polling'
+
+    def is_source(self, path: Path) -> bool:
+        """Whether a changed path is course material (not build output or a temp file)."""
+        name = path.name
+        if name.startswith(('.', '~$')) or name.endswith('~'):
+            return False
+        try:
+            relative = path.relative_to(self.manager.courses_dir)
+        except ValueError:
+            return False
+        if any(_ignored_dir(part) for part in relative.parts[1:-1]):
+            return False
+        # No suffix: a lecture folder that was added, moved or removed
+        return name in WATCHED_CONFIG_FILES or path.suffix.lower() in self.source_suffixes or not path.suffix
+
+    def course_of(self, path: Path) -> Optional[str]:
+        """Course code a path belongs to."""
+        try:
+            return path.relative_to(self.manager.courses_dir).parts[0]
+        except (ValueError, IndexError):
+            return None
+
+    def run(self, max_builds: Optional[int] = None):
+        """
+        Watch and rebuild until interrupted.
+
+        Args:
+            max_builds: Stop after this many build rounds (for scripting)
+        """
+        watched = set(self.course_codes or self.manager.list_courses())
+        for course_code in sorted(watched):
+            self.watcher.add_tree(self.manager.courses_dir / course_code)
+        if not self.course_codes:
+            self.watcher.watch_new_dirs(self.manager.courses_dir)
+
+        logger.info(f"Watching {len(watched)} courses ({self.mode}); "
+                    f"debounce {self.debounce}s, max delay {self.max_delay}s")
+        for course_code in sorted(watched):
+            self._warn_full_rebuild(course_code)
+
+        pending: Dict[str, Set[Path]] = {}
+        first_change = last_change = 0.0
+        builds = 0
+
+        try:
+            while max_builds is None or builds < max_builds:
+                if pending:
+                    deadline = min(last_change + self.debounce, first_change + self.max_delay)
+                    timeout = max(0.05, deadline - time.monotonic())
+                else:
+                    timeout = 3600.0
+                changed, overflowed = self.watcher.read(timeout)
+                now = time.monotonic()
+
+                relevant = overflowed
+                if overflowed:
+                    logger.warning("Change queue overflowed; rebuilding all watched courses")
+                    for course_code in watched:
+                        pending.setdefault(course_code, set())
+
+                for path in changed:
+                    course_code = self.course_of(path)
+                    if course_code is None:
+                        continue
+                    if course_code not in watched:
+                        if self.course_codes:
+                            continue
+                        # A new course directory (watched by now)
+                        watched.add(course_code)
+                        logger.info(f"Now watching new course {course_code}")
+                        self._warn_full_rebuild(course_code)
+                    if path.parent != self.manager.courses_dir and self.is_source(path):
+                        pending.setdefault(course_code, set()).add(path)
+                        relevant = True
+
+                if relevant:
+                    last_change = now
+                    first_change = first_change or now
+
+                if pending and (now - last_change >= self.debounce or now - first_change >= self.max_delay):
+                    self._build(pending)
+                    pending = {}
+                    first_change = 0.0
+                    builds += 1
+        except KeyboardInterrupt:
+            logger.info("Stopped watching")
+        finally:
+            self.watcher.close()
+
+    def _warn_full_rebuild(self, course_code: str):
+        """Say so when a course's builds cannot be incremental."""
+        config = self.manager.registry.config(course_code) or {}
+        if config.get('build_pipeline'):
+            logger.warning(f"{course_code} builds with its own build_pipeline scripts; "
+                           f"every change reruns its full extract and build")
+
+    def _build(self, pending: Dict[str, Set[Path]]):
+        """Build the courses with settled changes."""
+        for course_code, paths in sorted(pending.items()):
+            names = sorted(path.name for path in paths)
+            listed = ', '.join(names[:5]) + (f" and {len(names) - 5} more" if len(names) > 5 else '')
+            logger.info(f"{course_code}: {len(paths)} changed ({listed or 'rescan'})")
+
+        known = set(self.manager.list_courses())
+        course_codes = sorted(code for code in pending if code in known)
+        if not course_codes:
+            return
+        start = time.perf_counter()
+        for result in self.manager.build_courses(course_codes):
+            status = "rebuilt" if result['success'] else "FAILED"
+            logger.info(f"{result['course_code']}: {status} in {result['elapsed']}s")
+        logger.info(f"Decks up to date {time.perf_counter() - start:.1f}s after the changes settled")